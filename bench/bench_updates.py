@@ -0,0 +1,169 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from conftest import CycleTimer, async_setup_vehicles
+from custom_components.tibber_graphapi.const import (
+    CONF_FLEET_POLLING,
+    CONF_PULSE_LIVE,
+    CONF_PULSE_WINDOW,
+    CONF_CHARGE_PLANNER,
+    DOMAIN,
+    SETTINGS_MAX_DELAY
+)
+
+CYCLES = 50
+
+
+async def _async_run_cycles(standin, coordinators, bench_result, state_writes, cycles: int = CYCLES, on_cycle=None):
+    for idx in range(cycles):
+        if on_cycle is not None:
+            on_cycle(idx)
+        async with CycleTimer(bench_result, standin, state_writes):
+            await asyncio.gather(*[a_coordinator.async_refresh() for a_coordinator in coordinators])
+            await coordinators[0].hass.async_block_till_done()
+
+
+def _change_every_other_cycle(standin):
+    # the battery level changes every 2nd cycle - all other values stay the same
+    def _on_cycle(idx: int):
+        for a_vehicle_id in standin.vehicles:
+            standin.set_battery_level(a_vehicle_id, 50 + (idx // 2) % 2)
+    return _on_cycle
+
+
+async def bench_single_vehicle(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    standin = await standin_factory(vehicles=1, latency=0.002)
+    coordinators = await async_setup_vehicles(hass, standin)
+    standin.reset_counters()
+    await _async_run_cycles(standin, coordinators, bench_result, state_writes, on_cycle=_change_every_other_cycle(standin))
+    assert all(a_coordinator.last_update_success for a_coordinator in coordinators)
+    bench_result.extra["bytes/cycle"] = standin.bytes_sent // max(1, standin.requests["vehicles"])
+
+
+async def bench_large_payload(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    standin = await standin_factory(vehicles=1, latency=0.002, payload_settings=2000)
+    coordinators = await async_setup_vehicles(hass, standin)
+    standin.reset_counters()
+    await _async_run_cycles(standin, coordinators, bench_result, state_writes, on_cycle=_change_every_other_cycle(standin))
+    bench_result.extra["bytes/cycle"] = standin.bytes_sent // max(1, standin.requests["vehicles"])
+
+
+async def bench_fleet_polling(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    standin = await standin_factory(vehicles=4, latency=0.002)
+    coordinators = await async_setup_vehicles(hass, standin, **{CONF_FLEET_POLLING: True})
+    await _async_run_cycles(standin, coordinators, bench_result, state_writes, on_cycle=_change_every_other_cycle(standin))
+    assert all(a_coordinator.data is not None for a_coordinator in coordinators)
+
+
+async def bench_fleet_polling_disabled(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    standin = await standin_factory(vehicles=4, latency=0.002)
+    coordinators = await async_setup_vehicles(hass, standin, **{CONF_FLEET_POLLING: False})
+    await _async_run_cycles(standin, coordinators, bench_result, state_writes, on_cycle=_change_every_other_cycle(standin))
+
+
+async def bench_token_rejected(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    # every 5th cycle the token gets invalidated by the server
+    standin = await standin_factory(vehicles=1, latency=0.002)
+    coordinators = await async_setup_vehicles(hass, standin)
+
+    def _on_cycle(idx: int):
+        if idx % 5 == 0:
+            standin.expire_tokens()
+
+    await _async_run_cycles(standin, coordinators, bench_result, state_writes, on_cycle=_on_cycle)
+    bench_result.extra["401"] = standin.status_codes[("vehicles", 401)]
+    bench_result.extra["refresh"] = standin.requests["refresh"]
+    bench_result.extra["login"] = standin.requests["login"]
+
+
+async def bench_pulse_stream(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    standin = await standin_factory(vehicles=1, pulses=1, frame_interval=0.005)
+    coordinators = await async_setup_vehicles(hass, standin, **{CONF_PULSE_LIVE: True, CONF_PULSE_WINDOW: 0.1})
+    pulse_coordinator = coordinators[0].pulse_coordinators[0]
+
+    standin.reset_counters()
+    writes = state_writes["writes"]
+    for idx in range(200):
+        standin.set_measurement("pulse-0", power=400 + (idx % 20) * 10)
+        await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+
+    frames = max(1, standin.frames_sent)
+    bench_result.extra["frames"] = standin.frames_sent
+    bench_result.extra["frames merged"] = pulse_coordinator.coalescer.frames_merged
+    bench_result.extra["state writes/frame"] = f"{(state_writes['writes'] - writes) / frames:.3f}"
+
+
+async def bench_pulse_multiplex(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    # three homes with a pulse each and two vehicles (with live data) of the same account - all pulses are
+    # streamed through a single websocket, every pulse has a single consumer
+    standin = await standin_factory(vehicles=2, pulses=3, frame_interval=0.01)
+    coordinators = await async_setup_vehicles(hass, standin, **{CONF_PULSE_LIVE: True, CONF_PULSE_WINDOW: 0.1})
+    pulse_coordinators = [a_pulse_coordinator for a_coordinator in coordinators for a_pulse_coordinator in a_coordinator.pulse_coordinators]
+
+    standin.reset_counters()
+    for idx in range(100):
+        for a_pulse_id in standin.pulses:
+            standin.set_measurement(a_pulse_id, power=400 + (idx % 20) * 10)
+        await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+
+    assert len(pulse_coordinators) == len(standin.pulses)
+    bench_result.extra["pulses"] = len(pulse_coordinators)
+    bench_result.extra["ws connections"] = standin.ws_connections
+    bench_result.extra["frames"] = standin.frames_sent
+    bench_result.extra["frames/pulse"] = ", ".join(str(a_pulse_coordinator.coalescer.frames_received) for a_pulse_coordinator in pulse_coordinators)
+
+
+async def bench_charge_planner(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    # two vehicles of the same account - the prices are fetched once (for both), the plans are only rebuilt
+    # when the soc has been changed and the service answers from the cached prices
+    standin = await standin_factory(vehicles=2, latency=0.002)
+    coordinators = await async_setup_vehicles(hass, standin, **{CONF_FLEET_POLLING: True, CONF_CHARGE_PLANNER: True})
+    for a_coordinator in coordinators:
+        await a_coordinator.charge_plan.async_refresh()
+    await _async_run_cycles(standin, coordinators, bench_result, state_writes, on_cycle=_change_every_other_cycle(standin))
+    assert all(a_coordinator.charge_plan.data.get("chargePlanStart") is not None for a_coordinator in coordinators)
+
+    latencies = []
+    for idx in range(200):
+        started = time.perf_counter()
+        await hass.services.async_call(DOMAIN, "plan_charging", {"config_entry_id": coordinators[idx % 2]._config_entry.entry_id,
+                                                                 "soc": 20 + idx % 60}, blocking=True, return_response=True)
+        latencies.append(time.perf_counter() - started)
+
+    bench_result.extra["price requests"] = standin.requests["prices"]
+    bench_result.extra["service median"] = f"{sorted(latencies)[len(latencies) // 2] * 1000:.3f} ms"
+
+
+async def bench_settings_slider(hass, standin_factory, cleanup_standins, state_writes, bench_result):
+    # every cycle a slider is dragged (soc max) and a second setting is changed - the values are shown right
+    # away, the changes are written with a single mutation (after the debounce) and the next poll reconciles
+    standin = await standin_factory(vehicles=1, latency=0.002)
+    coordinators = await async_setup_vehicles(hass, standin)
+    coordinator = coordinators[0]
+    standin.reset_counters()
+
+    set_latencies = []
+    for idx in range(CYCLES):
+        async with CycleTimer(bench_result, standin, state_writes):
+            for a_value in range(60, 81, 2):
+                started = time.perf_counter()
+                await hass.services.async_call("number", "set_value", {"entity_id": "number.car_0_soc_max",
+                                                                       "value": a_value - idx % 2}, blocking=True)
+                set_latencies.append(time.perf_counter() - started)
+            await hass.services.async_call("number", "set_value", {"entity_id": "number.car_0_soc_min",
+                                                                   "value": 20 + idx % 2}, blocking=True)
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=SETTINGS_MAX_DELAY))
+            await hass.async_block_till_done()
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    assert hass.states.get("number.car_0_soc_max").state == f"{80 - (CYCLES - 1) % 2:.1f}"
+    bench_result.extra["mutations"] = standin.requests["settings"]
+    bench_result.extra["changes"] = CYCLES * 12
+    bench_result.extra["set median"] = f"{sorted(set_latencies)[len(set_latencies) // 2] * 1000:.3f} ms"
@@ -0,0 +1,224 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import pytest
+from homeassistant.const import CONF_NAME, CONF_USERNAME, CONF_PASSWORD, CONF_SCAN_INTERVAL
+from homeassistant.helpers.entity import Entity
+
+# the integration lives in the parent directory of this benchmark suite
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.tibber_graphapi import TibberGraphApiBridge
+from custom_components.tibber_graphapi.auth import TibberGraphApiAuth
+from custom_components.tibber_graphapi.stream import TibberGraphApiPulseStream
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    CONF_VEHINDEX_NUMBER,
+    CONF_TIBBER_VEHICLE_ID,
+    CONF_TIBBER_VEHICLE_NAME
+)
+from standin import TibberStandIn
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+BENCH_OUTPUT = os.path.join(REPO_ROOT, "bench_output.txt")
+
+_RESULTS = []
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(request):
+    # the unit tests (test_*.py) work without a running hass - only the benchmarks need the integration
+    if request.node.name.startswith("bench_"):
+        request.getfixturevalue("enable_custom_integrations")
+    yield
+
+
+@pytest.fixture(autouse=True)
+def verify_cleanup():
+    # the benchmarks are measuring - checking for lingering tasks/timers is not their job
+    yield
+
+
+@pytest.fixture
+def standin_factory(monkeypatch, socket_enabled):
+    # starts a stand-in (on localhost) and points all tibber URLs of the integration to it
+    instances = []
+
+    async def _create(**kwargs) -> TibberStandIn:
+        standin = TibberStandIn(**kwargs)
+        await standin.start()
+        monkeypatch.setattr(TibberGraphApiAuth, "LOGIN_URL", standin.login_url)
+        monkeypatch.setattr(TibberGraphApiAuth, "REFRESH_URL", standin.refresh_url)
+        monkeypatch.setattr(TibberGraphApiBridge, "DATA_URL", standin.data_url)
+        monkeypatch.setattr(TibberGraphApiPulseStream, "WS_URL", standin.ws_url)
+        instances.append(standin)
+        return standin
+
+    yield _create
+
+
+@pytest.fixture
+async def cleanup_standins(hass, standin_factory):
+    yield
+    # the entries must be unloaded before the stand-in is stopped (open websockets)
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+@pytest.fixture
+def state_writes(monkeypatch):
+    # counts every 'async_write_ha_state()' call (no matter if the state has changed or not)
+    counter = {"writes": 0}
+    original = Entity.async_write_ha_state
+
+    def _counting_write(self):
+        counter["writes"] += 1
+        original(self)
+
+    monkeypatch.setattr(Entity, "async_write_ha_state", _counting_write)
+    return counter
+
+
+class ManualTimers:
+    # a monotonic clock & 'async_call_later' replacement for the unit tests - the callbacks are only called,
+    # when the clock is advanced
+
+    def __init__(self):
+        self.now = 1000.0
+        self._timers = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def call_later(self, _hass, delay: float, action):
+        timer = [self.now + delay, action]
+        self._timers.append(timer)
+
+        def _cancel():
+            if timer in self._timers:
+                self._timers.remove(timer)
+
+        return _cancel
+
+    @property
+    def pending(self) -> list[float]:
+        # the delays of all scheduled callbacks
+        return sorted(a_timer[0] - self.now for a_timer in self._timers)
+
+    def advance(self, seconds: float):
+        self.now += seconds
+        for a_timer in sorted(self._timers, key=lambda x: x[0]):
+            if a_timer[0] <= self.now and a_timer in self._timers:
+                self._timers.remove(a_timer)
+                a_timer[1](None)
+
+
+@pytest.fixture
+def manual_timers() -> ManualTimers:
+    return ManualTimers()
+
+
+async def async_setup_vehicles(hass, standin: TibberStandIn, **options) -> list:
+    entries = []
+    for idx, (a_vehicle_id, a_title) in enumerate(standin.vehicle_titles.items()):
+        entry = MockConfigEntry(domain=DOMAIN, title=a_title, data={
+            CONF_NAME: a_title,
+            CONF_USERNAME: "bench@example.com",
+            CONF_PASSWORD: "bench",
+            CONF_SCAN_INTERVAL: 60,
+            CONF_VEHINDEX_NUMBER: idx,
+            CONF_TIBBER_VEHICLE_ID: a_vehicle_id,
+            CONF_TIBBER_VEHICLE_NAME: a_title
+        }, options=options)
+        entry.add_to_hass(hass)
+        entries.append(entry)
+
+    # setting up the first entry will set up all entries of the domain
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+    coordinators = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+
+    # the first refresh is running in the background - it should not be part of the measured cycles
+    for _ in range(500):
+        if all(a_coordinator.data is not None for a_coordinator in coordinators):
+            break
+        await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+    return coordinators
+
+
+class BenchResult:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.cycles = 0
+        self.requests = 0
+        self.state_writes = 0
+        self.extra = {}
+
+    def add_cycle(self, latency: float, requests: int, state_writes: int):
+        self.cycles += 1
+        self.latencies.append(latency)
+        self.requests += requests
+        self.state_writes += state_writes
+
+    def summary(self) -> str:
+        line = f"{self.name:<40} cycles: {self.cycles:>4}"
+        if len(self.latencies) > 0:
+            latencies = sorted(self.latencies)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            line += f" | latency median: {statistics.median(latencies) * 1000:8.2f} ms p95: {p95 * 1000:8.2f} ms"
+        if self.cycles > 0:
+            line += f" | requests/cycle: {self.requests / self.cycles:6.2f} | state writes/cycle: {self.state_writes / self.cycles:6.2f}"
+        for key, value in self.extra.items():
+            line += f" | {key}: {value}"
+        return line
+
+
+@pytest.fixture
+def bench_result(request):
+    result = BenchResult(request.node.name.removeprefix("bench_"))
+    yield result
+    _RESULTS.append(result)
+
+
+class CycleTimer:
+    # measures latency, requests and state writes of a single cycle
+
+    def __init__(self, result: BenchResult, standin: TibberStandIn, writes: dict):
+        self._result = result
+        self._standin = standin
+        self._writes = writes
+
+    async def __aenter__(self):
+        self._requests = sum(self._standin.requests.values())
+        self._state_writes = self._writes["writes"]
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.perf_counter() - self._start
+        self._result.add_cycle(latency,
+                               sum(self._standin.requests.values()) - self._requests,
+                               self._writes["writes"] - self._state_writes)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if len(_RESULTS) == 0:
+        return
+    lines = [a_result.summary() for a_result in _RESULTS]
+    terminalreporter.section("tibber graphapi benchmarks")
+    for a_line in lines:
+        terminalreporter.write_line(a_line)
+    with open(BENCH_OUTPUT, "w") as output:
+        output.write("\n".join(lines) + "\n")
@@ -0,0 +1,378 @@
+import asyncio
+import base64
+import copy
+import json
+import logging
+import re
+import time
+import uuid
+from collections import Counter
+
+from aiohttp import web, WSMsgType
+
+_LOGGER = logging.getLogger(__name__)
+
+# offline stand-in for the (undocumented) tibber app API - it implements just the endpoints that are used by
+# the integration: login.credentials, auth-sessions/<id>, /v4/gql (vehicle, vehicles, gizmo & price queries and
+# the settings mutation) and the graphql-transport-ws websocket at /v4/gql/ws
+
+VEHICLE_ALIAS_PATTERN = re.compile(r"(?:(\w+)\s*:\s*)?vehicle\(id:\s*\"([^\"]*)\"\)")
+SELECTION_TOKEN_PATTERN = re.compile(r"[{}]|[A-Za-z_]\w*")
+
+BASE_VEHICLE = {
+    "isAlive": True,
+    "isCharging": False,
+    "chargingStatus": "not_charging",
+    "smartChargingStatus": None,
+    "hasConsumption": True,
+    "enterPincode": False,
+    "battery": {"level": 55, "estimatedRange": 210, "canReadLevel": True},
+    "status": {"title": "Connected", "description": "The vehicle is connected"},
+    "charging": {"sessionStartedAt": None, "targetedStateOfCharge": 80, "chargerId": None,
+                 "progress": {"cost": None, "energy": None, "speed": None}},
+    "userSettings": [
+        {"key": "online.vehicle.smartCharging.minChargeLimit", "value": 20},
+        {"key": "online.vehicle.smartCharging.targetBatteryLevel", "value": 80}
+    ],
+    "onboarding": None
+}
+
+BASE_MEASUREMENT = {
+    "__typename": "PulseMeasurement",
+    "timestamp": None,
+    "power": 450, "powerProduction": 0, "minPower": 0, "minPowerTimestamp": None, "averagePower": 261.3,
+    "maxPower": 5275, "maxPowerTimestamp": None, "minPowerProduction": 0, "maxPowerProduction": 6343,
+    "estimatedAccumulatedConsumptionCurrentHour": None, "accumulatedConsumption": 5.7841,
+    "accumulatedCost": 1.952497, "accumulatedConsumptionCurrentHour": 0.0646, "accumulatedProduction": 48.4389,
+    "accumulatedProductionCurrentHour": 0, "accumulatedReward": None, "peakControlConsumptionState": None,
+    "currency": "EUR", "currentPhase1": None, "currentPhase2": None, "currentPhase3": None,
+    "voltagePhase1": None, "voltagePhase2": None, "voltagePhase3": None, "powerFactor": None, "signalStrength": None
+}
+
+
+def parse_selection(query: str, pos: int) -> dict | None:
+    # parses the selection set '{ a b { c } }' starting at 'pos' into a tree {a: {}, b: {c: {}}}
+    stack = []
+    tree = None
+    last_field = None
+    for token in SELECTION_TOKEN_PATTERN.finditer(query, pos):
+        value = token.group(0)
+        if value == "{":
+            node = {}
+            if tree is None:
+                tree = node
+            else:
+                stack[-1][last_field] = node
+            stack.append(node)
+        elif value == "}":
+            stack.pop()
+            if len(stack) == 0:
+                return tree
+        elif len(stack) > 0:
+            stack[-1][value] = {}
+            last_field = value
+    return tree
+
+
+def apply_selection(data, selection: dict | None):
+    # only the selected fields will be part of the response (like a real GraphQL server would do)
+    if selection is None or len(selection) == 0 or data is None:
+        return data
+    if isinstance(data, list):
+        return [apply_selection(item, selection) for item in data]
+    return {key: apply_selection(data.get(key), sub_selection) for key, sub_selection in selection.items()}
+
+
+def make_token(lifetime: float) -> str:
+    # unsigned JWT - the integration only reads the 'exp' claim
+    def _b64(obj) -> str:
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+    return f"{_b64({'alg': 'none', 'typ': 'JWT'})}.{_b64({'exp': int(time.time() + lifetime), 'jti': uuid.uuid4().hex})}.sig"
+
+
+class TibberStandIn:
+
+    def __init__(self, vehicles: int = 1, pulses: int = 0, latency: float = 0.0, payload_settings: int = 0,
+                 token_lifetime: float = 3600, frame_interval: float = 2.0, ka_interval: float = 30.0,
+                 user: str = None, pwd: str = None):
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.frame_interval = frame_interval
+        self.ka_interval = ka_interval
+        self.user = user
+        self.pwd = pwd
+
+        # number of upcoming requests that will be answered with a 401 (no matter how valid the token is)
+        self.reject_next = 0
+        # a half-dead websocket: the connections stay open, but nothing is sent anymore (not even 'ka'/'pong')
+        self.stalled = False
+
+        self.vehicles = {}
+        self.vehicle_titles = {}
+        for idx in range(vehicles):
+            self.add_vehicle(f"veh-{idx}", f"Car {idx}", payload_settings=payload_settings)
+
+        self.pulses = {f"pulse-{idx}": f"Home {idx}" for idx in range(pulses)}
+        self.measurements = {a_pulse_id: dict(BASE_MEASUREMENT) for a_pulse_id in self.pulses}
+
+        # hourly prices of a single home - starting yesterday (UTC), so that 'today' & 'tomorrow' of every
+        # timezone are covered
+        day = int(time.time() // 86400) * 86400 - 86400
+        self.prices = [{"startsAt": time.strftime("%Y-%m-%dT%H:%M:%S.000+00:00", time.gmtime(day + idx * 3600)),
+                        "total": round(0.25 + 0.1 * ((idx * 7) % 11) / 10, 4), "currency": "EUR"} for idx in range(96)]
+
+        self.requests = Counter()
+        self.status_codes = Counter()
+        self.bytes_sent = 0
+        self.frames_sent = 0
+        self.ws_connections = 0
+
+        self._tokens = set()
+        self._refresh_tokens = set()
+        self._ws_clients = set()
+        self._runner = None
+        self._site = None
+        self.port = None
+
+    # ---- scenario helpers -----------------------------------------------------------------------------------
+
+    def add_vehicle(self, vehicle_id: str, title: str, payload_settings: int = 0):
+        data = copy.deepcopy(BASE_VEHICLE)
+        # padding the payload with (unused) settings to simulate large responses
+        for idx in range(payload_settings):
+            data["userSettings"].append({"key": f"online.vehicle.padding.setting{idx}", "value": idx})
+        self.vehicles[vehicle_id] = data
+        self.vehicle_titles[vehicle_id] = title
+
+    def set_vehicle(self, vehicle_id: str, **changes):
+        self.vehicles[vehicle_id].update(changes)
+
+    def set_battery_level(self, vehicle_id: str, level: int):
+        self.vehicles[vehicle_id]["battery"]["level"] = level
+
+    def set_settings(self, vehicle_id: str, settings: dict):
+        items = [item for item in self.vehicles[vehicle_id]["userSettings"] if item["key"] not in settings]
+        items.extend({"key": a_key, "value": a_value} for a_key, a_value in settings.items())
+        self.vehicles[vehicle_id]["userSettings"] = items
+
+    def set_measurement(self, pulse_id: str, **changes):
+        self.measurements[pulse_id].update(changes)
+
+    def expire_tokens(self):
+        # all issued access tokens become invalid (refresh tokens stay valid)
+        self._tokens.clear()
+
+    def reset_counters(self):
+        self.requests.clear()
+        self.status_codes.clear()
+        self.bytes_sent = 0
+        self.frames_sent = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def login_url(self) -> str:
+        return f"{self.base_url}/login.credentials"
+
+    @property
+    def refresh_url(self) -> str:
+        return f"{self.base_url}/auth-sessions/{uuid.uuid4()}"
+
+    @property
+    def data_url(self) -> str:
+        return f"{self.base_url}/v4/gql"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/v4/gql/ws"
+
+    # ---- server lifecycle -----------------------------------------------------------------------------------
+
+    async def start(self, port: int = 0):
+        app = web.Application()
+        app.router.add_post("/login.credentials", self._handle_login)
+        app.router.add_put("/auth-sessions/{session_id}", self._handle_refresh)
+        app.router.add_post("/v4/gql", self._handle_gql)
+        app.router.add_get("/v4/gql/ws", self._handle_ws)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        self._site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await self._site.start()
+        self.port = self._site._server.sockets[0].getsockname()[1]
+        _LOGGER.debug(f"tibber stand-in listening on {self.base_url}")
+
+    async def stop(self):
+        for a_ws in list(self._ws_clients):
+            await a_ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # ---- handlers -------------------------------------------------------------------------------------------
+
+    async def _delay(self):
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    def _response(self, endpoint: str, status: int, data=None) -> web.Response:
+        self.status_codes[(endpoint, status)] += 1
+        if data is None:
+            return web.Response(status=status)
+        body = json.dumps(data).encode()
+        self.bytes_sent += len(body)
+        return web.Response(status=status, body=body, content_type="application/json")
+
+    def _is_authorized(self, request: web.Request) -> bool:
+        if self.reject_next > 0:
+            self.reject_next -= 1
+            return False
+        return request.headers.get("Authorization") in self._tokens
+
+    def _issue_tokens(self) -> dict:
+        token = make_token(self.token_lifetime)
+        refresh_token = uuid.uuid4().hex
+        self._tokens.add(token)
+        self._refresh_tokens.add(refresh_token)
+        return {"token": token, "refreshToken": refresh_token}
+
+    async def _handle_login(self, request: web.Request) -> web.Response:
+        self.requests["login"] += 1
+        await self._delay()
+        form = await request.post()
+        if (self.user is not None and form.get("email") != self.user) or (self.pwd is not None and form.get("password") != self.pwd):
+            return self._response("login", 400, {"error": "invalid credentials"})
+        return self._response("login", 200, self._issue_tokens())
+
+    async def _handle_refresh(self, request: web.Request) -> web.Response:
+        self.requests["refresh"] += 1
+        await self._delay()
+        refresh_token = request.headers.get("Authorization")
+        if refresh_token not in self._refresh_tokens:
+            return self._response("refresh", 401)
+        self._refresh_tokens.discard(refresh_token)
+        return self._response("refresh", 200, self._issue_tokens())
+
+    async def _handle_gql(self, request: web.Request) -> web.Response:
+        await self._delay()
+        body = await request.json()
+        query = body.get("query", "")
+        if "myVehicles" in query:
+            endpoint = "vehicle_ids"
+        elif "GizmoQuery" in query:
+            endpoint = "gizmos"
+        elif "PriceQuery" in query:
+            endpoint = "prices"
+        elif "SetVehicleSettings" in query:
+            endpoint = "settings"
+        else:
+            endpoint = "vehicles"
+        self.requests[endpoint] += 1
+
+        if not self._is_authorized(request):
+            return self._response(endpoint, 401)
+
+        if endpoint == "vehicle_ids":
+            me = {"myVehicles": {"vehicles": [{"id": a_id, "title": a_title} for a_id, a_title in self.vehicle_titles.items()]}}
+        elif endpoint == "gizmos":
+            me = {"homes": [{"id": f"home-{idx}", "title": a_title, "gizmos": [
+                {"__typename": "Gizmo", "id": a_pulse_id, "title": "Pulse", "type": "REAL_TIME_METER"}]}
+                            for idx, (a_pulse_id, a_title) in enumerate(self.pulses.items())]}
+        elif endpoint == "prices":
+            me = {"homes": [{"id": "home-0", "currentSubscription": {"priceInfo": {"today": self.prices[:48],
+                                                                                   "tomorrow": self.prices[48:]}}}]}
+        elif endpoint == "settings":
+            variables = body.get("variables") or {}
+            a_vehicle_id = variables.get("vehicleId")
+            self.set_settings(a_vehicle_id, {item["key"]: item["value"] for item in variables.get("settings", [])})
+            me = {"setVehicleSettings": {"id": a_vehicle_id}}
+        else:
+            me = {}
+            for match in VEHICLE_ALIAS_PATTERN.finditer(query):
+                alias, a_vehicle_id = match.groups()
+                me[alias if alias is not None else "vehicle"] = apply_selection(self.vehicles.get(a_vehicle_id),
+                                                                                parse_selection(query, match.end()))
+
+        return self._response(endpoint, 200, {"data": {"me": me}})
+
+    async def _handle_ws(self, request: web.Request) -> web.StreamResponse:
+        self.requests["ws"] += 1
+        await self._delay()
+        if not self._is_authorized(request):
+            return self._response("ws", 401)
+
+        ws = web.WebSocketResponse(protocols=("graphql-transport-ws",))
+        await ws.prepare(request)
+        self.ws_connections += 1
+        self._ws_clients.add(ws)
+        subscriptions = {}
+        ka_task = asyncio.create_task(self._async_keep_alive(ws))
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                if data.get("type") == "connection_init":
+                    await ws.send_json({"type": "connection_ack"})
+                elif data.get("type") == "subscribe":
+                    a_pulse_id = data["payload"]["variables"]["deviceId"]
+                    if a_pulse_id not in self.pulses:
+                        await ws.send_json({"type": "error", "id": data["id"], "payload": [{"message": "unknown device"}]})
+                        continue
+                    subscriptions[data["id"]] = asyncio.create_task(self._async_push_frames(ws, data["id"], a_pulse_id))
+                elif data.get("type") == "complete":
+                    a_task = subscriptions.pop(data.get("id"), None)
+                    if a_task is not None:
+                        a_task.cancel()
+                elif data.get("type") == "ping" and not self.stalled:
+                    await ws.send_json({"type": "pong"})
+        finally:
+            ka_task.cancel()
+            for a_task in subscriptions.values():
+                a_task.cancel()
+            self._ws_clients.discard(ws)
+        return ws
+
+    async def _async_keep_alive(self, ws: web.WebSocketResponse):
+        while not ws.closed:
+            await asyncio.sleep(self.ka_interval)
+            if not self.stalled:
+                await ws.send_json({"type": "ka"})
+
+    async def _async_push_frames(self, ws: web.WebSocketResponse, subscribe_id: str, pulse_id: str):
+        while not ws.closed:
+            if self.stalled:
+                await asyncio.sleep(self.frame_interval)
+                continue
+            measurement = dict(self.measurements[pulse_id])
+            measurement["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S.000+00:00", time.gmtime())
+            await ws.send_json({"type": "next", "id": subscribe_id, "payload": {"data": {"liveMeasurement": measurement}}})
+            self.frames_sent += 1
+            await asyncio.sleep(self.frame_interval)
+
+
+async def _main():
+    import argparse
+    parser = argparse.ArgumentParser(description="offline tibber API stand-in")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--vehicles", type=int, default=1)
+    parser.add_argument("--pulses", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--payload-settings", type=int, default=0)
+    args = parser.parse_args()
+
+    standin = TibberStandIn(vehicles=args.vehicles, pulses=args.pulses, latency=args.latency, payload_settings=args.payload_settings)
+    await standin.start(args.port)
+    print(f"tibber stand-in running at {standin.base_url} [ws: {standin.ws_url}]")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await standin.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,27 @@
+from custom_components.tibber_graphapi.codec import TibberGraphApiFrameDecoder, FRAME_TYPE_KA, FRAME_TYPE_NEXT
+
+
+def test_prescan_rejects_keep_alive_and_unknown_subscriptions():
+    decoder = TibberGraphApiFrameDecoder()
+    assert decoder.decode('{"type":"ka"}', {"a": "p1"}) == (FRAME_TYPE_KA, None)
+    assert decoder.decode(b'{"id":"b","type":"next","payload":{"data":{}}}', {"a": "p1"}) == (FRAME_TYPE_NEXT, None)
+    assert decoder.rejected == 2 and decoder.decoded == 0
+
+
+def test_prescan_decodes_known_subscriptions():
+    decoder = TibberGraphApiFrameDecoder()
+    frame_type, data = decoder.decode(b'{"id":"a","type":"next","payload":{"data":{"liveMeasurement":{"power":1}}}}', {"a": "p1"})
+    assert frame_type == FRAME_TYPE_NEXT and data["payload"]["data"]["liveMeasurement"]["power"] == 1
+    assert decoder.decode('{"type" : "connection_ack"}', {})[0] == "connection_ack"
+    assert decoder.rejected == 0 and decoder.decoded == 2
+
+
+def test_prescan_with_reordered_keys():
+    decoder = TibberGraphApiFrameDecoder()
+    # 'id' & 'type' behind the payload (which has members with the same names) - nothing must be dropped
+    frame_type, data = decoder.decode(b'{"payload":{"data":{"liveMeasurement":{"power":2,"type":"ka","id":"b"}}},"id":"a","type":"next"}', {"a": "p1"})
+    assert frame_type == FRAME_TYPE_NEXT and data["payload"]["data"]["liveMeasurement"]["power"] == 2
+    frame_type, data = decoder.decode('{"type":"next","payload":{"id":"b"},"id":"a"}', {"a": "p1"})
+    assert frame_type == FRAME_TYPE_NEXT and data["id"] == "a"
+    assert decoder.decode('{"payload":{"type":"ka"},"type":"next","id":"a"}', {"a": "p1"})[0] == FRAME_TYPE_NEXT
+    assert decoder.rejected == 0 and decoder.decoded == 3
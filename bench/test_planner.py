@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timezone
+
+from custom_components.tibber_graphapi.planner import TibberGraphApiChargePlanner, charging_duration, next_deadline
+
+START = 1_000_000
+SLOT = 3600
+
+
+def _planner(prices: list, generation=1, gap_after: int = None) -> TibberGraphApiChargePlanner:
+    slots = []
+    for idx, a_price in enumerate(prices):
+        a_start = START + idx * SLOT
+        if gap_after is not None and idx > gap_after:
+            a_start += SLOT
+        slots.append((a_start, a_price))
+    planner = TibberGraphApiChargePlanner()
+    planner.set_prices(slots, generation)
+    return planner
+
+
+def _slot_indexes(plan: dict) -> list:
+    return [(a_start - START) // SLOT for a_start, _, _ in plan["slots"]]
+
+
+def test_cheapest_slots_and_window():
+    planner = _planner([0.30, 0.10, 0.35, 0.12, 0.11, 0.40])
+    plan = planner.plan(START, 3 * SLOT, START + 6 * SLOT)
+    assert plan["needed"] == 3 and plan["complete"]
+    assert _slot_indexes(plan) == [1, 3, 4]
+    assert abs(plan["mean_price"] - 0.11) < 1e-9
+    # the cheapest contiguous window: slots 1..3 (0.57) - the cheapest slots are not contiguous
+    assert plan["window_start"] == START + SLOT and plan["window_end"] == START + 4 * SLOT
+    assert abs(plan["window_mean_price"] - 0.57 / 3) < 1e-9
+
+
+def test_equal_prices_prefer_the_earlier_slot():
+    planner = _planner([0.2, 0.1, 0.1, 0.1])
+    assert _slot_indexes(planner.plan(START, 2 * SLOT, START + 4 * SLOT)) == [1, 2]
+
+
+def test_deadline_and_running_slot():
+    planner = _planner([0.1, 0.5, 0.4, 0.05])
+    # the running slot (0) is still part of the plan, the slot that ends after the deadline (3) is not
+    plan = planner.plan(START + 1800, 2 * SLOT, START + 3 * SLOT + 1800)
+    assert _slot_indexes(plan) == [0, 2]
+    assert planner.is_active(plan, START + 1800) and not planner.is_active(plan, START + SLOT)
+
+
+def test_incomplete_plan():
+    planner = _planner([0.1, 0.2])
+    plan = planner.plan(START, 3 * SLOT, START + 10 * SLOT)
+    assert not plan["complete"] and len(plan["slots"]) == 2 and plan["window_start"] is None
+
+
+def test_window_is_restarted_on_gaps():
+    # a gap after slot 1 - the slots 1 & 2 are not contiguous
+    planner = _planner([0.5, 0.1, 0.1, 0.3], gap_after=1)
+    plan = planner.plan(START, 2 * SLOT, START + 10 * SLOT)
+    assert _slot_indexes(plan) == [1, 3]
+    assert plan["window_start"] == START + 3 * SLOT
+
+
+def test_plan_is_cached():
+    planner = _planner([0.3, 0.1, 0.2])
+    plan = planner.plan(START, SLOT, START + 3 * SLOT)
+    # same slots - the plan is reused
+    assert planner.plan(START + 60, SLOT, START + 3 * SLOT + 60) is plan
+    planner.set_prices([(START, 0.3), (START + SLOT, 0.4), (START + 2 * SLOT, 0.2)], 2)
+    assert _slot_indexes(planner.plan(START, SLOT, START + 3 * SLOT)) == [2]
+
+
+def test_matches_brute_force():
+    rnd = random.Random(3)
+    for generation in range(200):
+        prices = [round(rnd.uniform(0, 1), 2) for _ in range(rnd.randint(1, 24))]
+        planner = _planner(prices, generation)
+        needed = rnd.randint(1, 6)
+        deadline = START + rnd.randint(0, len(prices)) * SLOT
+        plan = planner.plan(START, needed * SLOT, deadline)
+        candidates = [idx for idx in range(len(prices)) if START + (idx + 1) * SLOT <= deadline]
+        assert _slot_indexes(plan) == sorted(sorted(candidates, key=lambda idx: (prices[idx], idx))[:needed])
+
+
+def test_charging_duration():
+    assert charging_duration(50, 80, 10) == 3 * 3600
+    assert charging_duration(50, None, 25) == 2 * 3600
+    assert charging_duration(90, 80, 10) == 0
+    assert charging_duration(None, 80, 10) is None and charging_duration(50, 80, 0) is None
+
+
+def test_next_deadline():
+    now = datetime(2024, 1, 1, 10, 30, tzinfo=timezone.utc)
+    assert next_deadline(7, now).day == 2
+    assert next_deadline(12, now) > now
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.tibber_graphapi import pulse
+from custom_components.tibber_graphapi.const import PULSE_MAX_WINDOW_FACTOR
+from custom_components.tibber_graphapi.pulse import TibberGraphApiPulseCoalescer
+
+
+@pytest.fixture
+def coalescer(monkeypatch, manual_timers):
+    monkeypatch.setattr(pulse, "async_call_later", manual_timers.call_later)
+    monkeypatch.setattr(pulse, "time", SimpleNamespace(monotonic=manual_timers.monotonic))
+    published = []
+    a_coalescer = TibberGraphApiPulseCoalescer(None, lambda data, keys: published.append((data, keys)), window=5)
+    a_coalescer.published_updates = published
+    return a_coalescer
+
+
+def test_frames_within_the_window_are_merged(coalescer, manual_timers):
+    coalescer.async_add_frame({"timestamp": "01", "power": 100, "voltagePhase1": 230.0})
+    coalescer.async_add_frame({"timestamp": "02", "power": 150})
+    assert coalescer.published_updates == []
+    manual_timers.advance(5)
+    assert len(coalescer.published_updates) == 1
+    data, keys = coalescer.published_updates[0]
+    assert data["power"] == 150 and data["voltagePhase1"] == 230.0
+    assert keys == {"timestamp", "power", "voltagePhase1", "framesMerged", "framesDropped"}
+    assert coalescer.frames_merged == 1
+
+
+def test_deadbands(coalescer, manual_timers):
+    coalescer.async_add_frame({"timestamp": "01", "power": 1000, "voltagePhase1": 230.0, "currentPhase1": 4.0})
+    manual_timers.advance(5)
+    # power: max(5 W, 1%) = 10 W, voltage: 1 V, current: 0.1 A
+    coalescer.async_add_frame({"timestamp": "02", "power": 1009, "voltagePhase1": 230.9, "currentPhase1": 4.05})
+    manual_timers.advance(5)
+    assert coalescer.published_updates[-1][1] == {"timestamp", "framesMerged", "framesDropped"}
+    assert coalescer.published["power"] == 1000
+    coalescer.async_add_frame({"timestamp": "03", "power": 1011, "voltagePhase1": 228.5, "currentPhase1": 4.0})
+    manual_timers.advance(5)
+    assert coalescer.published_updates[-1][1] == {"timestamp", "power", "voltagePhase1", "framesMerged", "framesDropped"}
+    assert coalescer.published["power"] == 1011 and coalescer.published["currentPhase1"] == 4.0
+
+
+def test_out_of_order_frames_are_dropped(coalescer, manual_timers):
+    coalescer.async_add_frame({"timestamp": "02", "power": 100})
+    coalescer.async_add_frame({"timestamp": "01", "power": 900})
+    manual_timers.advance(5)
+    assert coalescer.published["power"] == 100 and coalescer.frames_dropped == 1
+
+
+def test_backpressure(coalescer, manual_timers):
+    coalescer.async_add_frame({"timestamp": "01", "power": 100})
+    # the flush is 3 seconds late - the window is doubled
+    manual_timers.advance(8)
+    assert coalescer._factor == 2
+
+    # while we are behind, a new frame replaces the pending one (instead of being merged)
+    coalescer.async_add_frame({"timestamp": "02", "power": 200, "voltagePhase1": 230.0})
+    coalescer.async_add_frame({"timestamp": "03", "power": 300})
+    assert manual_timers.pending == [10]
+    assert coalescer.frames_dropped == 1 and coalescer.frames_merged == 0
+    manual_timers.advance(10)
+    assert coalescer.published["power"] == 300 and "voltagePhase1" not in coalescer.published
+
+    # in time again - the window shrinks back
+    coalescer.async_add_frame({"timestamp": "04", "power": 400})
+    manual_timers.advance(5)
+    assert coalescer._factor == 1
+
+
+def test_backpressure_is_limited(coalescer, manual_timers):
+    for idx in range(10):
+        coalescer.async_add_frame({"timestamp": f"{idx:02d}", "power": idx * 100})
+        manual_timers.advance(1000)
+    assert coalescer._factor == PULSE_MAX_WINDOW_FACTOR
+
+
+def test_without_window_every_frame_is_published():
+    published = []
+    a_coalescer = TibberGraphApiPulseCoalescer(None, lambda data, keys: published.append(keys), window=0)
+    a_coalescer.async_add_frame({"timestamp": "01", "power": 100})
+    a_coalescer.async_add_frame({"timestamp": "02", "power": 200})
+    assert len(published) == 2
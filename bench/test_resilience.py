@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.tibber_graphapi import resilience
+from custom_components.tibber_graphapi.resilience import (
+    TibberGraphApiCircuitBreaker,
+    TibberGraphApiRetryPolicy,
+    BREAKER_CLOSED,
+    BREAKER_OPEN,
+    BREAKER_HALF_OPEN
+)
+
+
+@pytest.fixture
+def breaker(monkeypatch, manual_timers):
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=manual_timers.monotonic))
+    return TibberGraphApiCircuitBreaker(threshold=3, cooldown_min=10, cooldown_max=25)
+
+
+def test_breaker_opens_after_threshold(breaker):
+    for _ in range(2):
+        breaker.record_failure("503")
+    assert breaker.state == BREAKER_CLOSED and breaker.allow_request()
+    breaker.record_failure("503")
+    assert breaker.state == BREAKER_OPEN and breaker.trips == 1
+    assert not breaker.allow_request() and breaker.rejected == 1
+
+
+def test_success_resets_the_failures(breaker):
+    breaker.record_failure("503")
+    breaker.record_failure("503")
+    breaker.record_success()
+    breaker.record_failure("503")
+    assert breaker.state == BREAKER_CLOSED and breaker.failures == 1
+
+
+def test_half_open_allows_a_single_probe(breaker, manual_timers):
+    for _ in range(3):
+        breaker.record_failure("503")
+    manual_timers.advance(9)
+    assert not breaker.allow_request()
+    manual_timers.advance(1)
+    assert breaker.allow_request() and breaker.state == BREAKER_HALF_OPEN
+    assert not breaker.allow_request()
+
+    # the probe succeeded
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED and breaker.failures == 0 and breaker.allow_request()
+
+
+def test_failed_probe_doubles_the_cooldown(breaker, manual_timers):
+    for _ in range(3):
+        breaker.record_failure("503")
+    for expected_cooldown in (20, 25, 25):
+        manual_timers.advance(breaker.as_dict()["cooldown"])
+        assert breaker.allow_request()
+        breaker.record_failure("timeout")
+        assert breaker.state == BREAKER_OPEN and breaker.as_dict()["cooldown"] == expected_cooldown
+    assert breaker.trips == 4
+
+
+def test_released_probe(breaker, manual_timers):
+    for _ in range(3):
+        breaker.record_failure("503")
+    manual_timers.advance(10)
+    assert breaker.allow_request()
+    # the probe has been cancelled - the next request may probe again
+    breaker.release_probe()
+    assert breaker.allow_request() and not breaker.allow_request()
+
+
+def test_retry_delays_are_capped():
+    policy = TibberGraphApiRetryPolicy(attempts=0, base=1, cap=3)
+    assert policy.attempts == 1
+    assert all(0 <= policy.delay(attempt) <= min(3, 2 ** attempt) for attempt in range(8) for _ in range(20))
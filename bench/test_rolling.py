@@ -0,0 +1,95 @@
+import random
+
+from custom_components.tibber_graphapi.rolling import TibberGraphApiRollingAggregate, TibberGraphApiPulseAggregates
+
+WINDOWS = (60, 300, 900)
+RESOLUTION = 10
+
+
+def _expected(samples: list, now: float) -> list:
+    # brute force: all samples of the buckets, that are (still) part of a window
+    head = int(now // RESOLUTION)
+    result = []
+    for a_window in WINDOWS:
+        values = [a_value for a_time, a_value in samples if int(a_time // RESOLUTION) > head - a_window // RESOLUTION]
+        if len(values) == 0:
+            result.append((None, None, None))
+        else:
+            result.append((sum(values) / len(values), min(values), max(values)))
+    return result
+
+
+def _assert_values(aggregate, samples, now):
+    for (a_mean, a_min, a_max), (e_mean, e_min, e_max) in zip(aggregate.values(now), _expected(samples, now)):
+        assert a_min == e_min and a_max == e_max
+        assert (a_mean is None and e_mean is None) or abs(a_mean - e_mean) < 1e-6
+
+
+def test_buckets_leave_the_windows():
+    aggregate = TibberGraphApiRollingAggregate(WINDOWS, RESOLUTION)
+    aggregate.add(1000, 50)
+    aggregate.add(1005, 10)
+    assert aggregate.values(1005) == [(30, 10, 50)] * 3
+    # the first bucket has left the 1 minute window - but not the others
+    assert aggregate.values(1060) == [(None, None, None), (30, 10, 50), (30, 10, 50)]
+    aggregate.add(1060, 20)
+    assert aggregate.values(1060) == [(20, 20, 20), (80 / 3, 10, 50), (80 / 3, 10, 50)]
+    assert aggregate.values(1299) == [(None, None, None), (80 / 3, 10, 50), (80 / 3, 10, 50)]
+    assert aggregate.values(1300) == [(None, None, None), (20, 20, 20), (80 / 3, 10, 50)]
+    assert aggregate.values(1960) == [(None, None, None)] * 3
+
+
+def test_min_max_after_eviction():
+    aggregate = TibberGraphApiRollingAggregate(WINDOWS, RESOLUTION)
+    # a descending & then ascending series - the extremes leave the window one after the other
+    samples = [(1000 + idx * 10, abs(30 - idx)) for idx in range(60)]
+    for a_time, a_value in samples:
+        aggregate.add(a_time, a_value)
+        _assert_values(aggregate, samples[:samples.index((a_time, a_value)) + 1], a_time)
+
+
+def test_gap_larger_than_the_ring_buffer():
+    aggregate = TibberGraphApiRollingAggregate(WINDOWS, RESOLUTION)
+    aggregate.add(1000, 5)
+    aggregate.add(1000 + 5000, 7)
+    assert aggregate.values(6000) == [(7, 7, 7)] * 3
+
+
+def test_late_samples_are_ignored():
+    aggregate = TibberGraphApiRollingAggregate(WINDOWS, RESOLUTION)
+    aggregate.add(1100, 5)
+    aggregate.add(1050, 100)
+    assert aggregate.values(1100) == [(5, 5, 5)] * 3
+
+
+def test_matches_brute_force():
+    rnd = random.Random(7)
+    aggregate = TibberGraphApiRollingAggregate(WINDOWS, RESOLUTION)
+    samples = []
+    now = 1000.0
+    for _ in range(2000):
+        now += rnd.choice((0.5, 2, 2, 3, 45, 0.1, 400 if rnd.random() < 0.01 else 1))
+        a_value = rnd.uniform(-100, 5000)
+        aggregate.add(now, a_value)
+        samples.append((now, a_value))
+        if rnd.random() < 0.1:
+            # reading the values moves the head of the ring buffer, too
+            now += rnd.uniform(0, 300)
+            _assert_values(aggregate, samples, now)
+
+
+def test_energy_integration():
+    aggregates = TibberGraphApiPulseAggregates()
+    for a_second in range(0, 3601, 2):
+        aggregates.add_frame({"power": 1000, "powerProduction": 0}, now=float(a_second))
+    values = aggregates.as_dict(now=3600.0)
+    assert values["energyConsumption"] == 1.0 and values["energyProduction"] == 0
+    assert values["powerMean5m"] == 1000 and values["powerMax1m"] == 1000
+    assert values["currentPhase1Mean1m"] is None
+
+
+def test_energy_gaps_are_not_bridged():
+    aggregates = TibberGraphApiPulseAggregates()
+    aggregates.add_frame({"power": 1000}, now=0.0)
+    aggregates.add_frame({"power": 1000}, now=3600.0)
+    assert aggregates.energy["power"] == 0
@@ -0,0 +1,46 @@
+from custom_components.tibber_graphapi.scheduler import (
+    TibberGraphApiPollScheduler,
+    POLL_STATE_CHARGING,
+    POLL_STATE_PLUGGED,
+    POLL_STATE_IDLE
+)
+
+CHARGING = {"isCharging": True, "chargingStatus": "CHARGING", "isAlive": True}
+PLUGGED = {"isCharging": False, "chargingStatus": "NOT_CHARGING", "isAlive": True}
+DISCONNECTED = {"isCharging": False, "chargingStatus": "DISCONNECTED", "isAlive": True}
+
+
+def _seconds(scheduler, data) -> int:
+    return int(scheduler.next_interval(data).total_seconds())
+
+
+def test_classify():
+    assert TibberGraphApiPollScheduler.classify(CHARGING) == POLL_STATE_CHARGING
+    assert TibberGraphApiPollScheduler.classify(PLUGGED) == POLL_STATE_PLUGGED
+    assert TibberGraphApiPollScheduler.classify(DISCONNECTED) == POLL_STATE_IDLE
+    assert TibberGraphApiPollScheduler.classify({"isAlive": False}) == POLL_STATE_IDLE
+    assert TibberGraphApiPollScheduler.classify(None) is None
+
+
+def test_idle_backoff():
+    scheduler = TibberGraphApiPollScheduler(scan_interval=60, min_interval=30, max_interval=600)
+    assert [_seconds(scheduler, DISCONNECTED) for _ in range(6)] == [60, 120, 240, 480, 600, 600]
+    # no data - the interval is kept
+    assert _seconds(scheduler, None) == 600
+
+
+def test_backoff_is_reset():
+    scheduler = TibberGraphApiPollScheduler(scan_interval=60, min_interval=30, max_interval=600)
+    for _ in range(4):
+        scheduler.next_interval(DISCONNECTED)
+    assert _seconds(scheduler, CHARGING) == 30
+    assert _seconds(scheduler, PLUGGED) == 60
+    assert _seconds(scheduler, DISCONNECTED) == 60
+
+
+def test_intervals_are_limited():
+    scheduler = TibberGraphApiPollScheduler(scan_interval=10, min_interval=30, max_interval=20)
+    # max is at least min, the scan interval is within [min, max]
+    assert _seconds(scheduler, PLUGGED) == 30
+    assert _seconds(scheduler, CHARGING) == 30
+    assert [_seconds(scheduler, DISCONNECTED) for _ in range(3)] == [30, 30, 30]
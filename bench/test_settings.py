@@ -0,0 +1,143 @@
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.tibber_graphapi import settings
+from custom_components.tibber_graphapi.const import SETTINGS_DEBOUNCE, SETTINGS_MAX_DELAY
+from custom_components.tibber_graphapi.settings import TibberGraphApiSettingsWriter, with_settings
+from custom_components.tibber_graphapi.tags import TGATag
+
+SOC_MAX = TGATag.VEH_SOCMAX.jvaluekey
+SOC_MIN = TGATag.VEH_SOCMIN.jvaluekey
+
+
+class _Bridge:
+
+    def __init__(self):
+        self.mutations = []
+        self.success = True
+        self.cache_resets = 0
+
+    async def set_vehicle_settings(self, a_settings: list) -> bool:
+        self.mutations.append({a_setting["key"]: a_setting["value"] for a_setting in a_settings})
+        return self.success
+
+    def reset_response_cache(self):
+        self.cache_resets += 1
+
+
+class _Coordinator:
+    name_prefix = "Car"
+
+    def __init__(self):
+        self.bridge = _Bridge()
+        self.data = {"isAlive": True, "userSettings": [{"key": SOC_MAX, "value": 80}, {"key": SOC_MIN, "value": 20}]}
+        self.refreshes = 0
+
+    def async_set_local_data(self, data):
+        self.data = data
+
+    async def async_request_refresh(self):
+        self.refreshes += 1
+
+
+class _ConfigEntry:
+    entry_id = "entry"
+
+    def __init__(self):
+        self.tasks = []
+
+    def async_create_background_task(self, _hass, target, name: str):
+        self.tasks.append(target)
+
+
+def _user_settings(data: dict) -> dict:
+    return {item["key"]: item["value"] for item in data["userSettings"]}
+
+
+@pytest.fixture
+def writer(monkeypatch, manual_timers):
+    monkeypatch.setattr(settings, "async_call_later", manual_timers.call_later)
+    monkeypatch.setattr(settings, "time", SimpleNamespace(monotonic=manual_timers.monotonic))
+    a_writer = TibberGraphApiSettingsWriter(None, _ConfigEntry(), _Coordinator())
+    yield a_writer
+    for a_task in a_writer._config_entry.tasks:
+        a_task.close()
+
+
+async def _run_flushes(writer):
+    tasks = writer._config_entry.tasks
+    while len(tasks) > 0:
+        await tasks.pop(0)
+
+
+async def test_changes_are_debounced_and_coalesced(writer, manual_timers):
+    writer.async_set(TGATag.VEH_SOCMAX, 85)
+    # the new value is shown right away
+    assert _user_settings(writer._coordinator.data)[SOC_MAX] == 85
+    manual_timers.advance(1)
+    writer.async_set(TGATag.VEH_SOCMAX, 90)
+    writer.async_set(TGATag.VEH_SOCMIN, 30)
+    assert manual_timers.pending == [SETTINGS_DEBOUNCE]
+    manual_timers.advance(SETTINGS_DEBOUNCE - 0.1)
+    assert len(writer._config_entry.tasks) == 0
+
+    manual_timers.advance(0.1)
+    await _run_flushes(writer)
+    assert writer._coordinator.bridge.mutations == [{SOC_MAX: 90, SOC_MIN: 30}]
+    assert writer.mutations == 1 and not writer.has_pending
+    assert writer._coordinator.bridge.cache_resets == 1
+
+
+async def test_max_delay(writer, manual_timers):
+    # a slider that is moved all the time - the mutation is sent SETTINGS_MAX_DELAY seconds after the first change
+    for idx in range(int(SETTINGS_MAX_DELAY) * 2):
+        writer.async_set(TGATag.VEH_SOCMAX, 50 + idx)
+        manual_timers.advance(1)
+        if len(writer._config_entry.tasks) > 0:
+            break
+    assert manual_timers.now - 1000 == SETTINGS_MAX_DELAY
+    await _run_flushes(writer)
+    assert writer._coordinator.bridge.mutations == [{SOC_MAX: 54}]
+
+
+async def test_polled_data_does_not_revert_pending_changes(writer, manual_timers):
+    writer.async_set(TGATag.VEH_SOCMAX, 95)
+    polled = {"isAlive": False, "userSettings": [{"key": SOC_MAX, "value": 80}, {"key": SOC_MIN, "value": 20}]}
+    merged = writer.apply_pending(polled)
+    assert _user_settings(merged) == {SOC_MAX: 95, SOC_MIN: 20} and merged["isAlive"] is False
+    # the polled data itself stays untouched
+    assert _user_settings(polled)[SOC_MAX] == 80
+
+    manual_timers.advance(SETTINGS_DEBOUNCE)
+    await _run_flushes(writer)
+    assert writer.apply_pending(polled) is polled
+
+
+async def test_failed_mutation_requests_a_refresh(writer, manual_timers):
+    writer._coordinator.bridge.success = False
+    writer.async_set(TGATag.VEH_SOCMIN, 40)
+    manual_timers.advance(SETTINGS_DEBOUNCE)
+    await _run_flushes(writer)
+    assert writer.failures == 1 and writer._coordinator.refreshes == 1 and not writer.has_pending
+    assert writer._coordinator.bridge.cache_resets == 0
+
+
+async def test_stop_flushes_pending_changes(writer, manual_timers):
+    writer.async_set(TGATag.VEH_SOCMAX, 70)
+    await writer.async_stop()
+    assert writer._coordinator.bridge.mutations == [{SOC_MAX: 70}] and manual_timers.pending == []
+
+
+def test_only_writeable_tags(writer):
+    with pytest.raises(ValueError):
+        writer.async_set(TGATag.VEH_ALIVE, False)
+
+
+def test_with_settings():
+    data = {"userSettings": [{"key": SOC_MAX, "value": 80}]}
+    assert with_settings(data, "userSettings", {}) is data
+    assert with_settings(None, "userSettings", {SOC_MAX: 1}) is None
+    changed = with_settings(data, "userSettings", {SOC_MAX: 90, SOC_MIN: 10})
+    assert _user_settings(changed) == {SOC_MAX: 90, SOC_MIN: 10}
+    assert _user_settings(data) == {SOC_MAX: 80}
@@ -1,22 +1,41 @@
 import asyncio
+import hashlib
 import json
 import logging
 import re
-import uuid
+import time
 from datetime import timedelta
 from typing import Final
 
-import aiohttp
 import voluptuous as vol
-from aiohttp import ClientConnectionError
+from aiohttp import ClientError
 from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.const import CONF_USERNAME, CONF_SCAN_INTERVAL, CONF_PASSWORD
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.entity import EntityDescription, Entity
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.helpers.update_coordinator import UpdateFailed
 
+from custom_components.tibber_graphapi.account import (
+    TibberGraphApiAccount,
+    async_get_account,
+    async_release_account,
+    async_remove_account_data
+)
+from custom_components.tibber_graphapi.auth import TibberGraphApiAuth
+from custom_components.tibber_graphapi.codec import json_dumps, json_loads
+from custom_components.tibber_graphapi.coordinator import TibberGraphApiBaseCoordinator
+from custom_components.tibber_graphapi.discovery import TibberGraphApiDiscovery, DISCOVERY_VEHICLES, DISCOVERY_PULSES
+from custom_components.tibber_graphapi.metrics import (
+    ENDPOINT_VEHICLE,
+    ENDPOINT_VEHICLES,
+    ENDPOINT_VEHICLE_ID,
+    ENDPOINT_PULSE_IDS,
+    ENDPOINT_PRICES,
+    ENDPOINT_HISTORY,
+    ENDPOINT_SETTINGS
+)
 from custom_components.tibber_graphapi.const import (
     DOMAIN,
     MANUFACTURE,
@@ -25,11 +44,40 @@ from custom_components.tibber_graphapi.const import (
     DEFAULT_VEHINDEX_NUMBER,
     CONF_VEHINDEX_NUMBER,
     CONF_TIBBER_VEHICLE_ID,
-    CONF_TIBBER_VEHICLE_NAME
+    CONF_TIBBER_VEHICLE_NAME,
+    CONF_FLEET_POLLING,
+    CONF_PULSE_LIVE,
+    CONF_PULSE_WINDOW,
+    CONF_POLL_MIN_INTERVAL,
+    CONF_POLL_MAX_INTERVAL,
+    CONF_STATISTICS_IMPORT,
+    CONF_CHARGE_PLANNER,
+    CONF_CHARGING_HISTORY,
+    DEFAULT_FLEET_POLLING,
+    DEFAULT_PULSE_LIVE,
+    DEFAULT_PULSE_WINDOW,
+    DEFAULT_POLL_MIN_INTERVAL,
+    DEFAULT_POLL_MAX_INTERVAL,
+    DEFAULT_STATISTICS_IMPORT,
+    DEFAULT_CHARGE_PLANNER,
+    DEFAULT_CHARGING_HISTORY,
+    HISTORY_PAGE_SIZE
 )
+from custom_components.tibber_graphapi.history import TibberGraphApiChargingHistoryCoordinator, async_remove_history_data
+from custom_components.tibber_graphapi.planner import TibberGraphApiChargePlanCoordinator
+from custom_components.tibber_graphapi.pulse import TibberGraphApiPulseCoordinator
+from custom_components.tibber_graphapi.resilience import (
+    TibberGraphApiCircuitBreaker,
+    TibberGraphApiRetryPolicy,
+    TibberGraphApiUnavailable,
+    RETRY_STATUS_CODES
+)
+from custom_components.tibber_graphapi.scheduler import TibberGraphApiPollScheduler
+from custom_components.tibber_graphapi.services import async_setup_services
+from custom_components.tibber_graphapi.settings import TibberGraphApiSettingsWriter
+from custom_components.tibber_graphapi.tags import TGATag, build_vehicle_selection
 
 _LOGGER = logging.getLogger(__name__)
-SCAN_INTERVAL = timedelta(seconds=10)
 CONFIG_SCHEMA = vol.Schema({DOMAIN: vol.Schema({})}, extra=vol.ALLOW_EXTRA)
 
 CC_P1: Final = re.compile(r"(.)([A-Z][a-z]+)")
@@ -58,30 +106,73 @@ def mask_map(d):
 
 
 async def async_setup(hass: HomeAssistant, config: dict):
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
-    global SCAN_INTERVAL
-    SCAN_INTERVAL = timedelta(seconds=config_entry.options.get(CONF_SCAN_INTERVAL,
-                                                               config_entry.data.get(CONF_SCAN_INTERVAL,
-                                                                                     DEFAULT_SCAN_INTERVAL)))
+    scan_interval = config_entry.options.get(CONF_SCAN_INTERVAL, config_entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
     _LOGGER.info(
-        f"Starting Tibber GraphAPI with interval: {SCAN_INTERVAL} - ConfigEntry: {mask_map(dict(config_entry.as_dict()))}")
+        f"Starting Tibber GraphAPI with interval: {timedelta(seconds=scan_interval)} - ConfigEntry: {mask_map(dict(config_entry.as_dict()))}")
 
     if DOMAIN not in hass.data:
         value = "UNKOWN"
         hass.data.setdefault(DOMAIN, {"manifest_version": value})
 
-    coordinator = TibberGraphApiDataUpdateCoordinator(hass, config_entry)
+    # all entries of the same tibber account share a single auth broker (and so a single token)
+    account = await async_get_account(hass, config_entry)
+
+    coordinator = TibberGraphApiDataUpdateCoordinator(hass, config_entry, account)
     if not coordinator.last_update_success:
         raise ConfigEntryNotReady
     else:
         await coordinator.init_on_load()
 
+    # the pulses belong to the account - only a single entry (the first one with live data enabled) will own them
+    pulse_live = config_entry.options.get(CONF_PULSE_LIVE, config_entry.data.get(CONF_PULSE_LIVE, DEFAULT_PULSE_LIVE))
+    if pulse_live:
+        if account.claim_pulses(config_entry.entry_id):
+            await coordinator.init_pulse_on_load()
+        else:
+            _LOGGER.debug(f"the pulses of the account are owned by entry '{account.pulse_owner}'")
+            pulse_live = False
+
+    coordinator.owns_metrics = account.claim_metrics(config_entry.entry_id)
+
+    if config_entry.options.get(CONF_CHARGE_PLANNER, config_entry.data.get(CONF_CHARGE_PLANNER, DEFAULT_CHARGE_PLANNER)):
+        coordinator.init_charge_plan_on_load()
+
+    if config_entry.options.get(CONF_CHARGING_HISTORY, config_entry.data.get(CONF_CHARGING_HISTORY, DEFAULT_CHARGING_HISTORY)):
+        await coordinator.init_charging_history_on_load()
+
     hass.data[DOMAIN][config_entry.entry_id] = coordinator
 
+    # the entities will start with their restored states - so we don't wait for tibber before we forward the
+    # setup to the platforms, the first refresh will be done in the background
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    config_entry.async_create_background_task(hass, coordinator.async_refresh(), name=f"{DOMAIN}_first_refresh_{config_entry.entry_id}")
+    if pulse_live:
+        config_entry.async_create_background_task(hass, coordinator.async_verify_pulses(), name=f"{DOMAIN}_verify_pulses_{config_entry.entry_id}")
+    if coordinator.charge_plan is not None:
+        coordinator.charge_plan.start()
+        config_entry.async_create_background_task(hass, coordinator.charge_plan.async_refresh(), name=f"{DOMAIN}_charge_plan_{config_entry.entry_id}")
+
+    if config_entry.options.get(CONF_STATISTICS_IMPORT, config_entry.data.get(CONF_STATISTICS_IMPORT, DEFAULT_STATISTICS_IMPORT)):
+        if "recorder" in hass.config.components:
+            # the recorder should only be imported, when it's really used
+            from custom_components.tibber_graphapi.statistics import TibberGraphApiStatistics
+            await coordinator.async_enable_statistics(TibberGraphApiStatistics(hass, config_entry))
+        else:
+            _LOGGER.warning(f"statistics import is enabled, but the recorder is not available")
+
+    # the entities are in place, so we can start to listen to the pulse websocket(s)
+    for a_pulse_coordinator in coordinator.pulse_coordinators:
+        a_pulse_coordinator.start()
+
+    # the new charging sessions must be passed to the statistics - so the history is read after they are enabled
+    if coordinator.charging_history is not None:
+        coordinator.charging_history.start()
+        config_entry.async_create_background_task(hass, coordinator.charging_history.async_refresh(), name=f"{DOMAIN}_charging_history_{config_entry.entry_id}")
 
     if config_entry.state != ConfigEntryState.LOADED:
         config_entry.add_update_listener(async_reload_entry)
@@ -89,9 +180,9 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     return True
 
 
-class TibberGraphApiDataUpdateCoordinator(DataUpdateCoordinator):
+class TibberGraphApiDataUpdateCoordinator(TibberGraphApiBaseCoordinator):
 
-    def __init__(self, hass: HomeAssistant, config_entry):
+    def __init__(self, hass: HomeAssistant, config_entry, account: TibberGraphApiAccount):
         self._user = config_entry.options.get(CONF_USERNAME, config_entry.data[CONF_USERNAME])
         self._vehicle_index = int(config_entry.options.get(CONF_VEHINDEX_NUMBER, config_entry.data.get(CONF_VEHINDEX_NUMBER, DEFAULT_VEHINDEX_NUMBER)))
         self._vehicle_id = config_entry.options.get(CONF_TIBBER_VEHICLE_ID, config_entry.data.get(CONF_TIBBER_VEHICLE_ID, None))
@@ -99,31 +190,95 @@ class TibberGraphApiDataUpdateCoordinator(DataUpdateCoordinator):
 
         the_pwd = config_entry.options.get(CONF_PASSWORD, config_entry.data[CONF_PASSWORD])
 
+        self._account = account
+
         # support for systems where vehicle index is not 0
         self.bridge = TibberGraphApiBridge(user=self._user, pwd=the_pwd,
                                            a_web_session=async_get_clientsession(hass),
                                            veh_index=self._vehicle_index,
-                                           veh_id=self._vehicle_id)
+                                           veh_id=self._vehicle_id,
+                                           auth=self._account.auth,
+                                           discovery=self._account.discovery,
+                                           breaker=self._account.breaker)
+
+        # fleet mode: all vehicles of the account are polled with a single request
+        self._fleet = None
+        if config_entry.options.get(CONF_FLEET_POLLING, config_entry.data.get(CONF_FLEET_POLLING, DEFAULT_FLEET_POLLING)):
+            self._fleet = self._account.fleet
+            self._fleet.register(self)
+
+        self.pulse_coordinators = []
+        # the metric sensors of the account are provided by a single entry
+        self.owns_metrics = False
+        self.charge_plan = None
+        self.charging_history = None
+        self.settings = TibberGraphApiSettingsWriter(hass, config_entry, self)
+        self.statistics = None
+        self._remove_statistics_listener = None
+        self._extra_query_tags = frozenset()
+        self._query_tags = None
+        self._query_tags_version = None
 
         self.name = config_entry.title
         self._config_entry = config_entry
-        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=SCAN_INTERVAL)
+        # every coordinator has its own (adaptive) update interval
+        self._scheduler = TibberGraphApiPollScheduler(
+            scan_interval=config_entry.options.get(CONF_SCAN_INTERVAL, config_entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)),
+            min_interval=config_entry.options.get(CONF_POLL_MIN_INTERVAL, config_entry.data.get(CONF_POLL_MIN_INTERVAL, DEFAULT_POLL_MIN_INTERVAL)),
+            max_interval=config_entry.options.get(CONF_POLL_MAX_INTERVAL, config_entry.data.get(CONF_POLL_MAX_INTERVAL, DEFAULT_POLL_MAX_INTERVAL)))
+
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=self._scheduler.interval)
+
+    @property
+    def name_prefix(self) -> str:
+        return self._vehicle_name
+
+    @property
+    def metrics(self):
+        return self._account.metrics
+
+    @property
+    def account_id(self) -> str:
+        return self._account.unique_id
+
+    @property
+    def breaker(self):
+        return self._account.breaker
+
+    @property
+    def stream(self):
+        return self._account.stream
+
+    @property
+    def query_tags(self) -> frozenset:
+        # the tags of all (enabled) entities that are listening to this coordinator - disabled entities are
+        # never added to HA, so they don't have a listener
+        if self._query_tags is None or self._query_tags_version != self.listener_version:
+            self._query_tags = frozenset(context for _, context in self._listeners.values() if isinstance(context, TGATag)) | self._extra_query_tags
+            self._query_tags_version = self.listener_version
+        return self._query_tags
+
+    @property
+    def query_fields(self) -> str:
+        return build_vehicle_selection(self.query_tags)
 
     async def init_on_load(self):
+        # the vehicle id & name are part of the config entry (or the cached discovery) - only when they are
+        # completely unknown, we have to ask tibber before the entities can be created
         try:
-            init_data = await self.bridge.update()
-            _LOGGER.debug(f"after init - data: '{self.data}'")
-            if self.data is None or len(self.data) == 0:
-                _LOGGER.debug(f"patch data to: '{init_data}'")
-                self.data = init_data
-
             if self._vehicle_id is None:
                 self._vehicle_id = self.bridge.vehicle_id
-            _LOGGER.debug(f"init_on_load vehicle_id: '{self._vehicle_id}'")
-
             if self._vehicle_name is None:
                 self._vehicle_name = self.bridge.vehicle_name
-            _LOGGER.debug(f"init_on_load vehicle_name: '{self._vehicle_name}'")
+
+            if self._vehicle_id is None or self._vehicle_name is None:
+                await self.bridge.get_vehicle_id()
+                if self._vehicle_id is None:
+                    self._vehicle_id = self.bridge.vehicle_id
+                if self._vehicle_name is None:
+                    self._vehicle_name = self.bridge.vehicle_name
+
+            _LOGGER.debug(f"init_on_load vehicle_id: '{self._vehicle_id}' vehicle_name: '{self._vehicle_name}'")
 
         except Exception as exception:
             _LOGGER.warning(f"init caused {exception}")
@@ -138,26 +293,96 @@ class TibberGraphApiDataUpdateCoordinator(DataUpdateCoordinator):
             "name": f"Tibber GraphAPI {self._vehicle_name}"
         }
 
-    async def async_refresh_with_pause(self):
-        await asyncio.sleep(5)
-        await self.async_refresh()
+    async def async_enable_statistics(self, statistics):
+        await statistics.async_start()
+        self.statistics = statistics
+        for a_pulse_coordinator in self.pulse_coordinators:
+            a_pulse_coordinator.statistics = statistics
+        if self.charging_history is not None:
+            self.charging_history.statistics = statistics
+
+        # the values of the statistics must be part of the query (even if the entities are disabled)
+        self._extra_query_tags = self._extra_query_tags | frozenset(a_tag for a_tag, _, _, _ in statistics.VEHICLE_SERIES)
+        self._query_tags = None
+        self._remove_statistics_listener = self.async_add_listener(self._async_record_statistics)
+
+    @callback
+    def _async_record_statistics(self):
+        if self.data is not None and self.last_update_success and self.bridge.tibber_vehicleId is not None:
+            self.statistics.add_vehicle_values(self.bridge.tibber_vehicleId, self.name_prefix, self)
+
+    async def async_disable_statistics(self):
+        if self.statistics is not None:
+            if self._remove_statistics_listener is not None:
+                self._remove_statistics_listener()
+                self._remove_statistics_listener = None
+            await self.statistics.async_stop()
+            self.statistics = None
+
+    def init_charge_plan_on_load(self):
+        self.charge_plan = TibberGraphApiChargePlanCoordinator(self.hass, self._config_entry, self, self._account.prices)
+        # the plan requires the soc values (even if the entities are disabled)
+        self._extra_query_tags = self._extra_query_tags | frozenset((TGATag.VEH_SOC, TGATag.VEH_SOCMAX))
+        self._query_tags = None
+
+    async def init_charging_history_on_load(self):
+        self.charging_history = TibberGraphApiChargingHistoryCoordinator(self.hass, self._config_entry, self)
+        await self.charging_history.async_load()
+
+    async def init_pulse_on_load(self):
+        try:
+            # the cached pulses are good enough for the start - see 'async_verify_pulses()'
+            pulse_ids = self.bridge.get_cached_pulse_ids()
+            if pulse_ids is None:
+                pulse_ids = await self.bridge.get_pulse_ids()
+            if pulse_ids is not None:
+                for a_pulse_id in pulse_ids:
+                    pulse_name = None
+                    if self.bridge.tibber_pulseNames is not None:
+                        pulse_name = self.bridge.tibber_pulseNames.get(a_pulse_id)
+                    self.pulse_coordinators.append(
+                        TibberGraphApiPulseCoordinator(self.hass, self._config_entry, self._account.stream, a_pulse_id, pulse_name,
+                                                       window=self._config_entry.options.get(CONF_PULSE_WINDOW, self._config_entry.data.get(CONF_PULSE_WINDOW, DEFAULT_PULSE_WINDOW))))
+            _LOGGER.debug(f"init_pulse_on_load found {len(self.pulse_coordinators)} pulse(s)")
+
+        except Exception as exception:
+            _LOGGER.warning(f"init pulse caused {exception}")
+
+    async def async_verify_pulses(self):
+        # when the pulses of the account have been changed, the entry must be reloaded
+        try:
+            pulse_ids = await self.bridge.get_pulse_ids()
+            if pulse_ids is not None:
+                known_ids = [a_pulse_coordinator.pulse_id for a_pulse_coordinator in self.pulse_coordinators]
+                if set(pulse_ids) != set(known_ids):
+                    _LOGGER.info(f"pulses of the account have changed from {known_ids} to {pulse_ids} - reloading")
+                    self.hass.config_entries.async_schedule_reload(self._config_entry.entry_id)
+
+        except Exception as exception:
+            _LOGGER.warning(f"verify pulses caused {exception}")
 
     async def _async_update_data(self):
         _LOGGER.debug(f"_async_update_data called")
         try:
-            result = await self.bridge.update()
+            rejections = self.bridge.token_rejections
+            result = await self._async_fetch()
+            if result is None and self.bridge.token_rejections != rejections:
+                # the token has been rejected - the renewal happens with the next request, so we can
+                # retry right away (instead of waiting for the next interval). A failed login is not
+                # retried, the next interval is soon enough
+                _LOGGER.debug(f"token must be renewed - retry the update")
+                result = await self._async_fetch()
+
             if result is not None:
                 _LOGGER.debug(f"number of fields after query: {len(result)}")
-            else:
-                if self.bridge.should_be_refreshed():
-                    _LOGGER.debug(f"we going to call async_refresh_with_pause() again")
-                    try:
-                        asyncio.create_task(self.async_refresh_with_pause())
-                    except Exception as exc:
-                        _LOGGER.debug(f"Exception while try to call 'asyncio.create_task(self.async_refresh_with_pause())': {exc}")
-
+                self._adapt_update_interval(result)
+                result = self.settings.apply_pending(result)
             return result
 
+        except TibberGraphApiUnavailable as unavailable:
+            _LOGGER.debug(f"update skipped: {unavailable}")
+            raise UpdateFailed(str(unavailable)) from unavailable
+
         except UpdateFailed as exception:
             raise UpdateFailed() from exception
 
@@ -165,19 +390,65 @@ class TibberGraphApiDataUpdateCoordinator(DataUpdateCoordinator):
             _LOGGER.warning(f"unexpected: {other}")
             raise UpdateFailed() from other
 
+    async def _async_fetch(self) -> dict | None:
+        if self._fleet is not None and self._fleet.size > 1:
+            return await self._fleet.async_update(self)
+        return await self.bridge.update(self.query_fields)
+
+    @callback
+    def async_set_updated_data(self, data) -> None:
+        # data pushed by the fleet - adjust the interval before the next refresh get scheduled
+        self._adapt_update_interval(data)
+        super().async_set_updated_data(self.settings.apply_pending(data))
+
+    @callback
+    def async_set_local_data(self, data):
+        # data that has been modified locally (see settings.py) - the entities are updated, but the update
+        # interval (and the scheduled refresh) stays untouched
+        self.data = data
+        self.async_update_listeners()
+
+    def _adapt_update_interval(self, data):
+        new_interval = self._scheduler.next_interval(data)
+        if new_interval != self.update_interval:
+            _LOGGER.debug(f"update interval of '{self.name_prefix}' changed to: {new_interval}")
+            self.update_interval = new_interval
+
     def clear_data(self):
         _LOGGER.debug(f"clear_data called...")
-        self.data.clear()
+        self.data = {}
 
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry):
     unload_ok = await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
     if unload_ok:
         if DOMAIN in hass.data and config_entry.entry_id in hass.data[DOMAIN]:
-            hass.data[DOMAIN].pop(config_entry.entry_id)
+            coordinator = hass.data[DOMAIN].pop(config_entry.entry_id)
+            for a_pulse_coordinator in coordinator.pulse_coordinators:
+                await a_pulse_coordinator.async_stop()
+            coordinator._account.release_pulses(config_entry.entry_id)
+            coordinator._account.release_metrics(config_entry.entry_id)
+            await coordinator.settings.async_stop()
+            if coordinator.charge_plan is not None:
+                await coordinator.charge_plan.async_stop()
+            if coordinator.charging_history is not None:
+                await coordinator.charging_history.async_stop()
+            # the complete hours are imported, the rest is stored till the next start
+            await coordinator.async_disable_statistics()
+            if coordinator._fleet is not None:
+                coordinator._fleet.unregister(coordinator)
+            async_release_account(hass, coordinator._account, config_entry)
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    await async_remove_account_data(hass, config_entry)
+    await async_remove_history_data(hass, config_entry)
+    if "recorder" in hass.config.components:
+        from custom_components.tibber_graphapi.statistics import async_remove_statistics_data
+        await async_remove_statistics_data(hass, config_entry)
+
+
 async def async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     if await async_unload_entry(hass, config_entry):
         await asyncio.sleep(2)
@@ -188,11 +459,17 @@ class TibberGraphApiEntity(Entity):
     _attr_should_poll = False
     _attr_has_entity_name = True
     _attr_name_addon = None
+    # True, when the entity shows the value of the last HA session (till the first live data arrives)
+    _restored = False
 
     def __init__(self, coordinator: TibberGraphApiDataUpdateCoordinator, description: EntityDescription) -> None:
         self.entity_description = description
         self.coordinator = coordinator
-        self.entity_id = f"{DOMAIN}.{_camel_to_snake(self.coordinator._vehicle_name)}_{_camel_to_snake(description.key)}".lower()
+        self.entity_id = f"{DOMAIN}.{_camel_to_snake(self.coordinator.name_prefix)}_{_camel_to_snake(description.key)}".lower()
+        # the name prefix of some devices (e.g. the title of the home of a pulse) can be changed in the tibber app -
+        # their coordinators provide a stable prefix for the unique id
+        unique_id_prefix = getattr(coordinator, "unique_id_prefix", None)
+        self._unique_id = f"{DOMAIN}.{unique_id_prefix}_{_camel_to_snake(description.key)}".lower() if unique_id_prefix is not None else None
 
         if hasattr(description, "translation_key") and description.translation_key is not None:
             self._attr_translation_key = description.translation_key.lower()
@@ -223,14 +500,22 @@ class TibberGraphApiEntity(Entity):
         """Return True if entity is available."""
         return self.coordinator.last_update_success
 
+    @property
+    def extra_state_attributes(self):
+        if self._restored and self.coordinator.data is None:
+            return {"restored": True}
+        return None
+
     @property
     def unique_id(self):
         """Return a unique ID to use for this entity."""
+        if self._unique_id is not None:
+            return self._unique_id
         return self.entity_id.lower()
 
     async def async_added_to_hass(self):
         """Connect to dispatcher listening for entity data notifications."""
-        self.async_on_remove(self.coordinator.async_add_listener(self.async_write_ha_state))
+        self.async_on_remove(self.coordinator.async_add_listener(self.async_write_ha_state, getattr(self.entity_description, "tag", None)))
 
     async def async_update(self):
         """Update entity."""
@@ -245,201 +530,342 @@ class TibberGraphApiBridge:
     # https://app.tibber.com/v4/gql
 
     DATA_URL = "https://app.tibber.com/v4/gql"
-    LOGIN_URL = "https://app.tibber.com/login.credentials"
-    REFRESH_URL = f"https://app.tibber.com/auth-sessions/{str(uuid.uuid4())}"
-
-    REQ_HEADERS = {
-        "Accept-Language": "en",
-        "x-tibber-new-ui": "true",
-        "User-Agent": "Tibber/25.16.0 (versionCode: 2516001Dalvik/2.1.0 (Linux; U; Android 10; Android SDK built for x86_64 Build/QSR1.211112.011))",
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-
-    REQ_HEADERS_WS = {
-        "Accept-Language": "en",
-        "x-tibber-new-ui": "true",
-        "User-Agent": "Tibber/25.16.0 (versionCode: 2516001Dalvik/2.1.0 (Linux; U; Android 10; Android SDK built for x86_64 Build/QSR1.211112.011))",
-        "Sec-WebSocket-Protocol": "graphql-transport-ws"
-    }
+
+    VEHICLE_FIELDS = ("isAlive isCharging chargingStatus smartChargingStatus hasConsumption enterPincode "
+                      "battery { level estimatedRange canReadLevel } status { title description } "
+                      "charging {sessionStartedAt targetedStateOfCharge chargerId progress {cost energy speed} } "
+                      "userSettings { key value } "
+                      "onboarding { status title cta { action enabled link text url } } ")
 
     tibber_vehicleId = None
     tibber_vehicleName = None
 
-    _require_refresh = False
-    _the_refresh_token = None
     _web_session = None
-    _user = None
-    _pwd = None
+    _auth = None
+    _discovery = None
     _veh_index = 0
 
     tibber_pulseId = None
+    tibber_pulseNames = None
     tibber_meterId = None
 
-    def __init__(self, user, pwd, a_web_session, veh_index: int = 0, veh_id: str = None, options: dict = None):
+    def __init__(self, user, pwd, a_web_session, veh_index: int = 0, veh_id: str = None, options: dict = None,
+                 auth: TibberGraphApiAuth = None, discovery: TibberGraphApiDiscovery = None,
+                 breaker: TibberGraphApiCircuitBreaker = None):
         if a_web_session is not None:
             _LOGGER.info(f"restarting TibberGraphApi integration... for tibber-vehicle-id: '{veh_id}' vehicle-index: '{veh_index}' with options: {options}")
             self._web_session = a_web_session
-            self._user = user
-            self._pwd = pwd
+            # when no (shared) auth broker is provided, we use our own (short-lived) one
+            if auth is None:
+                auth = TibberGraphApiAuth(user=user, pwd=pwd, a_web_session=a_web_session, proactive_refresh=False)
+            self._auth = auth
+            self._discovery = discovery if discovery is not None else TibberGraphApiDiscovery()
+            self._breaker = breaker if breaker is not None else TibberGraphApiCircuitBreaker()
+            self._retry = TibberGraphApiRetryPolicy()
+            self._query_cache = {}
+            self._last_responses = {}
+            self._in_flight = {}
+            self.single_flight_joins = 0
             self._veh_index = veh_index
             if veh_id is not None:
                 self.tibber_vehicleId = veh_id
 
-    async def update(self) -> dict:
-        return await self.get_vehicle_data()
+    async def update(self, fields: str = None) -> dict:
+        return await self.get_vehicle_data(fields)
 
     def should_be_refreshed(self) -> bool:
-        return self._require_refresh or "Authorization" not in self.REQ_HEADERS
+        return self._auth.should_be_refreshed()
+
+    @property
+    def token_rejections(self) -> int:
+        return self._auth.rejections
 
     async def login(self) -> None:
-        self.REQ_HEADERS["Content-Type"] = "application/x-www-form-urlencoded"
-        login_data = f"email={self._user}&password={self._pwd}"
-        async with self._web_session.post(self.LOGIN_URL, data=login_data, headers=self.REQ_HEADERS) as response:
-            if response.status == 200:
-                data = await response.json()
-
-                # ok updating the headers
-                self.REQ_HEADERS["Content-Type"] = "application/json; charset=utf-8"
-                self.REQ_HEADERS["Authorization"] = data["token"]
-                self.REQ_HEADERS_WS["Authorization"] = data["token"]
-                if "refreshToken" in data:
-                    _LOGGER.debug(f"refreshToken received")
-                    self._the_refresh_token = data["refreshToken"]
-                    self._require_refresh = False
-            else:
-                self.REQ_HEADERS["Content-Type"] = "application/json; charset=utf-8"
-                _LOGGER.warning(f"login {response.status} -> {response.reason}")
+        await self._auth.login()
 
     async def refresh_token(self) -> None:
-        if self._the_refresh_token is not None:
-            self.REQ_HEADERS["Authorization"] = self._the_refresh_token
-            self.REQ_HEADERS["Content-Type"] = "application/json; charset=utf-8"
-            async with self._web_session.put(self.REFRESH_URL, headers=self.REQ_HEADERS) as response:
-                if response.status == 200:
-                    ref_data = None
-                    ref_text = None
-                    if response.headers["Content-Type"] == "application/json":
-                        ref_data = await response.json()
-                    else:
-                        # we try to parse the text as json ?!
-                        ref_text = await response.text()
-                        try:
-                            ref_data = json.loads(ref_text)
-                        except Exception as other:
-                            _LOGGER.warning(f"could not parse refresh response: {other} {ref_text}")
-
-                    if ref_data is not None and "token" in ref_data:
-                        self._require_refresh = False
-                        self.REQ_HEADERS["Authorization"] = ref_data["token"]
-                        self.REQ_HEADERS_WS["Authorization"] = ref_data["token"]
-                        if "refreshToken" in ref_data:
-                            _LOGGER.debug(f"refreshToken updated !")
-                            self._the_refresh_token = ref_data["refreshToken"]
-                        else:
-                            _LOGGER.warning(f"not refreshToken provided !")
-                            self._the_refresh_token = None
-                    else:
-                        _LOGGER.warning(f"no valid data in refresh token response: {ref_data} {ref_text}")
-                        self._require_refresh = False
-                        self.REQ_HEADERS.pop("Authorization")
-                        self.REQ_HEADERS_WS.pop("Authorization")
-                else:
-                    _LOGGER.warning(f"refresh_token: {response.status} -> {response.reason}")
-                    self._require_refresh = False
-                    self.REQ_HEADERS.pop("Authorization")
-                    self.REQ_HEADERS_WS.pop("Authorization")
+        await self._auth.refresh_token()
+
+    def _vehicle_query(self, vehicle_ids: tuple, fields: str | None, aliased: bool) -> bytes:
+        # the (encoded) request body only changes, when the selected fields or the vehicles have been changed
+        if fields is None:
+            fields = self.VEHICLE_FIELDS
+        key = (vehicle_ids, fields, aliased)
+        body = self._query_cache.get(key)
+        if body is None:
+            if len(self._query_cache) >= 16:
+                self._query_cache.clear()
+            query = "query Query { me { "
+            for idx, a_vehicle_id in enumerate(vehicle_ids):
+                if aliased:
+                    query = query + f"v{idx}: "
+                query = query + "vehicle(id: \"" + a_vehicle_id + "\") { " + fields + " } "
+            body = json.dumps({"query": query + "} }"}).encode("utf-8")
+            self._query_cache[key] = body
+            _LOGGER.debug(f"vehicle query for {vehicle_ids} compiled: {fields}")
+        return body
+
+    def _unchanged_response(self, endpoint: str, raw: bytes):
+        # returns the hash of the raw response and the result of the previous response, when that one had the
+        # very same bytes (then there is no need to decode the response again)
+        response_hash = hashlib.blake2b(raw, digest_size=16).digest()
+        last = self._last_responses.get(endpoint)
+        if last is not None and last[0] == response_hash:
+            self._auth.metrics.record_unchanged(True)
+            return response_hash, last[1]
+        self._auth.metrics.record_unchanged(False)
+        return response_hash, None
+
+    async def _async_post(self, endpoint: str, body: bytes) -> tuple[int, str, bytes]:
+        # connection errors & temporary server errors are retried (with a jittered backoff) - the circuit
+        # breaker of the account stops all requests during an outage of tibber
+        attempt = 0
+        while True:
+            if not self._breaker.allow_request():
+                raise TibberGraphApiUnavailable(f"circuit breaker is {self._breaker.state}")
+
+            started = time.monotonic()
+            try:
+                async with self._web_session.post(self.DATA_URL, data=body, headers=self._auth.headers) as response:
+                    raw = await response.read()
+                    status = response.status
+                    # the reason is only used for logging (of failed requests)
+                    reason = response.reason if status != 200 else None
+            except (ClientError, asyncio.TimeoutError) as err:
+                self._auth.metrics.record_request(endpoint, 0, started, 0)
+                self._breaker.record_failure(f"{type(err).__name__}")
+                if attempt + 1 >= self._retry.attempts:
+                    raise
+            except Exception as err:
+                # not worth a retry - but a failed (half-open) probe must be recorded
+                self._auth.metrics.record_request(endpoint, 0, started, 0)
+                self._breaker.record_failure(f"{type(err).__name__}")
+                raise
+            except BaseException:
+                # cancelled (e.g. on unload) - that's not a failure of tibber, but the probe must be released
+                self._breaker.release_probe()
+                raise
+            else:
+                self._auth.metrics.record_request(endpoint, status, started, len(raw))
+                if status not in RETRY_STATUS_CODES:
+                    self._breaker.record_success()
+                    return status, reason, raw
+                self._breaker.record_failure(f"{status} {reason}")
+                if attempt + 1 >= self._retry.attempts:
+                    return status, reason, raw
+
+            delay = self._retry.delay(attempt)
+            attempt += 1
+            _LOGGER.debug(f"{endpoint} request failed - retry {attempt} in {delay:.1f} sec")
+            await asyncio.sleep(delay)
+
+    def reset_response_cache(self):
+        # must be called when the last result has been modified locally
+        self._last_responses.clear()
+
+    async def _async_single_flight(self, key, fetch):
+        # concurrent callers with the same key (e.g. the update timer of the coordinator & a requested
+        # refresh) share a single in-flight request
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.single_flight_joins += 1
+            _LOGGER.debug(f"joining in-flight request {key[0]}")
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # only the caller, that has made the request, has been cancelled (e.g. its entry got unloaded) - we
+                # are still interested in the result, so we make the request again
+                if not pending.cancelled() or asyncio.current_task().cancelling() > 0:
+                    raise
+                _LOGGER.debug(f"in-flight request {key[0]} has been cancelled - requesting again")
+            return await self._async_single_flight(key, fetch)
+
+        pending = asyncio.get_running_loop().create_future()
+        # when nobody has joined, nobody will retrieve the exception
+        pending.add_done_callback(lambda a_future: a_future.cancelled() or a_future.exception())
+        self._in_flight[key] = pending
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as exc:
+            pending.set_exception(exc)
+            raise
         else:
-            _LOGGER.warning(f"refresh token was called but the 'refresh_token' is NONE")
-            self._require_refresh = False
-            self.REQ_HEADERS.pop("Authorization")
-            self.REQ_HEADERS_WS.pop("Authorization")
+            pending.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
 
-    async def get_vehicle_data(self) -> dict:
-        if self._require_refresh:
-            await self.refresh_token()
+    async def get_vehicle_data(self, fields: str = None) -> dict:
+        # 'fields' is the GraphQL selection set of the vehicle - when None, all known fields will be requested
+        return await self._async_single_flight((ENDPOINT_VEHICLE, self.tibber_vehicleId, fields),
+                                               lambda: self._get_vehicle_data(fields))
 
-        if "Authorization" not in self.REQ_HEADERS:
-            await self.login()
+    async def _get_vehicle_data(self, fields: str = None) -> dict:
+        token = await self._auth.async_get_token()
+        if token is None:
+            return None
 
         if self.tibber_vehicleId is None or len(self.tibber_vehicleId) == 0:
             await self.get_vehicle_id()
 
-        jdata = {
-            "query": "query Query { me { vehicle(id: \"" + self.tibber_vehicleId + "\") { "
-                     "isAlive isCharging chargingStatus smartChargingStatus hasConsumption enterPincode "
-                     "battery { level estimatedRange canReadLevel } status { title description } "
-                     "charging {sessionStartedAt targetedStateOfCharge chargerId progress {cost energy speed} } "
-                     "userSettings { key value } "
-                     "onboarding { status title cta { action enabled link text url } } "
-                     "} } }"
-        }
+        body = self._vehicle_query((self.tibber_vehicleId,), fields, aliased=False)
 
-        async with self._web_session.post(self.DATA_URL, json=jdata, headers=self.REQ_HEADERS) as response:
-            if response.status == 401:
-                _LOGGER.debug(f"401 received - trying to refresh auth token")
-                if self._the_refresh_token is None:
-                    _LOGGER.warning(f"no refresh token available - wait for next call to re-login...")
-                    self._require_refresh = False
-                    self.REQ_HEADERS.pop("Authorization")
-                    self.REQ_HEADERS_WS.pop("Authorization")
+        status, reason, raw = await self._async_post(ENDPOINT_VEHICLE, body)
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            response_hash, last_result = self._unchanged_response(ENDPOINT_VEHICLE, raw)
+            if last_result is not None:
+                return last_result
+
+            data = json_loads(raw)
+            if "data" in data and "me" in data["data"] and "vehicle" in data["data"]["me"]:
+                if data["data"]["me"]["vehicle"] is None:
+                    # unknown vehicle id - the cached vehicle list might be outdated
+                    self._discovery.invalidate(DISCOVERY_VEHICLES)
                 else:
-                    _LOGGER.debug(f"refresh token available... try to refresh next...")
-                    self._require_refresh = True
+                    self._last_responses[ENDPOINT_VEHICLE] = (response_hash, data["data"]["me"]["vehicle"])
+                return data["data"]["me"]["vehicle"]
+        else:
+            _LOGGER.warning(f"get_vehicle_data {status} -> {reason}")
 
-            elif response.status == 200:
-                data = await response.json()
-                if "data" in data and "me" in data["data"] and "vehicle" in data["data"]["me"]:
-                    return data["data"]["me"]["vehicle"]
-            else:
-                _LOGGER.warning(f"get_vehicle_data {response.status} -> {response.reason}")
+        # if we haven't read any data (cause of 401 or other status) we return None
+        return None
 
-            # if we haven't read any data (cause of 401 or other status) we return None
+    async def get_vehicles_data(self, vehicle_ids: list[str], fields: str = None) -> dict | None:
+        # fetching the data of multiple vehicles with a single request (using aliases 'v0', 'v1', ...)
+        return await self._async_single_flight((ENDPOINT_VEHICLES, tuple(vehicle_ids), fields),
+                                               lambda: self._get_vehicles_data(vehicle_ids, fields))
+
+    async def _get_vehicles_data(self, vehicle_ids: list[str], fields: str = None) -> dict | None:
+        token = await self._auth.async_get_token()
+        if token is None:
             return None
 
+        aliases = {f"v{idx}": a_vehicle_id for idx, a_vehicle_id in enumerate(vehicle_ids)}
+        body = self._vehicle_query(tuple(vehicle_ids), fields, aliased=True)
+
+        status, reason, raw = await self._async_post(ENDPOINT_VEHICLES, body)
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            response_hash, last_result = self._unchanged_response(ENDPOINT_VEHICLES, raw)
+            if last_result is not None:
+                return last_result
+
+            data = json_loads(raw)
+            if "data" in data and data["data"] is not None and "me" in data["data"]:
+                me = data["data"]["me"]
+                result = {}
+                for alias, a_vehicle_id in aliases.items():
+                    if me.get(alias) is not None:
+                        result[a_vehicle_id] = me[alias]
+                    else:
+                        _LOGGER.debug(f"no data for vehicle '{a_vehicle_id}' in batch response")
+                        self._discovery.invalidate(DISCOVERY_VEHICLES)
+                self._last_responses[ENDPOINT_VEHICLES] = (response_hash, result)
+                return result
+        else:
+            _LOGGER.warning(f"get_vehicles_data {status} -> {reason}")
+
+        return None
+
     async def get_vehicle_id(self) -> str:
-        if "Authorization" not in self.REQ_HEADERS:
-            await self.login()
+        vehicles = await self._discovery.async_get(DISCOVERY_VEHICLES, self._fetch_vehicles)
+        if vehicles is not None and len(vehicles) <= self._veh_index:
+            # the cached vehicle list might be outdated
+            self._discovery.invalidate(DISCOVERY_VEHICLES)
+            vehicles = await self._discovery.async_get(DISCOVERY_VEHICLES, self._fetch_vehicles)
+
+        if vehicles is not None and len(vehicles) > self._veh_index:
+            self.tibber_vehicleId = vehicles[self._veh_index]["id"]
+            self.tibber_vehicleName = vehicles[self._veh_index]["title"]
+        else:
+            _LOGGER.warning(f"Could not find vehicle with index {self._veh_index} in: {vehicles}")
+        return self.tibber_vehicleId
+
+    async def _fetch_vehicles(self) -> list | None:
+        token = await self._auth.async_get_token()
+        if token is None:
+            return None
 
         jdata = {
             "query": "query getVehicles {me {myVehicles {vehicles {id, title} } } }"
         }
-        async with self._web_session.post(self.DATA_URL, json=jdata, headers=self.REQ_HEADERS) as response:
-            if response.status == 200:
-                data = await response.json()
-                if "data" in data \
-                        and "me" in data["data"] \
-                        and "myVehicles" in data["data"]["me"] \
-                        and "vehicles" in data["data"]["me"]["myVehicles"] \
-                        and len(data["data"]["me"]["myVehicles"]["vehicles"]) > self._veh_index:
-                    self.tibber_vehicleId = data["data"]["me"]["myVehicles"]["vehicles"][self._veh_index]["id"]
-                    self.tibber_vehicleName = data["data"]["me"]["myVehicles"]["vehicles"][self._veh_index]["title"]
-                else:
-                    _LOGGER.warning(f"Could not find vehicle id in response: {data}")
+        status, reason, raw = await self._async_post(ENDPOINT_VEHICLE_ID, json_dumps(jdata).encode("utf-8"))
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            data = json_loads(raw)
+            if "data" in data \
+                    and "me" in data["data"] \
+                    and "myVehicles" in data["data"]["me"] \
+                    and "vehicles" in data["data"]["me"]["myVehicles"]:
+                return [{"id": a_vehicle["id"], "title": a_vehicle["title"]} for a_vehicle in data["data"]["me"]["myVehicles"]["vehicles"]]
             else:
-                _LOGGER.warning(f"get_vehicle_id {response.status} -> {response.reason}")
+                _LOGGER.warning(f"Could not find vehicles in response: {data}")
+        else:
+            _LOGGER.warning(f"get_vehicle_id {status} -> {reason}")
+
+        return None
+
+    def _apply_cached_vehicle(self):
+        vehicles = self._discovery.get_cached(DISCOVERY_VEHICLES, allow_expired=True)
+        if vehicles is None:
+            return
+        for idx, a_vehicle in enumerate(vehicles):
+            if (self.tibber_vehicleId is not None and a_vehicle["id"] == self.tibber_vehicleId) \
+                    or (self.tibber_vehicleId is None and idx == self._veh_index):
+                self.tibber_vehicleId = a_vehicle["id"]
+                self.tibber_vehicleName = a_vehicle["title"]
+                return
 
     @property
     def vehicle_id(self):
-        # if id is not here yet return None... but let's try to get it
+        # only the known (or cached) id - use 'await get_vehicle_id()' to discover it
         if self.tibber_vehicleId is None:
-            self.get_vehicle_id()
-            return None
+            self._apply_cached_vehicle()
         return self.tibber_vehicleId
 
     @property
     def vehicle_name(self):
-        # if id is not here yet return None... but let's try to get it
+        # only the known (or cached) name - use 'await get_vehicle_id()' to discover it
         if self.tibber_vehicleName is None:
-            self.get_vehicle_id()
-            return None
+            self._apply_cached_vehicle()
         return self.tibber_vehicleName
 
+    def get_cached_pulse_ids(self) -> list | None:
+        return self._apply_pulses(self._discovery.get_cached(DISCOVERY_PULSES, allow_expired=True))
+
     async def get_pulse_ids(self):
-        if self._require_refresh:
-            await self.refresh_token()
+        return self._apply_pulses(await self._discovery.async_get(DISCOVERY_PULSES, self._fetch_pulses))
 
-        if "Authorization" not in self.REQ_HEADERS:
-            await self.login()
+    def _apply_pulses(self, pulses: dict | None) -> list | None:
+        if pulses is None:
+            return None
+
+        self.tibber_pulseNames = dict(pulses)
+        list_data = list(pulses.keys())
+        if len(list_data) > 0:
+            # we have a list of ids
+            _LOGGER.debug(f"found {len(list_data)} pulse ids: {list_data}")
+            self.tibber_pulseId = list_data[0]
+        return list_data
+
+    async def _fetch_pulses(self) -> dict | None:
+        # returns the ids of all pulse gizmos (with the title of their home)
+        token = await self._auth.async_get_token()
+        if token is None:
+            return None
 
         # query GetHomes { me { homes { __typename ...HomeItem } } }
         # fragment CurrentMeterItem on CurrentMeter { id meterNo isUserRead }
@@ -452,126 +878,121 @@ class TibberGraphApiBridge:
 
         jdata = {"query": "query GizmoQuery { me { homes { id title gizmos {__typename ... on Gizmo {__typename ...GizmoItem} ... on GizmoGroup {id title gizmos {__typename ...GizmoItem}}}}}} fragment GizmoItem on Gizmo { id title type }"}
 
-        async with self._web_session.post(self.DATA_URL, json=jdata, headers=self.REQ_HEADERS) as response:
-            if response.status == 401:
-                _LOGGER.debug(f"401 received - trying to refresh auth token")
-                if self._the_refresh_token is None:
-                    _LOGGER.warning(f"no refresh token available - wait for next call to re-login...")
-                    self._require_refresh = False
-                    self.REQ_HEADERS.pop("Authorization")
-                    self.REQ_HEADERS_WS.pop("Authorization")
-                else:
-                    _LOGGER.debug(f"refresh token available... try to refresh next...")
-                    self._require_refresh = True
-
-            elif response.status == 200:
-                list_data = []
-                data = await response.json()
-                if "data" in data and "me" in data["data"]:
-                    obj = data["data"]["me"]
-                    if "homes" in obj and len(obj["homes"]) > 0:
-                        homes = obj["homes"]
-                        for home in homes:
-                            for gizmo in home.get("gizmos", []):
-                                if gizmo.get("type") == "REAL_TIME_METER":
-                                    list_data.append( gizmo.get("id") )
-
-                if len(list_data) > 0:
-                    # we have a list of ids
-                    _LOGGER.debug(f"found {len(list_data)} pulse ids: {list_data}")
-                    self.tibber_pulseId = list_data[0]
-
-                return list_data
-            else:
-                _LOGGER.warning(f"get_pulse_ids {response.status} -> {response.reason}")
+        status, reason, raw = await self._async_post(ENDPOINT_PULSE_IDS, json_dumps(jdata).encode("utf-8"))
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            names = {}
+            data = json_loads(raw)
+            if "data" in data and "me" in data["data"]:
+                obj = data["data"]["me"]
+                if "homes" in obj and len(obj["homes"]) > 0:
+                    homes = obj["homes"]
+                    for home in homes:
+                        for gizmo in home.get("gizmos", []):
+                            # gizmos can be grouped...
+                            for a_gizmo in [gizmo] + gizmo.get("gizmos", []):
+                                if a_gizmo.get("type") == "REAL_TIME_METER":
+                                    names[a_gizmo.get("id")] = home.get("title") or a_gizmo.get("title")
+            return names
+        else:
+            _LOGGER.warning(f"get_pulse_ids {status} -> {reason}")
+
+        # if we haven't read any data (cause of 401 or other status) we return None
+        return None
 
-            # if we haven't read any data (cause of 401 or other status) we return None
+    async def get_prices(self) -> dict | None:
+        # the prices of today & tomorrow (when already published) of all homes of the account
+        token = await self._auth.async_get_token()
+        if token is None:
             return None
 
-    async def connect_ws(self):
-        if self._require_refresh:
-            await self.refresh_token()
+        jdata = {"query": "query PriceQuery { me { homes { id currentSubscription { priceInfo { today { total startsAt currency } tomorrow { total startsAt currency } } } } } }"}
+
+        status, reason, raw = await self._async_post(ENDPOINT_PRICES, json_dumps(jdata).encode("utf-8"))
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            homes = {}
+            data = json_loads(raw)
+            if "data" in data and data["data"] is not None and "me" in data["data"]:
+                for home in data["data"]["me"].get("homes") or []:
+                    # a home without an (active) subscription has no prices
+                    price_info = (home.get("currentSubscription") or {}).get("priceInfo") or {}
+                    prices = (price_info.get("today") or []) + (price_info.get("tomorrow") or [])
+                    homes[home["id"]] = {
+                        "currency": next((a_price.get("currency") for a_price in prices if a_price.get("currency") is not None), None),
+                        "prices": [(a_price.get("startsAt"), a_price.get("total")) for a_price in prices]
+                    }
+                return homes
+            else:
+                _LOGGER.warning(f"Could not find prices in response: {data}")
+        else:
+            _LOGGER.warning(f"get_prices {status} -> {reason}")
 
-        if "Authorization" not in self.REQ_HEADERS_WS:
-            await self.login()
+        return None
 
-        if self.tibber_pulseId is None or len(self.tibber_pulseId) == 0:
-            await self.get_pulse_ids()
+    async def set_vehicle_settings(self, settings: list[dict]) -> bool:
+        # writes the given [{key: x, value: y}, ...] user settings of the vehicle with a single mutation
+        token = await self._auth.async_get_token()
+        if token is None:
+            return False
 
-        self.web_socket_url = "wss://app.tibber.com/v4/gql/ws"
-        # unique id for the subscription
-        pulse_subscribe_id = str(uuid.uuid4())
+        if self.tibber_vehicleId is None or len(self.tibber_vehicleId) == 0:
+            await self.get_vehicle_id()
 
-        try:
-            async with self._web_session.ws_connect(self.web_socket_url, headers=self.REQ_HEADERS_WS) as ws:
-                self.ws_connected = True
-                _LOGGER.info(f"connected to websocket: {self.web_socket_url}")
-                await ws.send_json({"type": "connection_init"})
-                async for msg in ws:
-                    if msg.type == aiohttp.WSMsgType.TEXT:
-                        try:
-                            data = msg.json()
-                            if "type" in data:
-                                if data["type"] == "connection_ack":
-                                    # we can/should subscribe...
-                                    # the values 'lastMeterProduction' & 'lastMeterConsumption' are not present in the
-                                    # v4 PulseMeasurement / RealTimeMeasurement Objects ?!
-                                    await ws.send_json(
-                                        {
-                                            "type": "subscribe",
-                                            "id": pulse_subscribe_id,
-                                            "payload": {
-                                                "operationName": "pulseSubscription",
-                                                "variables": {"deviceId": self.tibber_pulseId},
-                                                "query": "subscription pulseSubscription($deviceId: String!) { liveMeasurement(deviceId: $deviceId) { __typename ...RealTimeMeasurement } }  fragment RealTimeMeasurement on PulseMeasurement { timestamp power powerProduction minPower minPowerTimestamp averagePower maxPower maxPowerTimestamp minPowerProduction maxPowerProduction estimatedAccumulatedConsumptionCurrentHour accumulatedConsumption accumulatedCost accumulatedConsumptionCurrentHour accumulatedProduction accumulatedProductionCurrentHour accumulatedReward peakControlConsumptionState currency currentPhase1 currentPhase2 currentPhase3 voltagePhase1 voltagePhase2 voltagePhase3 powerFactor signalStrength}"
-                                            }
-                                        }
-                                    )
-
-                                elif data["type"] == "ka":
-                                    _LOGGER.debug(f"keep alive? {data}")
-
-                                elif data["type"] == "complete":
-                                    if "id" in data and data["id"] == pulse_subscribe_id:
-                                        # it looks like that the subscription ended (and we should re-subscribe)
-                                        pass
-
-                                elif data["type"] == "next":
-                                    if "id" in data and data["id"] == pulse_subscribe_id:
-                                        if "payload" in data and "data" in data["payload"]:
-                                            if "liveMeasurement" in data["payload"]["data"]:
-                                                keys_and_values = data["payload"]["data"]["liveMeasurement"]
-                                                if "__typename" in keys_and_values and keys_and_values["__typename"] == "PulseMeasurement":
-                                                    del keys_and_values["__typename"]
-                                                    _LOGGER.debug(f"THE DATA {keys_and_values}")
-                                                    self._data = keys_and_values
-                                                    #{'accumulatedConsumption': 5.7841, 'accumulatedConsumptionCurrentHour': 0.0646, 'accumulatedCost': 1.952497, 'accumulatedProduction': 48.4389, 'accumulatedProductionCurrentHour': 0, 'accumulatedReward': None, 'averagePower': 261.3, 'currency': 'EUR', 'currentPhase1': None, 'currentPhase2': None, 'currentPhase3': None, 'estimatedAccumulatedConsumptionCurrentHour': None, 'maxPower': 5275, 'maxPowerProduction': 6343, 'maxPowerTimestamp': '2025-05-15T06:41:45.000+02:00', 'minPower': 0, 'minPowerProduction': 0, 'minPowerTimestamp': '2025-05-15T20:31:34.000+02:00', 'peakControlConsumptionState': None, 'power': 467, 'powerFactor': None, 'powerProduction': 0, 'signalStrength': None, 'timestamp': '2025-05-15T22:08:11.000+02:00', 'voltagePhase1': None, 'voltagePhase2': None, 'voltagePhase3': None}
-
-                                elif data["type"] == "error":
-                                    if "payload" in data:
-                                        _LOGGER.warning(f"error {data["payload"]}")
-                                    else:
-                                        _LOGGER.warning(f"error {data}")
-
-                                else:
-                                    _LOGGER.debug(f"unknown DATA {data}")
-
-                        except Exception as e:
-                            _LOGGER.debug(f"Could not read JSON from: {msg} - caused {e}")
-                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
-                        _LOGGER.debug(f"received: {msg}")
-                        break
-                    else:
-                        _LOGGER.error(f"xxx: {msg}")
+        jdata = {
+            "query": "mutation SetVehicleSettings($vehicleId: String!, $settings: [SettingsItemInput!]!) { me { setVehicleSettings(id: $vehicleId, settings: $settings) { id } } }",
+            "variables": {"vehicleId": self.tibber_vehicleId, "settings": settings}
+        }
 
-        except ClientConnectionError as err:
-            _LOGGER.error(f"Could not connect to websocket: {type(err)} - {err}")
-        except BaseException as x:
-            _LOGGER.error(f"!!!: {type(x)} - {x}")
+        status, reason, raw = await self._async_post(ENDPOINT_SETTINGS, json_dumps(jdata).encode("utf-8"))
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            data = json_loads(raw)
+            if len(data.get("errors") or []) > 0:
+                _LOGGER.warning(f"set_vehicle_settings rejected: {data['errors']}")
+            else:
+                return True
+        else:
+            _LOGGER.warning(f"set_vehicle_settings {status} -> {reason}")
+
+        return False
 
-        self.ws_connected = False
+    async def get_charging_sessions(self, vehicle_id: str, cursor: str = None) -> dict | None:
+        # a single page of the finished charging sessions (oldest first) after the given cursor
+        token = await self._auth.async_get_token()
+        if token is None:
+            return None
+
+        jdata = {
+            "query": "query ChargingHistory($vehicleId: String!, $first: Int, $after: String) { me { vehicle(id: $vehicleId) { chargingSessions(first: $first, after: $after) { pageInfo { hasNextPage endCursor } edges { cursor node { id startedAt endedAt energy cost currency } } } } } }",
+            "variables": {"vehicleId": vehicle_id, "first": HISTORY_PAGE_SIZE, "after": cursor}
+        }
+
+        status, reason, raw = await self._async_post(ENDPOINT_HISTORY, json_dumps(jdata).encode("utf-8"))
+        if status == 401:
+            _LOGGER.debug(f"401 received - trying to refresh auth token")
+            await self._auth.async_token_rejected(token)
+
+        elif status == 200:
+            data = json_loads(raw)
+            try:
+                sessions = data["data"]["me"]["vehicle"]["chargingSessions"]
+                return {
+                    "sessions": [(an_edge["cursor"], an_edge["node"]) for an_edge in sessions.get("edges") or []],
+                    "has_next": (sessions.get("pageInfo") or {}).get("hasNextPage") is True
+                }
+            except (KeyError, TypeError):
+                _LOGGER.warning(f"Could not find charging sessions in response: {data}")
+        else:
+            _LOGGER.warning(f"get_charging_sessions {status} -> {reason}")
 
-    async def _debounce_coordinator_update(self):
-        await asyncio.sleep(0.3)
-        if self.coordinator is not None:
-            self.coordinator.async_set_updated_data(self._data)
\ No newline at end of file
+        return None
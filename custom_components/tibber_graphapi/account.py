@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from custom_components.tibber_graphapi.auth import TibberGraphApiAuth
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    DATA_ACCOUNTS,
+    CONF_PULSE_LIVE,
+    DEFAULT_PULSE_LIVE,
+    PULSE_TAKEOVER_DELAY,
+    STORAGE_VERSION,
+    STORAGE_KEY_ACCOUNT,
+    STORAGE_SAVE_DELAY
+)
+from custom_components.tibber_graphapi.discovery import TibberGraphApiDiscovery
+from custom_components.tibber_graphapi.fleet import TibberGraphApiFleet
+from custom_components.tibber_graphapi.metrics import TibberGraphApiMetrics
+from custom_components.tibber_graphapi.prices import TibberGraphApiPrices
+from custom_components.tibber_graphapi.resilience import TibberGraphApiCircuitBreaker
+from custom_components.tibber_graphapi.stream import TibberGraphApiPulseStream
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TibberGraphApiAccount:
+    # everything that can be shared between all config entries (vehicles) of the same tibber account
+
+    def __init__(self, hass: HomeAssistant, user: str, pwd: str):
+        self._hass = hass
+        self.user = user
+        self.metrics = TibberGraphApiMetrics()
+        self.breaker = TibberGraphApiCircuitBreaker()
+        self.auth = TibberGraphApiAuth(user=user, pwd=pwd, a_web_session=async_get_clientsession(hass), metrics=self.metrics,
+                                       breaker=self.breaker, hass=hass)
+        self.discovery = TibberGraphApiDiscovery()
+        self.fleet = TibberGraphApiFleet()
+        self.prices = TibberGraphApiPrices()
+        # a single websocket for all pulses of the account
+        self.stream = TibberGraphApiPulseStream(hass, async_get_clientsession(hass), self.auth, self.discovery)
+        self.entry_ids: set[str] = set()
+        self.unique_id = _account_id(user)
+        # the entry, that owns the pulses (coordinators & entities) of the account
+        self.pulse_owner = None
+        # the entry, that provides the metric sensors of the account
+        self.metrics_owner = None
+        self._cancel_takeover = None
+
+        # the tokens (and the discovered vehicles/pulses and the prices) are persisted, so that a restart of HA does not
+        # require a new login
+        self._store = _account_store(hass, user)
+        self._stored = {}
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self.auth.set_token_listener(self._async_save)
+        self.discovery.set_listener(self._async_save)
+        self.prices.set_listener(self._async_save)
+
+    async def async_load(self):
+        async with self._load_lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                data = await self._store.async_load()
+            except Exception as exc:
+                _LOGGER.warning(f"could not load stored account data: {exc}")
+                data = None
+
+            if data is not None:
+                self._stored = data
+                if "auth" in data:
+                    self.auth.restore(data["auth"])
+                if "discovery" in data:
+                    self.discovery.restore(data["discovery"])
+                if "prices" in data:
+                    self.prices.restore(data["prices"])
+
+    def claim_pulses(self, entry_id: str) -> bool:
+        if self.pulse_owner is None or self.pulse_owner == entry_id:
+            self.pulse_owner = entry_id
+            return True
+        return False
+
+    def claim_metrics(self, entry_id: str) -> bool:
+        if self.metrics_owner is None or self.metrics_owner == entry_id:
+            self.metrics_owner = entry_id
+            return True
+        return False
+
+    @callback
+    def release_pulses(self, entry_id: str):
+        if self.pulse_owner != entry_id:
+            return
+        self.pulse_owner = None
+        self._schedule_takeover()
+
+    @callback
+    def release_metrics(self, entry_id: str):
+        if self.metrics_owner != entry_id:
+            return
+        self.metrics_owner = None
+        self._schedule_takeover()
+
+    @callback
+    def _schedule_takeover(self):
+        # when the owner does not come back (e.g. it's just reloaded), another entry must take over
+        if self._cancel_takeover is not None:
+            self._cancel_takeover()
+        self._cancel_takeover = async_call_later(self._hass, PULSE_TAKEOVER_DELAY, self._async_takeover)
+
+    @callback
+    def _async_takeover(self, _now=None):
+        self._cancel_takeover = None
+        takeover_id = None
+        if self.pulse_owner is None:
+            # only an entry with live data enabled can take over the pulses
+            for an_entry_id in self.entry_ids:
+                an_entry = self._hass.config_entries.async_get_entry(an_entry_id)
+                if an_entry is not None and an_entry.options.get(CONF_PULSE_LIVE, an_entry.data.get(CONF_PULSE_LIVE, DEFAULT_PULSE_LIVE)):
+                    takeover_id = an_entry_id
+                    break
+        if takeover_id is None and self.metrics_owner is None and len(self.entry_ids) > 0:
+            takeover_id = next(iter(self.entry_ids))
+
+        if takeover_id is not None:
+            _LOGGER.debug(f"entry '{takeover_id}' takes over the pulses/metrics of the account - reloading")
+            self._hass.config_entries.async_schedule_reload(takeover_id)
+
+    @callback
+    def _async_save(self):
+        self._stored["auth"] = self.auth.as_dict()
+        self._stored["discovery"] = self.discovery.as_dict()
+        self._stored["prices"] = self.prices.as_dict()
+        self._store.async_delay_save(lambda: self._stored, STORAGE_SAVE_DELAY)
+
+
+def _account_key(user: str) -> str:
+    return user.strip().lower()
+
+
+def _account_id(user: str) -> str:
+    # we don't want to have the email address as part of a filename (or a unique id)
+    return hashlib.sha256(_account_key(user).encode()).hexdigest()[:16]
+
+
+def _account_store(hass: HomeAssistant, user: str) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_ACCOUNT}.{_account_id(user)}")
+
+
+async def async_get_account(hass: HomeAssistant, config_entry: ConfigEntry) -> TibberGraphApiAccount:
+    user = config_entry.options.get(CONF_USERNAME, config_entry.data[CONF_USERNAME])
+    pwd = config_entry.options.get(CONF_PASSWORD, config_entry.data[CONF_PASSWORD])
+
+    accounts = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_ACCOUNTS, {})
+    key = _account_key(user)
+    account = accounts.get(key)
+    if account is None:
+        _LOGGER.debug(f"creating new account broker for entry: '{config_entry.entry_id}'")
+        account = TibberGraphApiAccount(hass, user, pwd)
+        accounts[key] = account
+    else:
+        _LOGGER.debug(f"reusing account broker ({len(account.entry_ids)} other entries) for entry: '{config_entry.entry_id}'")
+        account.auth.update_credentials(pwd)
+
+    account.entry_ids.add(config_entry.entry_id)
+    await account.async_load()
+    return account
+
+
+def async_release_account(hass: HomeAssistant, account: TibberGraphApiAccount, config_entry: ConfigEntry):
+    account.entry_ids.discard(config_entry.entry_id)
+    if len(account.entry_ids) == 0:
+        accounts = hass.data.get(DOMAIN, {}).get(DATA_ACCOUNTS, {})
+        key = _account_key(account.user)
+        if accounts.get(key) is account:
+            _LOGGER.debug(f"last entry of account has been unloaded - removing account broker")
+            accounts.pop(key)
+            if account._cancel_takeover is not None:
+                account._cancel_takeover()
+                account._cancel_takeover = None
+            account.auth.close()
+
+
+async def async_remove_account_data(hass: HomeAssistant, config_entry: ConfigEntry):
+    # the stored data is only removed together with the last config entry of the account
+    user = config_entry.options.get(CONF_USERNAME, config_entry.data[CONF_USERNAME])
+    key = _account_key(user)
+    for other_entry in hass.config_entries.async_entries(DOMAIN):
+        if other_entry.entry_id != config_entry.entry_id:
+            other_user = other_entry.options.get(CONF_USERNAME, other_entry.data.get(CONF_USERNAME, ""))
+            if _account_key(other_user) == key:
+                return
+
+    _LOGGER.debug(f"removing stored account data")
+    await _account_store(hass, user).async_remove()
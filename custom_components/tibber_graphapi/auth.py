@@ -0,0 +1,351 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+import uuid
+from typing import Final
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.tibber_graphapi.const import DOMAIN
+from custom_components.tibber_graphapi.metrics import TibberGraphApiMetrics, ENDPOINT_LOGIN, ENDPOINT_REFRESH
+from custom_components.tibber_graphapi.resilience import (
+    TibberGraphApiCircuitBreaker,
+    TibberGraphApiUnavailable,
+    RETRY_STATUS_CODES
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# refresh the token this number of seconds before it expires (but not before half of its lifetime is over)
+TOKEN_REFRESH_MARGIN: Final = 300
+# a failed (proactive) refresh is repeated after this number of seconds - doubled with every further failure
+TOKEN_REFRESH_RETRY_MIN: Final = 30
+TOKEN_REFRESH_RETRY_MAX: Final = 900
+
+BASE_HEADERS: Final = {
+    "Accept-Language": "en",
+    "x-tibber-new-ui": "true",
+    "User-Agent": "Tibber/25.16.0 (versionCode: 2516001Dalvik/2.1.0 (Linux; U; Android 10; Android SDK built for x86_64 Build/QSR1.211112.011))",
+}
+
+
+class TibberGraphApiAuth:
+    # one instance per tibber account - all bridges of the same account share the token of this broker, so
+    # we only have to log in once (and all refresh/login calls are serialized via the lock)
+
+    LOGIN_URL = "https://app.tibber.com/login.credentials"
+    REFRESH_URL = f"https://app.tibber.com/auth-sessions/{str(uuid.uuid4())}"
+
+    def __init__(self, user: str, pwd: str, a_web_session, proactive_refresh: bool = True, metrics: TibberGraphApiMetrics = None,
+                 breaker: TibberGraphApiCircuitBreaker = None, hass: HomeAssistant = None):
+        self._hass = hass
+        self._user = user
+        self._pwd = pwd
+        self._web_session = a_web_session
+        self._lock = asyncio.Lock()
+
+        self._token = None
+        self._token_expires = None
+        self._the_refresh_token = None
+        self._require_refresh = False
+        self._rejections = 0
+        self._headers = None
+        self._headers_ws = None
+
+        # the proactive refresh runs as a background task of hass - without hass, the token is only renewed on demand
+        self._proactive_refresh = proactive_refresh and hass is not None
+        self._refresh_handle = None
+        self._refresh_task = None
+        self._refresh_failures = 0
+        self._metrics = metrics if metrics is not None else TibberGraphApiMetrics()
+        # login & refresh share the breaker of the data requests (when there is one)
+        self._breaker = breaker
+        self._token_listener = None
+
+    @property
+    def user(self) -> str:
+        return self._user
+
+    @property
+    def token(self) -> str | None:
+        return self._token
+
+    @property
+    def headers(self) -> dict | None:
+        return self._headers
+
+    @property
+    def headers_ws(self) -> dict | None:
+        return self._headers_ws
+
+    @property
+    def metrics(self) -> TibberGraphApiMetrics:
+        return self._metrics
+
+    @property
+    def rejections(self) -> int:
+        # number of tokens, that have been rejected by tibber (401)
+        return self._rejections
+
+    @property
+    def avoided_401(self) -> int:
+        return self._metrics.avoided_401
+
+    def update_credentials(self, pwd: str):
+        if pwd != self._pwd:
+            _LOGGER.debug(f"credentials for '{self._user}' have been changed")
+            self._pwd = pwd
+
+    @property
+    def token_expires(self) -> float | None:
+        return self._token_expires
+
+    def set_token_listener(self, listener):
+        # the listener will be called (without arguments) every time the token or the refresh token have changed
+        self._token_listener = listener
+
+    def _notify_token_listener(self):
+        if self._token_listener is not None:
+            try:
+                self._token_listener()
+            except Exception as exc:
+                _LOGGER.warning(f"token listener caused: {exc}")
+
+    def as_dict(self) -> dict:
+        return {"token": self._token, "refreshToken": self._the_refresh_token, "expires": self._token_expires}
+
+    def restore(self, data: dict):
+        # restoring the tokens of a previous session - an (almost) expired token will not be used, instead we
+        # will try the refresh token first, before we have to log in again with the credentials
+        token = data.get("token")
+        self._the_refresh_token = data.get("refreshToken")
+        self._set_token(token)
+        if token is not None and self._is_expiring():
+            _LOGGER.debug(f"restored token is expired")
+            self._set_token(None)
+
+        self._require_refresh = self._token is None and self._the_refresh_token is not None
+        _LOGGER.debug(f"restored session - token: {self._token is not None} refresh required: {self._require_refresh}")
+
+    def should_be_refreshed(self) -> bool:
+        return self._require_refresh or self._token is None
+
+    def _is_expiring(self) -> bool:
+        return self._token_expires is not None and time.time() >= self._token_expires - 10
+
+    def _set_token(self, token: str | None):
+        self._token = token
+        self._token_expires = None
+        if token is not None:
+            self._headers = {**BASE_HEADERS, "Content-Type": "application/json; charset=utf-8", "Authorization": token}
+            self._headers_ws = {**BASE_HEADERS, "Sec-WebSocket-Protocol": "graphql-transport-ws", "Authorization": token}
+            self._token_expires = decode_token_expiry(token)
+        else:
+            self._headers = None
+            self._headers_ws = None
+        self._schedule_proactive_refresh()
+
+    def _schedule_proactive_refresh(self):
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+
+        if not self._proactive_refresh or self._token_expires is None:
+            return
+
+        now = time.time()
+        lifetime = self._token_expires - now
+        delay = max(lifetime - TOKEN_REFRESH_MARGIN, lifetime / 2, 0)
+        _LOGGER.debug(f"token expires in {int(lifetime)} seconds - scheduled refresh in {int(delay)} seconds")
+        self._refresh_handle = asyncio.get_running_loop().call_later(delay, self._start_proactive_refresh)
+
+    def _start_proactive_refresh(self):
+        self._refresh_handle = None
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = self._hass.async_create_background_task(self._async_proactive_refresh(),
+                                                                         name=f"{DOMAIN}_token_refresh")
+
+    async def _async_proactive_refresh(self):
+        try:
+            async with self._lock:
+                await self._async_renew()
+            if self._token is not None:
+                self._refresh_failures = 0
+                return
+            _LOGGER.info(f"proactive token refresh failed")
+        except Exception as exc:
+            _LOGGER.warning(f"proactive token refresh caused: {type(exc).__name__} {exc}")
+
+        # the next request will renew the token on demand anyway - but we keep trying in the background
+        delay = min(TOKEN_REFRESH_RETRY_MIN * (2 ** self._refresh_failures), TOKEN_REFRESH_RETRY_MAX)
+        self._refresh_failures += 1
+        _LOGGER.debug(f"retry the token refresh in {delay} seconds")
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+        self._refresh_handle = asyncio.get_running_loop().call_later(delay, self._start_proactive_refresh)
+
+    async def _async_renew(self):
+        # must be called while holding the lock
+        old_token = self._token
+        if self._the_refresh_token is not None:
+            await self._refresh_token()
+        if self._token is None:
+            await self._login()
+        if self._token is not None and self._token != old_token:
+            self._metrics.avoided_401 += 1
+            _LOGGER.debug(f"token renewed before it expired [avoided 401 responses: {self._metrics.avoided_401}]")
+
+    def close(self):
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+
+    async def async_get_token(self) -> str | None:
+        # fast path - no need to wait for the lock when we have a valid token
+        if self._token is not None and not self._require_refresh and not self._is_expiring():
+            return self._token
+
+        async with self._lock:
+            # while we have been waiting for the lock, another caller might have already done the job
+            if self._token is not None and not self._require_refresh and self._is_expiring():
+                # the scheduled refresh did not happen in time (e.g. suspended system)
+                await self._async_renew()
+            if self._require_refresh:
+                await self._refresh_token()
+            if self._token is None:
+                await self._login()
+            return self._token
+
+    async def async_token_rejected(self, token: str | None):
+        async with self._lock:
+            if token is None or token != self._token:
+                _LOGGER.debug(f"rejected token has already been replaced")
+                return
+
+            if self._the_refresh_token is None:
+                _LOGGER.warning(f"no refresh token available - wait for next call to re-login...")
+                self._require_refresh = False
+                self._set_token(None)
+                self._notify_token_listener()
+            else:
+                _LOGGER.debug(f"refresh token available... try to refresh next...")
+                self._require_refresh = True
+            self._rejections += 1
+
+    async def login(self):
+        async with self._lock:
+            await self._login()
+
+    async def refresh_token(self):
+        async with self._lock:
+            await self._refresh_token()
+
+    async def _async_send(self, method, url: str, endpoint: str, headers: dict, data=None) -> tuple[int, str, str | None, bytes]:
+        # a single login/refresh request - during an outage of tibber the (open) breaker of the account stops
+        # these requests too, and failed ones count like failed data requests
+        if self._breaker is not None and not self._breaker.allow_request():
+            raise TibberGraphApiUnavailable(f"circuit breaker is {self._breaker.state}")
+
+        started = time.monotonic()
+        try:
+            async with method(url, data=data, headers=headers) as response:
+                raw = await response.read()
+                status = response.status
+                # the reason is only used for logging (of failed requests)
+                reason = response.reason if status != 200 else None
+                content_type = response.headers.get("Content-Type")
+        except Exception as err:
+            self._metrics.record_request(endpoint, 0, started, 0)
+            if self._breaker is not None:
+                self._breaker.record_failure(f"{type(err).__name__}")
+            raise
+        except BaseException:
+            if self._breaker is not None:
+                self._breaker.release_probe()
+            raise
+
+        self._metrics.record_request(endpoint, status, started, len(raw))
+        if self._breaker is not None:
+            if status in RETRY_STATUS_CODES:
+                self._breaker.record_failure(f"{status} {reason}")
+            else:
+                self._breaker.record_success()
+        return status, reason, content_type, raw
+
+    async def _login(self):
+        login_headers = {**BASE_HEADERS, "Content-Type": "application/x-www-form-urlencoded"}
+        login_data = f"email={self._user}&password={self._pwd}"
+        status, reason, content_type, raw = await self._async_send(self._web_session.post, self.LOGIN_URL, ENDPOINT_LOGIN,
+                                                                    login_headers, data=login_data)
+        if status == 200:
+            data = json.loads(raw)
+            self._set_token(data["token"])
+            if "refreshToken" in data:
+                _LOGGER.debug(f"refreshToken received")
+                self._the_refresh_token = data["refreshToken"]
+                self._require_refresh = False
+        else:
+            _LOGGER.warning(f"login {status} -> {reason}")
+        self._notify_token_listener()
+
+    async def _refresh_token(self):
+        if self._the_refresh_token is not None:
+            refresh_headers = {**BASE_HEADERS, "Content-Type": "application/json; charset=utf-8", "Authorization": self._the_refresh_token}
+            status, reason, content_type, raw = await self._async_send(self._web_session.put, self.REFRESH_URL, ENDPOINT_REFRESH,
+                                                                        refresh_headers)
+            if status == 200:
+                ref_data = None
+                ref_text = None
+                if content_type == "application/json":
+                    ref_data = json.loads(raw)
+                else:
+                    # we try to parse the text as json ?!
+                    ref_text = raw.decode("utf-8", errors="replace")
+                    try:
+                        ref_data = json.loads(ref_text)
+                    except Exception as other:
+                        _LOGGER.warning(f"could not parse refresh response: {other} {ref_text}")
+
+                if ref_data is not None and "token" in ref_data:
+                    self._require_refresh = False
+                    self._set_token(ref_data["token"])
+                    if "refreshToken" in ref_data:
+                        _LOGGER.debug(f"refreshToken updated !")
+                        self._the_refresh_token = ref_data["refreshToken"]
+                    else:
+                        _LOGGER.warning(f"not refreshToken provided !")
+                        self._the_refresh_token = None
+                else:
+                    _LOGGER.warning(f"no valid data in refresh token response: {ref_data} {ref_text}")
+                    self._require_refresh = False
+                    self._set_token(None)
+            else:
+                _LOGGER.warning(f"refresh_token: {status} -> {reason}")
+                self._require_refresh = False
+                self._set_token(None)
+        else:
+            _LOGGER.warning(f"refresh token was called but the 'refresh_token' is NONE")
+            self._require_refresh = False
+            self._set_token(None)
+        self._notify_token_listener()
+
+
+def decode_token_expiry(token: str) -> float | None:
+    # the tibber token is a JWT - the payload (2nd part) contains the 'exp' claim (epoch seconds)
+    try:
+        parts = token.split(".")
+        if len(parts) != 3:
+            return None
+        payload = parts[1]
+        payload = payload + "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        if "exp" in claims:
+            return float(claims["exp"])
+    except Exception as exc:
+        _LOGGER.debug(f"could not decode token expiry: {exc}")
+    return None
@@ -2,14 +2,16 @@ import logging
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import STATE_OFF
+from homeassistant.const import STATE_OFF, STATE_ON
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 
 from custom_components.tibber_graphapi import TibberGraphApiDataUpdateCoordinator, TibberGraphApiEntity
 from custom_components.tibber_graphapi.const import (
     DOMAIN,
     BINARY_SENSORS,
+    PLAN_BINARY_SENSORS,
     ExtBinarySensorEntityDescription
 )
 
@@ -24,37 +26,39 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, add_
         entity = TibberGraphApiBinarySensor(coordinator, description)
         entities.append(entity)
 
+    if coordinator.charge_plan is not None:
+        for description in PLAN_BINARY_SENSORS:
+            entity = TibberGraphApiBinarySensor(coordinator.charge_plan, description)
+            entities.append(entity)
+
     add_entity_cb(entities)
 
 
-class TibberGraphApiBinarySensor(TibberGraphApiEntity, BinarySensorEntity):
+class TibberGraphApiBinarySensor(TibberGraphApiEntity, BinarySensorEntity, RestoreEntity):
+    _restored_is_on = None
+
     def __init__(self, coordinator: TibberGraphApiDataUpdateCoordinator, description: ExtBinarySensorEntityDescription):
         super().__init__(coordinator=coordinator, description=description)
         self._attr_icon_off = self.entity_description.icon_off
 
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if self.coordinator.data is None:
+            last_state = await self.async_get_last_state()
+            if last_state is not None and last_state.state in (STATE_ON, STATE_OFF):
+                self._restored_is_on = last_state.state == STATE_ON
+                self._restored = True
+
     @property
     def is_on(self) -> bool | None:
+        if self.coordinator.data is None and self._restored_is_on is not None:
+            # no live data yet
+            return self._restored_is_on
+
         value = None
-        try:
-            if self.coordinator.data is not None:
-                if hasattr(self.entity_description, "tag"):
-                    # jpath is set ?! ["key1", "child2"]]
-                    if self.entity_description.tag.jpath is not None and len(self.entity_description.tag.jpath) > 0:
-                        path = self.entity_description.tag.jpath
-                        value = self.get_value_in_path(self.coordinator.data, path)
-
-                    elif self.entity_description.tag.jkey is not None:
-                        value = self.coordinator.data[self.entity_description.tag.jkey]
-
-                        # have we a key/value map ?!
-                        if isinstance(value, list) and "key" in value[0]:
-                            if self.entity_description.tag.jvaluekey is not None:
-                                for item in value:
-                                    if item["key"] == self.entity_description.tag.jvaluekey:
-                                        value = item["value"]
-
-        except (IndexError, ValueError, TypeError) as ex:
-            _LOGGER.warning(f"Error for binary_sensor '{self.entity_description.key}': {ex}")
+        if self.coordinator.data is not None and hasattr(self.entity_description, "tag"):
+            # the extraction is compiled (see tags.compile_tag) & cached by the coordinator
+            value = self.coordinator.get_value(self.entity_description.tag)
 
         if value is not None:
             if not isinstance(value, bool):
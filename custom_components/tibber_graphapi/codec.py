@@ -0,0 +1,85 @@
+import json
+import logging
+import re
+
+_LOGGER = logging.getLogger(__name__)
+
+try:
+    # orjson is a requirement of HA core - but we do not rely on it
+    import orjson
+
+    def json_loads(raw: str | bytes):
+        return orjson.loads(raw)
+
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    JSON_CODEC = "orjson"
+
+except ImportError:
+
+    def json_loads(raw: str | bytes):
+        return json.loads(raw)
+
+    def json_dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+    JSON_CODEC = "json"
+
+FRAME_TYPE_KA = "ka"
+FRAME_TYPE_NEXT = "next"
+FRAME_TYPE_UNKNOWN = "unknown"
+
+# the members 'type' & 'id' of a graphql-transport-ws frame - they are only looked up in front of the first nested
+# object (or array) of the frame, where all members are top level members for sure. When the server puts them
+# behind the payload, they are not found and the frame is decoded completely
+_TYPE_PATTERN_STR = re.compile(r'"type"\s*:\s*"([^"]*)"')
+_TYPE_PATTERN_BYTES = re.compile(rb'"type"\s*:\s*"([^"]*)"')
+_ID_PATTERN_STR = re.compile(r'"id"\s*:\s*"([^"]*)"')
+_ID_PATTERN_BYTES = re.compile(rb'"id"\s*:\s*"([^"]*)"')
+_NESTED_PATTERN_STR = re.compile(r'[{\[]')
+_NESTED_PATTERN_BYTES = re.compile(rb'[{\[]')
+
+
+def _top_level_end(raw: str | bytes) -> int:
+    pattern = _NESTED_PATTERN_STR if isinstance(raw, str) else _NESTED_PATTERN_BYTES
+    match = pattern.search(raw, 1)
+    return match.start() if match is not None else len(raw)
+
+
+def _scan(raw: str | bytes, end: int, pattern_str, pattern_bytes) -> str | None:
+    if isinstance(raw, str):
+        match = pattern_str.search(raw, 0, end)
+        return match.group(1) if match is not None else None
+    match = pattern_bytes.search(raw, 0, end)
+    return match.group(1).decode("utf-8") if match is not None else None
+
+
+class TibberGraphApiFrameDecoder:
+    # decodes the (text or binary) frames of the websocket - keep-alive frames and 'next' frames of
+    # subscriptions we do not know (anymore) are rejected by a cheap scan, without decoding the frame
+
+    def __init__(self, loads=None):
+        self._loads = loads if loads is not None else json_loads
+        self.decoded = 0
+        self.rejected = 0
+
+    def decode(self, raw: str | bytes, subscription_ids) -> tuple[str, dict | None]:
+        # returns the type of the frame and the decoded frame (None, when the frame has been rejected)
+        end = _top_level_end(raw)
+        frame_type = _scan(raw, end, _TYPE_PATTERN_STR, _TYPE_PATTERN_BYTES)
+        if frame_type == FRAME_TYPE_KA:
+            self.rejected += 1
+            return frame_type, None
+
+        if frame_type == FRAME_TYPE_NEXT:
+            frame_id = _scan(raw, end, _ID_PATTERN_STR, _ID_PATTERN_BYTES)
+            if frame_id is not None and frame_id not in subscription_ids:
+                self.rejected += 1
+                return frame_type, None
+
+        data = self._loads(raw)
+        self.decoded += 1
+        if not isinstance(data, dict):
+            return FRAME_TYPE_UNKNOWN, None
+        return data.get("type", FRAME_TYPE_UNKNOWN), data
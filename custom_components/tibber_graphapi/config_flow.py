@@ -14,12 +14,32 @@ from custom_components.tibber_graphapi.const import (
     CONF_VEHINDEX_NUMBER,
     CONF_TIBBER_VEHICLE_ID,
     CONF_TIBBER_VEHICLE_NAME,
+    CONF_FLEET_POLLING,
+    CONF_PULSE_LIVE,
+    CONF_PULSE_WINDOW,
+    CONF_POLL_MIN_INTERVAL,
+    CONF_POLL_MAX_INTERVAL,
+    CONF_STATISTICS_IMPORT,
+    CONF_CHARGE_PLANNER,
+    CONF_CHARGE_RATE,
+    CONF_CHARGE_DEADLINE,
+    CONF_CHARGING_HISTORY,
 
     DEFAULT_CONF_NAME,
     DEFAULT_USERNAME,
     DEFAULT_PWD,
     DEFAULT_SCAN_INTERVAL,
-    DEFAULT_VEHINDEX_NUMBER
+    DEFAULT_VEHINDEX_NUMBER,
+    DEFAULT_FLEET_POLLING,
+    DEFAULT_PULSE_LIVE,
+    DEFAULT_PULSE_WINDOW,
+    DEFAULT_POLL_MIN_INTERVAL,
+    DEFAULT_POLL_MAX_INTERVAL,
+    DEFAULT_STATISTICS_IMPORT,
+    DEFAULT_CHARGE_PLANNER,
+    DEFAULT_CHARGE_RATE,
+    DEFAULT_CHARGE_DEADLINE,
+    DEFAULT_CHARGING_HISTORY
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -166,6 +186,36 @@ class TibberLocalOptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Required(CONF_SCAN_INTERVAL, default=self.options.get(CONF_SCAN_INTERVAL,
                                                                           self.data.get(CONF_SCAN_INTERVAL,
                                                                                         DEFAULT_SCAN_INTERVAL))): int,
+                vol.Required(CONF_POLL_MIN_INTERVAL, default=self.options.get(CONF_POLL_MIN_INTERVAL,
+                                                                              self.data.get(CONF_POLL_MIN_INTERVAL,
+                                                                                            DEFAULT_POLL_MIN_INTERVAL))): int,
+                vol.Required(CONF_POLL_MAX_INTERVAL, default=self.options.get(CONF_POLL_MAX_INTERVAL,
+                                                                              self.data.get(CONF_POLL_MAX_INTERVAL,
+                                                                                            DEFAULT_POLL_MAX_INTERVAL))): int,
+                vol.Required(CONF_FLEET_POLLING, default=self.options.get(CONF_FLEET_POLLING,
+                                                                          self.data.get(CONF_FLEET_POLLING,
+                                                                                        DEFAULT_FLEET_POLLING))): bool,
+                vol.Required(CONF_PULSE_LIVE, default=self.options.get(CONF_PULSE_LIVE,
+                                                                       self.data.get(CONF_PULSE_LIVE,
+                                                                                     DEFAULT_PULSE_LIVE))): bool,
+                vol.Required(CONF_PULSE_WINDOW, default=self.options.get(CONF_PULSE_WINDOW,
+                                                                         self.data.get(CONF_PULSE_WINDOW,
+                                                                                       DEFAULT_PULSE_WINDOW))): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+                vol.Required(CONF_STATISTICS_IMPORT, default=self.options.get(CONF_STATISTICS_IMPORT,
+                                                                              self.data.get(CONF_STATISTICS_IMPORT,
+                                                                                            DEFAULT_STATISTICS_IMPORT))): bool,
+                vol.Required(CONF_CHARGE_PLANNER, default=self.options.get(CONF_CHARGE_PLANNER,
+                                                                           self.data.get(CONF_CHARGE_PLANNER,
+                                                                                         DEFAULT_CHARGE_PLANNER))): bool,
+                vol.Required(CONF_CHARGE_RATE, default=self.options.get(CONF_CHARGE_RATE,
+                                                                        self.data.get(CONF_CHARGE_RATE,
+                                                                                      DEFAULT_CHARGE_RATE))): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=100)),
+                vol.Required(CONF_CHARGE_DEADLINE, default=self.options.get(CONF_CHARGE_DEADLINE,
+                                                                            self.data.get(CONF_CHARGE_DEADLINE,
+                                                                                          DEFAULT_CHARGE_DEADLINE))): vol.All(int, vol.Range(min=0, max=23)),
+                vol.Required(CONF_CHARGING_HISTORY, default=self.options.get(CONF_CHARGING_HISTORY,
+                                                                             self.data.get(CONF_CHARGING_HISTORY,
+                                                                                           DEFAULT_CHARGING_HISTORY))): bool,
             }),
         )
 
@@ -2,30 +2,163 @@ from custom_components.tibber_graphapi.tags import TGATag
 from typing import Final
 
 from homeassistant.components.binary_sensor import BinarySensorEntityDescription
+from homeassistant.components.number import NumberEntityDescription, NumberMode
 from homeassistant.components.sensor import (
     SensorEntityDescription,
     SensorStateClass,
+    SensorDeviceClass,
 )
 from homeassistant.const import (
     PERCENTAGE,
+    SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+    UnitOfInformation,
     UnitOfLength,
+    UnitOfPower,
+    UnitOfEnergy,
+    UnitOfElectricCurrent,
+    UnitOfElectricPotential,
+    UnitOfTime,
     EntityCategory
 )
 
 DOMAIN: Final = "tibber_graphapi"
 MANUFACTURE: Final = "Tibber"
 
-PLATFORMS: Final = ["binary_sensor", "sensor"]
+PLATFORMS: Final = ["binary_sensor", "number", "sensor"]
 
 CONF_TIBBER_VEHICLE_ID = "tibber_vehicle_id"
 CONF_TIBBER_VEHICLE_NAME = "tibber_vehicle_name"
 CONF_VEHINDEX_NUMBER = "vehicle_index_number"
+CONF_FLEET_POLLING = "fleet_polling"
+CONF_PULSE_LIVE = "pulse_live"
+CONF_PULSE_WINDOW = "pulse_coalesce_window"
+CONF_POLL_MIN_INTERVAL = "poll_min_interval"
+CONF_POLL_MAX_INTERVAL = "poll_max_interval"
+CONF_STATISTICS_IMPORT = "statistics_import"
+CONF_CHARGE_PLANNER = "charge_planner"
+CONF_CHARGE_RATE = "charge_rate"
+CONF_CHARGE_DEADLINE = "charge_deadline"
+CONF_CHARGING_HISTORY = "charging_history"
+
+DATA_ACCOUNTS: Final = "accounts"
+
+# persistent data (tokens) of an account - one store per account
+STORAGE_VERSION: Final = 1
+STORAGE_KEY_ACCOUNT: Final = f"{DOMAIN}.account"
+STORAGE_SAVE_DELAY: Final = 10
+# the not yet imported statistics of an entry - one store per entry
+STORAGE_KEY_STATISTICS: Final = f"{DOMAIN}.statistics"
+# the charging sessions of a vehicle - one store per entry
+STORAGE_KEY_HISTORY: Final = f"{DOMAIN}.history"
+
+# the vehicles & pulse gizmos of an account will be re-discovered after this number of seconds
+DISCOVERY_TTL: Final = 86400
 
 DEFAULT_CONF_NAME = "TGA"
 DEFAULT_USERNAME = "your-tibber-account-email"
 DEFAULT_PWD = ""
 DEFAULT_SCAN_INTERVAL = 60
+DEFAULT_POLL_MIN_INTERVAL = 30
+DEFAULT_POLL_MAX_INTERVAL = 1800
 DEFAULT_VEHINDEX_NUMBER = 0
+DEFAULT_FLEET_POLLING = True
+DEFAULT_PULSE_LIVE = False
+DEFAULT_PULSE_WINDOW = 5
+DEFAULT_STATISTICS_IMPORT = False
+DEFAULT_CHARGE_PLANNER = False
+# SOC percent per hour & the (local) hour of the day, when the vehicle must be charged
+DEFAULT_CHARGE_RATE = 10
+DEFAULT_CHARGE_DEADLINE = 7
+DEFAULT_CHARGING_HISTORY = False
+
+# statistics import: the values are collected in buckets of STATISTICS_BUCKET seconds and the complete hours
+# are imported every STATISTICS_FLUSH_INTERVAL seconds
+STATISTICS_BUCKET = 300
+STATISTICS_FLUSH_INTERVAL = 900
+# the (daily) counters of the pulse: after a gap of STATISTICS_MAX_COUNTER_GAP seconds the last reading is
+# not used anymore
+STATISTICS_MAX_COUNTER_GAP = 86400
+
+# the prices of a day are fetched only once - the prices of tomorrow are expected after PRICES_PUBLICATION_HOUR
+# (local time), till they are available we ask every PRICES_RETRY_INTERVAL seconds. The charging plan is
+# recalculated at least every CHARGE_PLAN_INTERVAL seconds (and at the start of every price slot)
+PRICES_PUBLICATION_HOUR = 13
+PRICES_RETRY_INTERVAL = 900
+CHARGE_PLAN_INTERVAL = 300
+
+# charging history: the sessions are read in pages of HISTORY_PAGE_SIZE (max HISTORY_MAX_PAGES per update),
+# the history is updated every HISTORY_INTERVAL seconds (and when a charging session has ended). The local
+# cache keeps the last HISTORY_MAX_SESSIONS sessions
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGES = 10
+HISTORY_INTERVAL = 3600
+HISTORY_MAX_SESSIONS = 2000
+
+# writeable settings: all changes within SETTINGS_DEBOUNCE seconds are written with a single mutation - but
+# not later than SETTINGS_MAX_DELAY seconds after the first change
+SETTINGS_DEBOUNCE = 1.5
+SETTINGS_MAX_DELAY = 5.0
+
+# retries of failed requests (connection errors & temporary server errors) with a jittered exponential
+# backoff - and the circuit breaker, that stops all requests of an account during an outage of tibber
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 10.0
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_MIN = 30
+BREAKER_COOLDOWN_MAX = 900
+
+# when the entry that owns the pulses of an account has been unloaded (and is not back after PULSE_TAKEOVER_DELAY
+# seconds), another entry of the account takes over
+PULSE_TAKEOVER_DELAY = 30
+
+# reconnect delays (in seconds) for the pulse websocket
+PULSE_RECONNECT_MIN = 5
+PULSE_RECONNECT_MAX = 300
+
+# watchdog of the pulse websocket: when there was no frame for STREAM_PING_AFTER seconds, a ping is sent - when
+# there was no frame for STREAM_STALE_AFTER seconds (or for STREAM_STALE_KA_FACTOR times the keep-alive
+# interval of the server, if that is longer) the connection is considered as dead and will be reconnected.
+# A pulse without a measurement for that long is marked as unavailable
+STREAM_WATCHDOG_INTERVAL = 5
+STREAM_PING_AFTER = 20
+STREAM_STALE_AFTER = 60
+STREAM_STALE_KA_FACTOR = 3
+
+# coalescing of the pulse frames: when a flush is later than PULSE_MAX_LAG seconds, the window will be
+# increased (up to PULSE_MAX_WINDOW_FACTOR times the configured window)
+PULSE_MAX_LAG = 1.0
+PULSE_MAX_WINDOW_FACTOR = 8
+
+# rolling aggregates (mean/min/max) of the pulse fields over the last 1/5/15 minutes [in seconds] - the
+# samples are collected in buckets of PULSE_ROLLING_RESOLUTION seconds. The power values are integrated to
+# energy, as long as the gap between two frames is not larger than PULSE_ENERGY_MAX_GAP seconds
+PULSE_ROLLING_FIELDS: Final = ("power", "powerProduction", "currentPhase1", "currentPhase2", "currentPhase3",
+                               "voltagePhase1", "voltagePhase2", "voltagePhase3")
+PULSE_ROLLING_WINDOWS: Final = (60, 300, 900)
+PULSE_ROLLING_RESOLUTION = 10
+PULSE_ENERGY_MAX_GAP = 60
+
+# deadbands of the pulse fields: (absolute, relative) - a new value is only published when the change is
+# larger than both of them [fields that are not listed here are published on every change]
+PULSE_DEADBANDS: Final = {
+    "power":                (5, 0.01),
+    "powerProduction":      (5, 0.01),
+    "averagePower":         (5, 0.01),
+    "currentPhase1":        (0.1, None),
+    "currentPhase2":        (0.1, None),
+    "currentPhase3":        (0.1, None),
+    "voltagePhase1":        (1.0, None),
+    "voltagePhase2":        (1.0, None),
+    "voltagePhase3":        (1.0, None),
+    "powerFactor":          (0.01, None),
+    "signalStrength":       (2, None),
+    "accumulatedCost":      (0.01, None),
+    "accumulatedReward":    (0.01, None),
+}
+
+# the currency of the pulse cost values is part of the measurement itself
+UNIT_CURRENCY_PLACEHOLDER: Final = "@@@"
 
 # for evcc we need the following sensor types!
 # https://docs.evcc.io/docs/devices/vehicles#manuell
@@ -37,6 +170,12 @@ class ExtBinarySensorEntityDescription(BinarySensorEntityDescription, frozen_or_
 class ExtSensorEntityDescription(SensorEntityDescription, frozen_or_thawed=True):
     tag: TGATag | None = None
 
+class ExtNumberEntityDescription(NumberEntityDescription, frozen_or_thawed=True):
+    tag: TGATag | None = None
+
+class MetricSensorEntityDescription(SensorEntityDescription, frozen_or_thawed=True):
+    metric: str | None = None
+
 BINARY_SENSORS = [
     ExtBinarySensorEntityDescription(
         tag=TGATag.VEH_PIN_REQUIRED,
@@ -59,6 +198,17 @@ BINARY_SENSORS = [
 
 ]
 
+PLAN_BINARY_SENSORS = [
+    ExtBinarySensorEntityDescription(
+        tag=TGATag.PLAN_ACTIVE,
+        key=TGATag.PLAN_ACTIVE.key,
+        name="Charge now (plan)",
+        icon="mdi:ev-plug-type2",
+        icon_off="mdi:power-plug-off-outline",
+        device_class=None
+    )
+]
+
 SENSOR_TYPES = [
     ExtSensorEntityDescription(
         tag=TGATag.VEH_CHARGING_STATUS,
@@ -109,3 +259,830 @@ SENSOR_TYPES = [
         suggested_display_precision=0
     ),
 ]
+
+NUMBER_ENTITIES = [
+    ExtNumberEntityDescription(
+        tag=TGATag.VEH_SOCMAX,
+        key=TGATag.VEH_SOCMAX.key,
+        name="SOC MAX",
+        icon="mdi:battery-charging-100",
+        device_class=None,
+        native_min_value=0,
+        native_max_value=100,
+        native_step=1,
+        mode=NumberMode.SLIDER,
+        native_unit_of_measurement=PERCENTAGE,
+        entity_category=EntityCategory.CONFIG
+    ),
+    ExtNumberEntityDescription(
+        tag=TGATag.VEH_SOCMIN,
+        key=TGATag.VEH_SOCMIN.key,
+        name="SOC min",
+        icon="mdi:battery-charging-outline",
+        device_class=None,
+        native_min_value=0,
+        native_max_value=100,
+        native_step=1,
+        mode=NumberMode.SLIDER,
+        native_unit_of_measurement=PERCENTAGE,
+        entity_category=EntityCategory.CONFIG
+    ),
+]
+
+PULSE_SENSOR_TYPES = [
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER,
+        key=TGATag.PULSE_POWER.key,
+        name="Power",
+        icon="mdi:home-lightning-bolt-outline",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION,
+        key=TGATag.PULSE_POWER_PRODUCTION.key,
+        name="Power production",
+        icon="mdi:solar-power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_MIN_POWER,
+        key=TGATag.PULSE_MIN_POWER.key,
+        name="Power min (today)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_AVERAGE_POWER,
+        key=TGATag.PULSE_AVERAGE_POWER.key,
+        name="Power average (today)",
+        icon="mdi:arrow-collapse-vertical",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_MAX_POWER,
+        key=TGATag.PULSE_MAX_POWER.key,
+        name="Power max (today)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_MIN_POWER_PRODUCTION,
+        key=TGATag.PULSE_MIN_POWER_PRODUCTION.key,
+        name="Power production min (today)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_MAX_POWER_PRODUCTION,
+        key=TGATag.PULSE_MAX_POWER_PRODUCTION.key,
+        name="Power production max (today)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ACC_CONSUMPTION,
+        key=TGATag.PULSE_ACC_CONSUMPTION.key,
+        name="Consumption (today)",
+        icon="mdi:home-import-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ACC_CONSUMPTION_HOUR,
+        key=TGATag.PULSE_ACC_CONSUMPTION_HOUR.key,
+        name="Consumption (current hour)",
+        icon="mdi:home-import-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_EST_ACC_CONSUMPTION_HOUR,
+        key=TGATag.PULSE_EST_ACC_CONSUMPTION_HOUR.key,
+        name="Estimated consumption (current hour)",
+        icon="mdi:home-import-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=None,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ACC_PRODUCTION,
+        key=TGATag.PULSE_ACC_PRODUCTION.key,
+        name="Production (today)",
+        icon="mdi:home-export-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ACC_PRODUCTION_HOUR,
+        key=TGATag.PULSE_ACC_PRODUCTION_HOUR.key,
+        name="Production (current hour)",
+        icon="mdi:home-export-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ACC_COST,
+        key=TGATag.PULSE_ACC_COST.key,
+        name="Cost (today)",
+        icon="mdi:cash",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=None,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=2
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ACC_REWARD,
+        key=TGATag.PULSE_ACC_REWARD.key,
+        name="Reward (today)",
+        icon="mdi:cash-plus",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=None,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=2,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_CURRENT_PHASE1,
+        key=TGATag.PULSE_CURRENT_PHASE1.key,
+        name="Current phase 1",
+        icon="mdi:current-ac",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_CURRENT_PHASE2,
+        key=TGATag.PULSE_CURRENT_PHASE2.key,
+        name="Current phase 2",
+        icon="mdi:current-ac",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_CURRENT_PHASE3,
+        key=TGATag.PULSE_CURRENT_PHASE3.key,
+        name="Current phase 3",
+        icon="mdi:current-ac",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_VOLTAGE_PHASE1,
+        key=TGATag.PULSE_VOLTAGE_PHASE1.key,
+        name="Voltage phase 1",
+        icon="mdi:sine-wave",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_VOLTAGE_PHASE2,
+        key=TGATag.PULSE_VOLTAGE_PHASE2.key,
+        name="Voltage phase 2",
+        icon="mdi:sine-wave",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_VOLTAGE_PHASE3,
+        key=TGATag.PULSE_VOLTAGE_PHASE3.key,
+        name="Voltage phase 3",
+        icon="mdi:sine-wave",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_FACTOR,
+        key=TGATag.PULSE_POWER_FACTOR.key,
+        name="Power factor",
+        icon="mdi:angle-acute",
+        device_class=SensorDeviceClass.POWER_FACTOR,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=2,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_SIGNAL_STRENGTH,
+        key=TGATag.PULSE_SIGNAL_STRENGTH.key,
+        name="Signal strength",
+        icon="mdi:wifi",
+        device_class=SensorDeviceClass.SIGNAL_STRENGTH,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_FRAMES_MERGED,
+        key=TGATag.PULSE_FRAMES_MERGED.key,
+        name="Frames merged",
+        icon="mdi:call-merge",
+        device_class=None,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_FRAMES_DROPPED,
+        key=TGATag.PULSE_FRAMES_DROPPED.key,
+        name="Frames dropped",
+        icon="mdi:delete-clock-outline",
+        device_class=None,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MEAN_1M,
+        key=TGATag.PULSE_POWER_MEAN_1M.key,
+        name="Power mean (1 min)",
+        icon="mdi:chart-bell-curve-cumulative",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MIN_1M,
+        key=TGATag.PULSE_POWER_MIN_1M.key,
+        name="Power min (1 min)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MAX_1M,
+        key=TGATag.PULSE_POWER_MAX_1M.key,
+        name="Power max (1 min)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MEAN_5M,
+        key=TGATag.PULSE_POWER_MEAN_5M.key,
+        name="Power mean (5 min)",
+        icon="mdi:chart-bell-curve-cumulative",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MIN_5M,
+        key=TGATag.PULSE_POWER_MIN_5M.key,
+        name="Power min (5 min)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MAX_5M,
+        key=TGATag.PULSE_POWER_MAX_5M.key,
+        name="Power max (5 min)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MEAN_15M,
+        key=TGATag.PULSE_POWER_MEAN_15M.key,
+        name="Power mean (15 min)",
+        icon="mdi:chart-bell-curve-cumulative",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MIN_15M,
+        key=TGATag.PULSE_POWER_MIN_15M.key,
+        name="Power min (15 min)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_MAX_15M,
+        key=TGATag.PULSE_POWER_MAX_15M.key,
+        name="Power max (15 min)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MEAN_1M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MEAN_1M.key,
+        name="Power production mean (1 min)",
+        icon="mdi:chart-bell-curve-cumulative",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MIN_1M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MIN_1M.key,
+        name="Power production min (1 min)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MAX_1M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MAX_1M.key,
+        name="Power production max (1 min)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MEAN_5M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MEAN_5M.key,
+        name="Power production mean (5 min)",
+        icon="mdi:chart-bell-curve-cumulative",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MIN_5M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MIN_5M.key,
+        name="Power production min (5 min)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MAX_5M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MAX_5M.key,
+        name="Power production max (5 min)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MEAN_15M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MEAN_15M.key,
+        name="Power production mean (15 min)",
+        icon="mdi:chart-bell-curve-cumulative",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MIN_15M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MIN_15M.key,
+        name="Power production min (15 min)",
+        icon="mdi:arrow-collapse-down",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_POWER_PRODUCTION_MAX_15M,
+        key=TGATag.PULSE_POWER_PRODUCTION_MAX_15M.key,
+        name="Power production max (15 min)",
+        icon="mdi:arrow-collapse-up",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_CURRENT_PHASE1_MEAN_5M,
+        key=TGATag.PULSE_CURRENT_PHASE1_MEAN_5M.key,
+        name="Current phase 1 mean (5 min)",
+        icon="mdi:current-ac",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_CURRENT_PHASE2_MEAN_5M,
+        key=TGATag.PULSE_CURRENT_PHASE2_MEAN_5M.key,
+        name="Current phase 2 mean (5 min)",
+        icon="mdi:current-ac",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_CURRENT_PHASE3_MEAN_5M,
+        key=TGATag.PULSE_CURRENT_PHASE3_MEAN_5M.key,
+        name="Current phase 3 mean (5 min)",
+        icon="mdi:current-ac",
+        device_class=SensorDeviceClass.CURRENT,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_VOLTAGE_PHASE1_MEAN_5M,
+        key=TGATag.PULSE_VOLTAGE_PHASE1_MEAN_5M.key,
+        name="Voltage phase 1 mean (5 min)",
+        icon="mdi:sine-wave",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_VOLTAGE_PHASE2_MEAN_5M,
+        key=TGATag.PULSE_VOLTAGE_PHASE2_MEAN_5M.key,
+        name="Voltage phase 2 mean (5 min)",
+        icon="mdi:sine-wave",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_VOLTAGE_PHASE3_MEAN_5M,
+        key=TGATag.PULSE_VOLTAGE_PHASE3_MEAN_5M.key,
+        name="Voltage phase 3 mean (5 min)",
+        icon="mdi:sine-wave",
+        device_class=SensorDeviceClass.VOLTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ENERGY_CONSUMPTION,
+        key=TGATag.PULSE_ENERGY_CONSUMPTION.key,
+        name="Energy consumption (integrated)",
+        icon="mdi:home-import-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PULSE_ENERGY_PRODUCTION,
+        key=TGATag.PULSE_ENERGY_PRODUCTION.key,
+        name="Energy production (integrated)",
+        icon="mdi:home-export-outline",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=3,
+        entity_registry_enabled_default=False
+    )
+]
+
+PLAN_SENSOR_TYPES = [
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_PRICE_CURRENT,
+        key=TGATag.PLAN_PRICE_CURRENT.key,
+        name="Electricity price",
+        icon="mdi:cash",
+        device_class=None,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=4
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_START,
+        key=TGATag.PLAN_START.key,
+        name="Charge plan start",
+        icon="mdi:clock-start",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        state_class=None
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_END,
+        key=TGATag.PLAN_END.key,
+        name="Charge plan end",
+        icon="mdi:clock-end",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        state_class=None
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_DURATION,
+        key=TGATag.PLAN_DURATION.key,
+        name="Charge plan duration",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=None,
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        suggested_display_precision=2
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_MEAN_PRICE,
+        key=TGATag.PLAN_MEAN_PRICE.key,
+        name="Charge plan price (average)",
+        icon="mdi:cash-check",
+        device_class=None,
+        state_class=None,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=4
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_WINDOW_START,
+        key=TGATag.PLAN_WINDOW_START.key,
+        name="Cheapest window start",
+        icon="mdi:clock-start",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        state_class=None,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_WINDOW_END,
+        key=TGATag.PLAN_WINDOW_END.key,
+        name="Cheapest window end",
+        icon="mdi:clock-end",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        state_class=None,
+        entity_registry_enabled_default=False
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.PLAN_WINDOW_MEAN_PRICE,
+        key=TGATag.PLAN_WINDOW_MEAN_PRICE.key,
+        name="Cheapest window price (average)",
+        icon="mdi:cash-check",
+        device_class=None,
+        state_class=None,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=4,
+        entity_registry_enabled_default=False
+    ),
+]
+
+HISTORY_SENSOR_TYPES = [
+    ExtSensorEntityDescription(
+        tag=TGATag.HIST_SESSIONS,
+        key=TGATag.HIST_SESSIONS.key,
+        name="Charging sessions",
+        icon="mdi:history",
+        device_class=None,
+        state_class=None,
+        entity_category=EntityCategory.DIAGNOSTIC
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.HIST_ENERGY_TOTAL,
+        key=TGATag.HIST_ENERGY_TOTAL.key,
+        name="Charged energy (total)",
+        icon="mdi:ev-station",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=1
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.HIST_COST_TOTAL,
+        key=TGATag.HIST_COST_TOTAL.key,
+        name="Charging cost (total)",
+        icon="mdi:cash-multiple",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=2
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.HIST_LAST_END,
+        key=TGATag.HIST_LAST_END.key,
+        name="Last charging session end",
+        icon="mdi:clock-end",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        state_class=None
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.HIST_LAST_ENERGY,
+        key=TGATag.HIST_LAST_ENERGY.key,
+        name="Last charging session energy",
+        icon="mdi:lightning-bolt",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=None,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        suggested_display_precision=2
+    ),
+    ExtSensorEntityDescription(
+        tag=TGATag.HIST_LAST_COST,
+        key=TGATag.HIST_LAST_COST.key,
+        name="Last charging session cost",
+        icon="mdi:cash",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=None,
+        native_unit_of_measurement=UNIT_CURRENCY_PLACEHOLDER,
+        suggested_display_precision=2
+    ),
+]
+
+# runtime metrics of the tibber account (requests, status codes, latency, websocket frames)
+METRIC_SENSOR_TYPES = [
+    MetricSensorEntityDescription(
+        metric="requests",
+        key="api_requests",
+        name="API requests",
+        icon="mdi:api",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="logins",
+        key="api_logins",
+        name="API logins",
+        icon="mdi:login",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="refreshes",
+        key="api_refreshes",
+        name="API token refreshes",
+        icon="mdi:refresh",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="unauthorized",
+        key="api_unauthorized",
+        name="API 401 responses",
+        icon="mdi:account-cancel",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="avoided_401",
+        key="api_avoided_unauthorized",
+        name="API avoided 401 responses",
+        icon="mdi:account-check",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="errors",
+        key="api_errors",
+        name="API errors",
+        icon="mdi:alert-circle-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="latency_avg",
+        key="api_latency_avg",
+        name="API latency (average)",
+        icon="mdi:timer-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="latency_p95",
+        key="api_latency_p95",
+        name="API latency (95th percentile)",
+        icon="mdi:timer-alert-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="bytes_received",
+        key="api_bytes_received",
+        name="API data received",
+        icon="mdi:download-network-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        suggested_unit_of_measurement=UnitOfInformation.KILOBYTES,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="unchanged_rate",
+        key="api_unchanged_rate",
+        name="API unchanged responses",
+        icon="mdi:content-duplicate",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=0,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="ws_frames",
+        key="ws_frames",
+        name="Websocket frames",
+        icon="mdi:message-processing-outline",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False
+    ),
+    MetricSensorEntityDescription(
+        metric="ws_frame_rate",
+        key="ws_frame_rate",
+        name="Websocket frame rate",
+        icon="mdi:speedometer",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement="frames/min",
+        suggested_display_precision=1,
+        entity_registry_enabled_default=False
+    )
+]
@@ -0,0 +1,108 @@
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from custom_components.tibber_graphapi.tags import TGATag, TAG_ACCESSORS, build_settings_index
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TibberGraphApiBaseCoordinator(DataUpdateCoordinator):
+    # every time new data is set, the generation is increased and the userSettings index is rebuilt - the
+    # values of the tags are only extracted once per generation (no matter how often HA reads the state)
+
+    _data = None
+    _settings_index = None
+    _values = None
+    _data_unchanged = False
+    data_generation = 0
+
+    # the values (and the availability) the entities have been notified about the last time
+    _snapshot = None
+    _snapshot_available = None
+    skipped_writes = 0
+
+    # increased every time a listener has been added or removed
+    listener_version = 0
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        if value is not None and value is self._data:
+            # the very same object (unchanged response) - the cached values & the snapshot stay valid
+            self._data_unchanged = True
+            return
+        self._data_unchanged = False
+        self._data = value
+        self._settings_index = build_settings_index(value)
+        self._values = {}
+        self.data_generation += 1
+
+    def get_value(self, tag: TGATag):
+        if self._data is None:
+            return None
+        try:
+            return self._values[tag]
+        except KeyError:
+            pass
+
+        try:
+            value = TAG_ACCESSORS[tag](self._data, self._settings_index)
+        except (KeyError, IndexError, ValueError, TypeError, AttributeError) as ex:
+            _LOGGER.warning(f"Error for tag '{tag.key}': {ex}")
+            value = None
+
+        self._values[tag] = value
+        return value
+
+    @callback
+    def async_add_listener(self, update_callback, context=None):
+        remove_listener = super().async_add_listener(update_callback, context)
+        self.listener_version += 1
+
+        @callback
+        def _remove_listener() -> None:
+            remove_listener()
+            self.listener_version += 1
+
+        return _remove_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        # only the entities whose value (or availability) has changed since the last notification will be
+        # called - listeners without a tag as context will always be called
+        available = self.last_update_success
+        availability_changed = available != self._snapshot_available
+        self._snapshot_available = available
+
+        if self._data_unchanged and not availability_changed:
+            # fast path: nothing has changed, so there is no need to extract or compare any value
+            skipped = 0
+            for update_callback, context in list(self._listeners.values()):
+                if isinstance(context, TGATag):
+                    skipped += 1
+                else:
+                    update_callback()
+            self.skipped_writes += skipped
+            return
+
+        previous = self._snapshot if self._snapshot is not None else {}
+        snapshot = {}
+        skipped = 0
+        for update_callback, context in list(self._listeners.values()):
+            if isinstance(context, TGATag):
+                value = self.get_value(context)
+                snapshot[context] = value
+                if not availability_changed and context in previous and previous[context] == value:
+                    skipped += 1
+                    continue
+            update_callback()
+
+        self._snapshot = snapshot
+        if skipped > 0:
+            self.skipped_writes += skipped
+            _LOGGER.debug(f"{self.name}: skipped {skipped} unchanged entity updates [total: {self.skipped_writes}]")
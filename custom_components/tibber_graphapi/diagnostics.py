@@ -0,0 +1,66 @@
+import copy
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.tibber_graphapi import mask_map
+from custom_components.tibber_graphapi.const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    pulses = {}
+    for a_pulse_coordinator in coordinator.pulse_coordinators:
+        pulses[a_pulse_coordinator.pulse_id] = {
+            "connected": a_pulse_coordinator.connected,
+            "frames_received": a_pulse_coordinator.coalescer.frames_received,
+            "frames_merged": a_pulse_coordinator.coalescer.frames_merged,
+            "frames_dropped": a_pulse_coordinator.coalescer.frames_dropped,
+            "skipped_writes": a_pulse_coordinator.skipped_writes
+        }
+
+    return mask_map({
+        "config_entry": dict(config_entry.as_dict()),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": str(coordinator.update_interval),
+            "data_generation": coordinator.data_generation,
+            "skipped_writes": coordinator.skipped_writes,
+            "single_flight_joins": coordinator.bridge.single_flight_joins,
+            "statistics_imported": coordinator.statistics.imported if coordinator.statistics is not None else None
+        },
+        "metrics": coordinator.metrics.as_dict(),
+        "circuit_breaker": coordinator.breaker.as_dict(),
+        "pulses": pulses,
+        "pulse_stream": {
+            "connected": coordinator.stream.connected,
+            "stale_after": coordinator.stream.stale_after,
+            "pings": coordinator.stream.pings,
+            "stale_reconnects": coordinator.stream.stale_reconnects,
+            "subscribed_pulses": coordinator.stream.pulse_ids,
+            "frames_decoded": coordinator.stream.frame_decoder.decoded,
+            "frames_rejected": coordinator.stream.frame_decoder.rejected
+        },
+        "charge_plan": {
+            "home_id": coordinator.charge_plan.home_id,
+            "price_fetches": coordinator.charge_plan.prices.fetches,
+            "slot_length": coordinator.charge_plan.planner.slot_length,
+            "update_interval": str(coordinator.charge_plan.update_interval),
+            "data": {key: str(value) for key, value in coordinator.charge_plan.data.items()} if coordinator.charge_plan.data is not None else None
+        } if coordinator.charge_plan is not None else None,
+        "charging_history": {
+            "sessions": coordinator.charging_history.history.count,
+            "pages_read": coordinator.charging_history.history.pages,
+            "has_cursor": coordinator.charging_history.history.cursor is not None,
+            "last_update_success": coordinator.charging_history.last_update_success
+        } if coordinator.charging_history is not None else None,
+        "settings": {
+            "mutations": coordinator.settings.mutations,
+            "failures": coordinator.settings.failures,
+            "pending": coordinator.settings.has_pending
+        },
+        "data": copy.deepcopy(coordinator.data) if coordinator.data is not None else None
+    })
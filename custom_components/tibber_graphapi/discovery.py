@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+
+from custom_components.tibber_graphapi.const import DISCOVERY_TTL
+
+_LOGGER = logging.getLogger(__name__)
+
+DISCOVERY_VEHICLES = "vehicles"
+DISCOVERY_PULSES = "pulses"
+
+
+class TibberGraphApiDiscovery:
+    # caches the (rarely changing) vehicles and pulse gizmos of an account - the cache is persisted together
+    # with the tokens of the account, expires after DISCOVERY_TTL seconds and is invalidated, when a lookup of
+    # a vehicle/pulse id fails
+
+    def __init__(self, ttl: float = DISCOVERY_TTL):
+        self._ttl = ttl
+        self._entries = {}
+        self._locks = {DISCOVERY_VEHICLES: asyncio.Lock(), DISCOVERY_PULSES: asyncio.Lock()}
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+
+    def set_listener(self, listener):
+        # the listener will be called (without arguments) every time the cached content has changed
+        self._listener = listener
+
+    def _notify_listener(self):
+        if self._listener is not None:
+            try:
+                self._listener()
+            except Exception as exc:
+                _LOGGER.warning(f"discovery listener caused: {exc}")
+
+    def as_dict(self) -> dict:
+        return dict(self._entries)
+
+    def restore(self, data: dict):
+        for kind in (DISCOVERY_VEHICLES, DISCOVERY_PULSES):
+            if kind in data and isinstance(data[kind], dict) and "value" in data[kind]:
+                self._entries[kind] = data[kind]
+
+    def get_cached(self, kind: str, allow_expired: bool = False):
+        entry = self._entries.get(kind)
+        if entry is None:
+            return None
+        if not allow_expired and time.time() - entry.get("updated", 0) > self._ttl:
+            return None
+        return entry["value"]
+
+    def invalidate(self, kind: str):
+        if self._entries.pop(kind, None) is not None:
+            _LOGGER.debug(f"discovery cache '{kind}' invalidated")
+            self._notify_listener()
+
+    async def async_get(self, kind: str, fetch):
+        value = self.get_cached(kind)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        async with self._locks[kind]:
+            # while we have been waiting for the lock, another caller might have already fetched the data
+            value = self.get_cached(kind)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            value = await fetch()
+            if value is None:
+                # the fetch failed - an expired entry is better than nothing
+                return self.get_cached(kind, allow_expired=True)
+
+            self._entries[kind] = {"updated": time.time(), "value": value}
+            _LOGGER.debug(f"discovery cache '{kind}' updated")
+            self._notify_listener()
+            return value
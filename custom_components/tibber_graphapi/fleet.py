@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+from custom_components.tibber_graphapi.tags import build_vehicle_selection
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TibberGraphApiFleet:
+    # polls all vehicles of one tibber account with a single (aliased) GraphQL request - the coordinator
+    # that triggers the poll gets its data as return value, all other coordinators are updated via
+    # 'async_set_updated_data()' (which also resets their update timers)
+
+    def __init__(self):
+        self._members = {}
+        self._pending: asyncio.Future | None = None
+        self._joined = set()
+
+    @property
+    def size(self) -> int:
+        return len(self._members)
+
+    def register(self, coordinator):
+        self._members[id(coordinator)] = coordinator
+
+    def unregister(self, coordinator):
+        self._members.pop(id(coordinator), None)
+
+    async def async_update(self, requester) -> dict | None:
+        if self._pending is not None:
+            # there is already a fleet request on its way - so we just wait for it
+            self._joined.add(id(requester))
+            results = await asyncio.shield(self._pending)
+            return None if results is None else results.get(requester.bridge.tibber_vehicleId)
+
+        self._pending = asyncio.get_running_loop().create_future()
+        self._joined = {id(requester)}
+        results = None
+        try:
+            results = await self._async_fetch()
+        finally:
+            pending = self._pending
+            joined = self._joined
+            self._pending = None
+            self._joined = set()
+            pending.set_result(results)
+
+        if results is None:
+            return None
+
+        # fan out to all other members of the fleet
+        for key, coordinator in list(self._members.items()):
+            if key not in joined:
+                a_vehicle_id = coordinator.bridge.tibber_vehicleId
+                if a_vehicle_id in results:
+                    coordinator.async_set_updated_data(results[a_vehicle_id])
+
+        return results.get(requester.bridge.tibber_vehicleId)
+
+    async def _async_fetch(self) -> dict | None:
+        for coordinator in list(self._members.values()):
+            if coordinator.bridge.tibber_vehicleId is None:
+                await coordinator.bridge.get_vehicle_id()
+
+        vehicle_ids = []
+        for coordinator in self._members.values():
+            a_vehicle_id = coordinator.bridge.tibber_vehicleId
+            if a_vehicle_id is not None and a_vehicle_id not in vehicle_ids:
+                vehicle_ids.append(a_vehicle_id)
+
+        if len(vehicle_ids) == 0:
+            return None
+
+        # the selection set must contain the fields of all vehicles of the fleet
+        tags = frozenset()
+        for coordinator in self._members.values():
+            tags = tags | coordinator.query_tags
+
+        # the request is always made by the bridge of the first member - so the unchanged response detection
+        # of that bridge can do its job (no matter which member has triggered the update)
+        bridge = next(iter(self._members.values())).bridge
+        _LOGGER.debug(f"fleet request for {len(vehicle_ids)} vehicles")
+        return await bridge.get_vehicles_data(vehicle_ids, build_vehicle_selection(tags))
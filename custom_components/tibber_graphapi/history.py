@@ -0,0 +1,236 @@
+import logging
+from datetime import datetime, timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_graphapi.coordinator import TibberGraphApiBaseCoordinator
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    STORAGE_KEY_HISTORY,
+    STORAGE_SAVE_DELAY,
+    HISTORY_MAX_PAGES,
+    HISTORY_INTERVAL,
+    HISTORY_MAX_SESSIONS
+)
+from custom_components.tibber_graphapi.scheduler import TibberGraphApiPollScheduler, POLL_STATE_CHARGING
+
+_LOGGER = logging.getLogger(__name__)
+
+# the positions of the values in the (compact) cached sessions
+_ID, _START, _END, _ENERGY, _COST = range(5)
+
+
+def _compact(session: dict) -> list | None:
+    # a finished session as [id, start, end, energy, cost] - None, when the session is still running
+    start = dt_util.parse_datetime(session.get("startedAt") or "")
+    end = dt_util.parse_datetime(session.get("endedAt") or "")
+    if session.get("id") is None or start is None or end is None:
+        return None
+    energy = session.get("energy")
+    cost = session.get("cost")
+    return [session["id"], start.timestamp(), end.timestamp(),
+            round(float(energy), 3) if isinstance(energy, (int, float)) else None,
+            round(float(cost), 4) if isinstance(cost, (int, float)) else None]
+
+
+class TibberGraphApiChargingHistory:
+    # the finished charging sessions of a vehicle - stored compact ([id, start, end, energy, cost]) in a local
+    # cache together with the cursor of the last session that has been read, so every update only reads the
+    # sessions after that cursor. The totals are kept separately (they are not reduced, when old sessions are
+    # dropped from the cache)
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry):
+        self._store = _history_store(hass, config_entry)
+        self._sessions: list[list] = []
+        self._ids: set[str] = set()
+        self.cursor = None
+        self.currency = None
+        self.energy_total = 0.0
+        self.cost_total = 0.0
+        self.pages = 0
+
+    @property
+    def count(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def last(self) -> list | None:
+        return self._sessions[-1] if len(self._sessions) > 0 else None
+
+    async def async_load(self):
+        try:
+            data = await self._store.async_load()
+        except Exception as exc:
+            _LOGGER.warning(f"could not load stored charging history: {exc}")
+            data = None
+
+        if data is not None:
+            self.cursor = data.get("cursor")
+            self.currency = data.get("currency")
+            self.energy_total, self.cost_total = data.get("totals", [0.0, 0.0])
+            self._sessions = [a_session for a_session in data.get("sessions", []) if len(a_session) == 5]
+            self._ids = {a_session[_ID] for a_session in self._sessions}
+
+    def _as_dict(self) -> dict:
+        return {
+            "cursor": self.cursor,
+            "currency": self.currency,
+            "totals": [self.energy_total, self.cost_total],
+            "sessions": self._sessions
+        }
+
+    async def async_save(self):
+        await self._store.async_save(self._as_dict())
+
+    async def async_update(self, fetch_page) -> list[list]:
+        # 'fetch_page(cursor)' must return {"sessions": [(cursor, session), ...], "has_next": bool} (or None) - the
+        # sessions in ascending order. Returns the new (finished) sessions
+        new_sessions = []
+        cursor = self.cursor
+        try:
+            for _ in range(HISTORY_MAX_PAGES):
+                page = await fetch_page(cursor)
+                if page is None:
+                    break
+                self.pages += 1
+
+                running = False
+                for a_cursor, a_session in page["sessions"]:
+                    if a_session.get("currency") is not None:
+                        self.currency = a_session["currency"]
+                    entry = _compact(a_session)
+                    if entry is None:
+                        # a running session - we have to read it again (when it's finished)
+                        running = True
+                        break
+                    cursor = a_cursor
+                    if entry[_ID] not in self._ids:
+                        self._ids.add(entry[_ID])
+                        self._sessions.append(entry)
+                        new_sessions.append(entry)
+                        self.energy_total += entry[_ENERGY] or 0.0
+                        self.cost_total += entry[_COST] or 0.0
+
+                if running or not page["has_next"]:
+                    break
+        finally:
+            if len(new_sessions) > 0 or cursor != self.cursor:
+                self.cursor = cursor
+                self._sessions.sort(key=lambda a_session: a_session[_START])
+                if len(self._sessions) > HISTORY_MAX_SESSIONS:
+                    self._sessions = self._sessions[-HISTORY_MAX_SESSIONS:]
+                    self._ids = {a_session[_ID] for a_session in self._sessions}
+                self._store.async_delay_save(self._as_dict, STORAGE_SAVE_DELAY)
+
+        if len(new_sessions) > 0:
+            _LOGGER.debug(f"{len(new_sessions)} new charging session(s) - {len(self._sessions)} in the cache")
+        return new_sessions
+
+    def sessions(self, start: datetime = None, end: datetime = None, limit: int = None) -> list[dict]:
+        # the cached sessions (started within [start, end)) - the latest 'limit' sessions
+        start_ts = start.timestamp() if start is not None else None
+        end_ts = end.timestamp() if end is not None else None
+        result = [a_session for a_session in self._sessions
+                  if (start_ts is None or a_session[_START] >= start_ts) and (end_ts is None or a_session[_START] < end_ts)]
+        if limit is not None:
+            result = result[-limit:] if limit > 0 else []
+        return [{
+            "id": a_session[_ID],
+            "start": dt_util.utc_from_timestamp(a_session[_START]).isoformat(),
+            "end": dt_util.utc_from_timestamp(a_session[_END]).isoformat(),
+            "energy": a_session[_ENERGY],
+            "cost": a_session[_COST]
+        } for a_session in result]
+
+
+class TibberGraphApiChargingHistoryCoordinator(TibberGraphApiBaseCoordinator):
+    # reads the new charging sessions of the vehicle every HISTORY_INTERVAL seconds and when the vehicle has
+    # stopped charging - the sensors (and the 'charging_history' service) are served from the local cache
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, vehicle_coordinator):
+        self._vehicle = vehicle_coordinator
+        self._config_entry = config_entry
+        self._remove_vehicle_listener = None
+        self._charging = None
+        self.history = TibberGraphApiChargingHistory(hass, config_entry)
+        # set by the vehicle coordinator, when the statistics import is enabled
+        self.statistics = None
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN}_charging_history", update_interval=timedelta(seconds=HISTORY_INTERVAL))
+
+    @property
+    def name_prefix(self) -> str:
+        return self._vehicle.name_prefix
+
+    @property
+    def _device_info_dict(self) -> dict:
+        # the history sensors are part of the vehicle device
+        return self._vehicle._device_info_dict
+
+    async def async_load(self):
+        # the cached sessions are available right from the start
+        await self.history.async_load()
+        self.data = self._build_data()
+
+    def start(self):
+        if self._remove_vehicle_listener is None:
+            self._remove_vehicle_listener = self._vehicle.async_add_listener(self._async_on_vehicle_update)
+
+    async def async_stop(self):
+        if self._remove_vehicle_listener is not None:
+            self._remove_vehicle_listener()
+            self._remove_vehicle_listener = None
+        await self.async_shutdown()
+        await self.history.async_save()
+
+    @callback
+    def _async_on_vehicle_update(self):
+        charging = TibberGraphApiPollScheduler.classify(self._vehicle.data)
+        if charging is None:
+            return
+        charging = charging == POLL_STATE_CHARGING
+        if self._charging and not charging:
+            _LOGGER.debug(f"charging of '{self.name_prefix}' has been stopped - reading the charging history")
+            self._config_entry.async_create_background_task(self.hass, self.async_request_refresh(),
+                                                            name=f"{DOMAIN}_charging_history_{self._config_entry.entry_id}")
+        self._charging = charging
+
+    async def _async_update_data(self):
+        vehicle_id = self._vehicle.bridge.vehicle_id
+        if vehicle_id is not None:
+            try:
+                new_sessions = await self.history.async_update(
+                    lambda cursor: self._vehicle.bridge.get_charging_sessions(vehicle_id, cursor))
+            except Exception as exc:
+                # the cached history is still valid
+                _LOGGER.debug(f"charging history update failed: {exc}")
+                new_sessions = []
+
+            if self.statistics is not None:
+                for a_session in new_sessions:
+                    self.statistics.add_charging_session(vehicle_id, self.name_prefix, a_session[_START], a_session[_END],
+                                                         a_session[_ENERGY], a_session[_COST], self.history.currency)
+        return self._build_data()
+
+    def _build_data(self) -> dict:
+        last = self.history.last
+        return {
+            "currency": self.history.currency,
+            "chargingSessions": self.history.count,
+            "chargedEnergyTotal": round(self.history.energy_total, 3),
+            "chargingCostTotal": round(self.history.cost_total, 2),
+            "lastSessionEnd": dt_util.utc_from_timestamp(last[_END]) if last is not None else None,
+            "lastSessionEnergy": last[_ENERGY] if last is not None else None,
+            "lastSessionCost": last[_COST] if last is not None else None
+        }
+
+
+def _history_store(hass: HomeAssistant, config_entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_HISTORY}.{config_entry.entry_id}")
+
+
+async def async_remove_history_data(hass: HomeAssistant, config_entry: ConfigEntry):
+    await _history_store(hass, config_entry).async_remove()
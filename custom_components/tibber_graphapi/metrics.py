@@ -0,0 +1,219 @@
+import logging
+import time
+from collections import Counter, deque
+
+_LOGGER = logging.getLogger(__name__)
+
+ENDPOINT_LOGIN = "login"
+ENDPOINT_REFRESH = "refresh"
+ENDPOINT_VEHICLE = "vehicle"
+ENDPOINT_VEHICLES = "vehicles"
+ENDPOINT_VEHICLE_ID = "vehicle_id"
+ENDPOINT_PULSE_IDS = "pulse_ids"
+ENDPOINT_PRICES = "prices"
+ENDPOINT_HISTORY = "charging_history"
+ENDPOINT_SETTINGS = "vehicle_settings"
+ENDPOINT_WEBSOCKET = "websocket"
+
+# upper bounds (in seconds) of the latency histogram buckets - the last bucket catches everything else
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the websocket frame rate is calculated over this number of seconds
+FRAME_RATE_WINDOW = 60
+
+
+class TibberGraphApiEndpointStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.status_codes = Counter()
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.bytes = 0
+
+    def record(self, status: int, latency: float, size: int):
+        self.requests += 1
+        self.status_codes[status] += 1
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+        self.bytes += size
+
+        idx = 0
+        for a_bound in LATENCY_BUCKETS:
+            if latency <= a_bound:
+                break
+            idx += 1
+        self.histogram[idx] += 1
+
+    @property
+    def latency_avg(self) -> float | None:
+        return self.latency_total / self.requests if self.requests > 0 else None
+
+    def latency_percentile(self, percentile: float) -> float | None:
+        # estimated from the histogram: the upper bound of the bucket that contains the percentile
+        if self.requests == 0:
+            return None
+        limit = self.requests * percentile
+        count = 0
+        for idx, a_count in enumerate(self.histogram):
+            count += a_count
+            if count >= limit:
+                return LATENCY_BUCKETS[idx] if idx < len(LATENCY_BUCKETS) else self.latency_max
+        return self.latency_max
+
+    def as_dict(self) -> dict:
+        histogram = {f"le_{a_bound}": self.histogram[idx] for idx, a_bound in enumerate(LATENCY_BUCKETS)}
+        histogram["le_inf"] = self.histogram[-1]
+        return {
+            "requests": self.requests,
+            "status_codes": {str(a_status): a_count for a_status, a_count in sorted(self.status_codes.items())},
+            "latency_avg": self.latency_avg,
+            "latency_p95": self.latency_percentile(0.95),
+            "latency_max": self.latency_max,
+            "latency_histogram": histogram,
+            "bytes": self.bytes
+        }
+
+
+class TibberGraphApiMetrics:
+    # one instance per tibber account: counts all requests (per endpoint), the status codes, the received bytes
+    # and the frames of the websocket(s) - everything is just counted, so recording is cheap enough to be
+    # always on
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints: dict[str, TibberGraphApiEndpointStats] = {}
+        self.avoided_401 = 0
+
+        # responses that have been byte-identical to the previous one (and so have not been decoded again)
+        self.unchanged_hits = 0
+        self.unchanged_misses = 0
+
+        self.ws_connects = 0
+        self.ws_frames = 0
+        self.ws_bytes = 0
+        self.ws_frame_types = Counter()
+        self._ws_frame_times = deque()
+
+    def endpoint(self, endpoint: str) -> TibberGraphApiEndpointStats:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = TibberGraphApiEndpointStats()
+            self.endpoints[endpoint] = stats
+        return stats
+
+    def record_request(self, endpoint: str, status: int, started: float, size: int = 0):
+        # 'started' must be a time.monotonic() value
+        self.endpoint(endpoint).record(status, time.monotonic() - started, size)
+
+    def record_unchanged(self, hit: bool):
+        if hit:
+            self.unchanged_hits += 1
+        else:
+            self.unchanged_misses += 1
+
+    @property
+    def unchanged_rate(self) -> float | None:
+        total = self.unchanged_hits + self.unchanged_misses
+        return round(self.unchanged_hits * 100 / total, 1) if total > 0 else None
+
+    def record_ws_connect(self, status: int, started: float):
+        self.ws_connects += 1
+        self.endpoint(ENDPOINT_WEBSOCKET).record(status, time.monotonic() - started, 0)
+
+    def record_ws_frame(self, frame_type: str, size: int):
+        self.ws_frames += 1
+        self.ws_bytes += size
+        self.ws_frame_types[frame_type] += 1
+
+        now = time.monotonic()
+        self._ws_frame_times.append(now)
+        self._trim_frame_times(now)
+
+    def _trim_frame_times(self, now: float):
+        limit = now - FRAME_RATE_WINDOW
+        while len(self._ws_frame_times) > 0 and self._ws_frame_times[0] < limit:
+            self._ws_frame_times.popleft()
+
+    @property
+    def ws_frame_rate(self) -> float:
+        # frames per minute
+        self._trim_frame_times(time.monotonic())
+        return len(self._ws_frame_times) * 60 / FRAME_RATE_WINDOW
+
+    def _sum(self, attr: str, endpoints=None) -> int:
+        return sum(getattr(stats, attr) for key, stats in self.endpoints.items() if endpoints is None or key in endpoints)
+
+    def _count_status(self, status: int) -> int:
+        return sum(stats.status_codes[status] for stats in self.endpoints.values())
+
+    @property
+    def requests(self) -> int:
+        return self._sum("requests")
+
+    @property
+    def logins(self) -> int:
+        return self._sum("requests", (ENDPOINT_LOGIN,))
+
+    @property
+    def refreshes(self) -> int:
+        return self._sum("requests", (ENDPOINT_REFRESH,))
+
+    @property
+    def unauthorized(self) -> int:
+        return self._count_status(401)
+
+    @property
+    def errors(self) -> int:
+        return sum(a_count for stats in self.endpoints.values()
+                   for a_status, a_count in stats.status_codes.items() if a_status != 401 and (a_status < 200 or a_status > 299))
+
+    @property
+    def bytes_received(self) -> int:
+        return self._sum("bytes") + self.ws_bytes
+
+    def _data_latency(self) -> TibberGraphApiEndpointStats:
+        # the latency of the vehicle data requests (single & fleet)
+        merged = TibberGraphApiEndpointStats()
+        for key in (ENDPOINT_VEHICLE, ENDPOINT_VEHICLES):
+            stats = self.endpoints.get(key)
+            if stats is not None:
+                merged.requests += stats.requests
+                merged.latency_total += stats.latency_total
+                merged.latency_max = max(merged.latency_max, stats.latency_max)
+                merged.histogram = [a + b for a, b in zip(merged.histogram, stats.histogram)]
+        return merged
+
+    def get(self, key: str):
+        if key == "latency_avg":
+            value = self._data_latency().latency_avg
+            return round(value * 1000, 1) if value is not None else None
+        if key == "latency_p95":
+            value = self._data_latency().latency_percentile(0.95)
+            return round(value * 1000, 1) if value is not None else None
+        if key == "ws_frame_rate":
+            return round(self.ws_frame_rate, 1)
+        return getattr(self, key)
+
+    def as_dict(self) -> dict:
+        return {
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "requests": self.requests,
+            "logins": self.logins,
+            "refreshes": self.refreshes,
+            "unauthorized": self.unauthorized,
+            "avoided_401": self.avoided_401,
+            "errors": self.errors,
+            "bytes_received": self.bytes_received,
+            "unchanged_responses": {"hits": self.unchanged_hits, "misses": self.unchanged_misses, "rate": self.unchanged_rate},
+            "endpoints": {key: stats.as_dict() for key, stats in sorted(self.endpoints.items())},
+            "websocket": {
+                "connects": self.ws_connects,
+                "frames": self.ws_frames,
+                "bytes": self.ws_bytes,
+                "frames_per_minute": self.ws_frame_rate,
+                "frame_types": dict(self.ws_frame_types)
+            }
+        }
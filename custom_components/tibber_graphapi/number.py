@@ -0,0 +1,58 @@
+import logging
+
+from homeassistant.components.number import RestoreNumber
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from custom_components.tibber_graphapi import TibberGraphApiDataUpdateCoordinator, TibberGraphApiEntity
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    NUMBER_ENTITIES,
+    ExtNumberEntityDescription
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, add_entity_cb: AddEntitiesCallback):
+    _LOGGER.debug("NUMBER async_setup_entry")
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    entities = []
+    for description in NUMBER_ENTITIES:
+        entity = TibberGraphApiNumber(coordinator, description)
+        entities.append(entity)
+
+    add_entity_cb(entities)
+
+
+class TibberGraphApiNumber(TibberGraphApiEntity, RestoreNumber):
+    _restored_value = None
+
+    def __init__(self, coordinator: TibberGraphApiDataUpdateCoordinator, description: ExtNumberEntityDescription):
+        super().__init__(coordinator=coordinator, description=description)
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if self.coordinator.data is None:
+            last_number_data = await self.async_get_last_number_data()
+            if last_number_data is not None and last_number_data.native_value is not None:
+                self._restored_value = last_number_data.native_value
+                self._restored = True
+
+    @property
+    def native_value(self) -> float | None:
+        if self.coordinator.data is None:
+            # no live data yet
+            return self._restored_value
+
+        # the settings are delivered as strings (or numbers)
+        value = self.coordinator.get_value(self.entity_description.tag)
+        try:
+            return float(value) if value is not None else None
+        except (ValueError, TypeError):
+            return None
+
+    async def async_set_native_value(self, value: float) -> None:
+        # the new value is shown immediately - the mutation is debounced (see settings.py)
+        self.coordinator.settings.async_set(self.entity_description.tag, int(value) if float(value).is_integer() else value)
@@ -0,0 +1,290 @@
+import heapq
+import logging
+import math
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_graphapi.coordinator import TibberGraphApiBaseCoordinator
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    CONF_CHARGE_RATE,
+    CONF_CHARGE_DEADLINE,
+    DEFAULT_CHARGE_RATE,
+    DEFAULT_CHARGE_DEADLINE,
+    CHARGE_PLAN_INTERVAL
+)
+from custom_components.tibber_graphapi.prices import TibberGraphApiPrices
+from custom_components.tibber_graphapi.tags import TGATag
+
+_LOGGER = logging.getLogger(__name__)
+
+# the duration of a price slot, when it can't be derived from the prices (e.g. only a single slot)
+_DEFAULT_SLOT = 3600
+
+
+class TibberGraphApiChargePlanner:
+    # the cheapest-window engine: the slots (start, end, price) are prepared once per price publication - a plan
+    # (the cheapest K slots before the deadline & the cheapest contiguous window of K slots) is calculated in a
+    # single pass over the slots between now and the deadline. The plan is cached till one of its inputs
+    # (prices, first open slot, deadline slot or K) has been changed
+
+    def __init__(self):
+        self._generation = None
+        self._starts = []
+        self._ends = []
+        self._prices = []
+        self._plan_key = None
+        self._plan = None
+        self.slot_length = _DEFAULT_SLOT
+
+    def set_prices(self, slots: list, generation):
+        if generation == self._generation:
+            return
+        self._generation = generation
+        self._starts = [a_slot[0] for a_slot in slots]
+        self._prices = [a_slot[1] for a_slot in slots]
+        steps = [b - a for a, b in zip(self._starts, self._starts[1:]) if b > a]
+        self.slot_length = min(steps) if len(steps) > 0 else _DEFAULT_SLOT
+        self._ends = [a_start + self.slot_length for a_start in self._starts]
+        self._plan_key = None
+        self._plan = None
+
+    def _slot_at(self, now: float) -> int | None:
+        idx = bisect_right(self._starts, now) - 1
+        if 0 <= idx < len(self._starts) and now < self._ends[idx]:
+            return idx
+        return None
+
+    def price_at(self, now: float) -> float | None:
+        idx = self._slot_at(now)
+        return self._prices[idx] if idx is not None else None
+
+    def next_boundary(self, now: float) -> float | None:
+        # the end of the current slot (or the start of the next known one)
+        idx = bisect_right(self._starts, now)
+        candidates = [self._ends[idx - 1]] if idx > 0 and self._ends[idx - 1] > now else []
+        if idx < len(self._starts):
+            candidates.append(self._starts[idx])
+        return min(candidates) if len(candidates) > 0 else None
+
+    def plan(self, now: float, duration: float, deadline: float) -> dict:
+        # the slot that is currently running is part of the plan, when it has not ended yet
+        first = bisect_right(self._ends, now)
+        last = bisect_right(self._ends, deadline)
+        needed = max(0, math.ceil(duration / self.slot_length - 1e-9))
+        key = (self._generation, first, last, needed)
+        if key == self._plan_key:
+            return self._plan
+
+        cheapest = []
+        best_window = None
+        best_sum = None
+        run_start = first
+        window_sum = 0.0
+        if needed > 0:
+            for idx in range(first, last):
+                price = self._prices[idx]
+
+                # cheapest K slots: a max-heap (of the K cheapest so far) - on equal prices the earlier slot wins
+                if len(cheapest) < needed:
+                    heapq.heappush(cheapest, (-price, -idx))
+                elif -price > cheapest[0][0]:
+                    heapq.heapreplace(cheapest, (-price, -idx))
+
+                # cheapest contiguous window of K slots: a running sum, that is restarted on every gap
+                if idx > run_start and self._starts[idx] != self._ends[idx - 1]:
+                    run_start = idx
+                    window_sum = 0.0
+                window_sum += price
+                if idx - needed >= run_start:
+                    window_sum -= self._prices[idx - needed]
+                if idx - run_start + 1 >= needed and (best_sum is None or window_sum < best_sum - 1e-12):
+                    best_sum = window_sum
+                    best_window = idx - needed + 1
+
+        chosen = sorted(-a_neg_idx for _, a_neg_idx in cheapest)
+        plan = {
+            "needed": needed,
+            "slots": [(self._starts[idx], self._ends[idx], self._prices[idx]) for idx in chosen],
+            "complete": len(chosen) >= needed,
+            "start": self._starts[chosen[0]] if len(chosen) > 0 else None,
+            "end": self._ends[chosen[-1]] if len(chosen) > 0 else None,
+            "mean_price": sum(self._prices[idx] for idx in chosen) / len(chosen) if len(chosen) > 0 else None,
+            "window_start": self._starts[best_window] if best_window is not None else None,
+            "window_end": self._ends[best_window + needed - 1] if best_window is not None else None,
+            "window_mean_price": best_sum / needed if best_window is not None else None,
+            "_chosen": frozenset(chosen)
+        }
+        self._plan_key = key
+        self._plan = plan
+        return plan
+
+    def is_active(self, plan: dict, now: float) -> bool:
+        idx = self._slot_at(now)
+        return idx is not None and idx in plan["_chosen"]
+
+
+def charging_duration(soc, soc_max, charge_rate) -> float | None:
+    # seconds, that are required to charge from 'soc' to 'soc_max' with 'charge_rate' (SOC percent per hour)
+    if not isinstance(soc, (int, float)) or not isinstance(charge_rate, (int, float)) or charge_rate <= 0:
+        return None
+    if not isinstance(soc_max, (int, float)):
+        soc_max = 100
+    return max(0.0, float(soc_max) - float(soc)) / float(charge_rate) * 3600
+
+
+def next_deadline(deadline_hour: int, now: datetime = None) -> datetime:
+    # the next (local) occurrence of the given hour of the day
+    if now is None:
+        now = dt_util.now()
+    deadline = dt_util.as_local(now).replace(hour=int(deadline_hour) % 24, minute=0, second=0, microsecond=0)
+    if deadline <= now:
+        deadline = deadline + timedelta(days=1)
+    return deadline
+
+
+class TibberGraphApiChargePlanCoordinator(TibberGraphApiBaseCoordinator):
+    # answers 'when should this car charge' - the plan is built from the (cached) prices of the account and the
+    # soc/soc_max of the vehicle coordinator. It is updated when the vehicle data has been changed, at the
+    # start of every price slot & at least every CHARGE_PLAN_INTERVAL seconds
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, vehicle_coordinator, prices: TibberGraphApiPrices):
+        self._vehicle = vehicle_coordinator
+        self._prices = prices
+        self._config_entry = config_entry
+        self._charge_rate = config_entry.options.get(CONF_CHARGE_RATE, config_entry.data.get(CONF_CHARGE_RATE, DEFAULT_CHARGE_RATE))
+        self._deadline_hour = config_entry.options.get(CONF_CHARGE_DEADLINE, config_entry.data.get(CONF_CHARGE_DEADLINE, DEFAULT_CHARGE_DEADLINE))
+        self._remove_vehicle_listener = None
+        self._vehicle_values = None
+        self.planner = TibberGraphApiChargePlanner()
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN}_charge_plan", update_interval=timedelta(seconds=CHARGE_PLAN_INTERVAL))
+
+    @property
+    def name_prefix(self) -> str:
+        return self._vehicle.name_prefix
+
+    @property
+    def _device_info_dict(self) -> dict:
+        # the plan sensors are part of the vehicle device
+        return self._vehicle._device_info_dict
+
+    @property
+    def prices(self) -> TibberGraphApiPrices:
+        return self._prices
+
+    @property
+    def home_id(self) -> str | None:
+        # the vehicles are not linked to a home - so we use the first home with prices
+        for a_home_id in self._prices.home_ids:
+            if len(self._prices.slots(a_home_id)) > 0:
+                return a_home_id
+        return None
+
+    def start(self):
+        if self._remove_vehicle_listener is None:
+            self._remove_vehicle_listener = self._vehicle.async_add_listener(self._async_on_vehicle_update)
+
+    async def async_stop(self):
+        if self._remove_vehicle_listener is not None:
+            self._remove_vehicle_listener()
+            self._remove_vehicle_listener = None
+        await self.async_shutdown()
+
+    async def async_refresh_prices(self):
+        await self._prices.async_refresh(self._vehicle.bridge.get_prices)
+
+    async def _async_update_data(self):
+        await self.async_refresh_prices()
+        return self._build_data()
+
+    @callback
+    def _async_on_vehicle_update(self):
+        # only a changed soc/soc_max requires a new plan
+        values = (self._vehicle.get_value(TGATag.VEH_SOC), self._vehicle.get_value(TGATag.VEH_SOCMAX))
+        if values != self._vehicle_values and self.data is not None:
+            self.async_set_updated_data(self._build_data())
+
+    def build_plan(self, soc=None, soc_max=None, charge_rate=None, deadline: datetime = None, home_id: str = None,
+                   now: float = None) -> dict | None:
+        if home_id is None:
+            home_id = self.home_id
+        if home_id is None:
+            return None
+        if now is None:
+            now = time.time()
+        if soc is None:
+            soc = self._vehicle.get_value(TGATag.VEH_SOC)
+        if soc_max is None:
+            soc_max = self._vehicle.get_value(TGATag.VEH_SOCMAX)
+        if charge_rate is None:
+            charge_rate = self._charge_rate
+        if deadline is None:
+            deadline = next_deadline(self._deadline_hour)
+
+        duration = charging_duration(soc, soc_max, charge_rate)
+        if duration is None:
+            return None
+
+        self.planner.set_prices(self._prices.slots(home_id), (self._prices.generation, home_id))
+        plan = self.planner.plan(now, duration, deadline.timestamp())
+        return dict(plan, home_id=home_id, currency=self._prices.currency(home_id), duration=duration,
+                    deadline=deadline.timestamp(), active=self.planner.is_active(plan, now),
+                    price_current=self.planner.price_at(now))
+
+    def _build_data(self) -> dict:
+        now = time.time()
+        self._vehicle_values = (self._vehicle.get_value(TGATag.VEH_SOC), self._vehicle.get_value(TGATag.VEH_SOCMAX))
+        plan = self.build_plan(now=now)
+
+        # the next update at the start of the next slot (the 'active' state & the current price will change)
+        boundary = self.planner.next_boundary(now)
+        interval = CHARGE_PLAN_INTERVAL if boundary is None else min(CHARGE_PLAN_INTERVAL, max(1, math.ceil(boundary - now)))
+        self.update_interval = timedelta(seconds=interval)
+
+        if plan is None:
+            # no prices (or no soc) - nothing to plan
+            return {"chargePlanActive": False}
+        return {
+            "currency": f"{plan['currency']}/kWh" if plan["currency"] is not None else None,
+            "priceCurrent": plan["price_current"],
+            "chargePlanStart": _as_datetime(plan["start"]),
+            "chargePlanEnd": _as_datetime(plan["end"]),
+            "chargePlanDuration": round(len(plan["slots"]) * self.planner.slot_length / 3600, 2),
+            "chargePlanMeanPrice": plan["mean_price"],
+            "chargePlanActive": plan["active"],
+            "cheapestWindowStart": _as_datetime(plan["window_start"]),
+            "cheapestWindowEnd": _as_datetime(plan["window_end"]),
+            "cheapestWindowMeanPrice": plan["window_mean_price"]
+        }
+
+
+def _as_datetime(timestamp: float | None) -> datetime | None:
+    return dt_util.utc_from_timestamp(timestamp) if timestamp is not None else None
+
+
+def plan_as_dict(plan: dict) -> dict:
+    # the (json serializable) response of the 'plan_charging' service
+    return {
+        "home_id": plan["home_id"],
+        "currency": plan["currency"],
+        "price_current": plan["price_current"],
+        "deadline": _as_datetime(plan["deadline"]).isoformat(),
+        "charging_hours": round(plan["duration"] / 3600, 2),
+        "complete": plan["complete"],
+        "active": plan["active"],
+        "start": _as_datetime(plan["start"]).isoformat() if plan["start"] is not None else None,
+        "end": _as_datetime(plan["end"]).isoformat() if plan["end"] is not None else None,
+        "mean_price": plan["mean_price"],
+        "slots": [{"start": _as_datetime(a_start).isoformat(), "end": _as_datetime(an_end).isoformat(), "price": a_price}
+                  for a_start, an_end, a_price in plan["slots"]],
+        "cheapest_window": {
+            "start": _as_datetime(plan["window_start"]).isoformat(),
+            "end": _as_datetime(plan["window_end"]).isoformat(),
+            "mean_price": plan["window_mean_price"]
+        } if plan["window_start"] is not None else None
+    }
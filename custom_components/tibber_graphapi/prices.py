@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_graphapi.const import PRICES_PUBLICATION_HOUR, PRICES_RETRY_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+# a (complete) day has at least 23 hours of prices - the day of the switch to daylight saving time
+_MIN_DAY = 23 * 3600
+
+
+def _is_complete(slots: list | None) -> bool:
+    if slots is None or len(slots) < 2:
+        return False
+    return slots[-1][0] + (slots[-1][0] - slots[-2][0]) - slots[0][0] >= _MIN_DAY
+
+
+class TibberGraphApiPrices:
+    # caches the prices of all homes of an account - one array of [start (timestamp), price] per home and
+    # day (the date of the home, not of HA). A complete day will never be fetched again, so there is a single
+    # request for today's prices and (after PRICES_PUBLICATION_HOUR) a single request for tomorrow's prices.
+    # A home without any prices (e.g. without an active contract) is asked again the next day. The cache is
+    # persisted together with the tokens of the account
+
+    def __init__(self):
+        # home id -> {"currency": str, "offset": utc offset (seconds), "empty": iso date,
+        #             "days": {iso date: [[start, price], ...]}}
+        self._homes: dict[str, dict] = {}
+        self._slots: dict[str, list] = {}
+        self._lock = asyncio.Lock()
+        self._last_attempt = None
+        self._no_homes = None
+        self._listener = None
+        self.generation = 0
+        self.fetches = 0
+
+    def set_listener(self, listener):
+        # the listener will be called (without arguments) every time the cached content has changed
+        self._listener = listener
+
+    def _notify_listener(self):
+        if self._listener is not None:
+            try:
+                self._listener()
+            except Exception as exc:
+                _LOGGER.warning(f"prices listener caused: {exc}")
+
+    def as_dict(self) -> dict:
+        return dict(self._homes)
+
+    def restore(self, data: dict):
+        for home_id, a_home in data.items():
+            if isinstance(a_home, dict) and isinstance(a_home.get("days"), dict):
+                self._homes[home_id] = a_home
+        self._changed()
+
+    def _changed(self):
+        self._slots = {}
+        self.generation += 1
+
+    @property
+    def home_ids(self) -> list[str]:
+        return list(self._homes.keys())
+
+    def currency(self, home_id: str) -> str | None:
+        a_home = self._homes.get(home_id)
+        return a_home.get("currency") if a_home is not None else None
+
+    def slots(self, home_id: str) -> list:
+        # all known [start, price] of the home (ordered by their start)
+        slots = self._slots.get(home_id)
+        if slots is None:
+            slots = []
+            a_home = self._homes.get(home_id)
+            if a_home is not None:
+                for a_day in sorted(a_home["days"]):
+                    slots.extend(a_home["days"][a_day])
+            self._slots[home_id] = slots
+        return slots
+
+    @staticmethod
+    def _home_now(a_home: dict) -> datetime:
+        # the current time at the home - HA might be in a different time zone
+        offset = a_home.get("offset")
+        if offset is None:
+            return dt_util.now()
+        return dt_util.utcnow().astimezone(timezone(timedelta(seconds=offset)))
+
+    def _missing_days(self) -> bool:
+        if len(self._homes) == 0:
+            # when the account has no home at all, we ask once a day
+            return self._no_homes != dt_util.now().date().isoformat()
+
+        for a_home in self._homes.values():
+            now = self._home_now(a_home)
+            today = now.date().isoformat()
+            if a_home.get("empty") == today:
+                continue
+            days = [today]
+            if now.hour >= PRICES_PUBLICATION_HOUR:
+                days.append((now.date() + timedelta(days=1)).isoformat())
+            if any(not _is_complete(a_home["days"].get(a_day)) for a_day in days):
+                return True
+        return False
+
+    async def async_refresh(self, fetch) -> bool:
+        # 'fetch' must return {home id: {"currency": str, "prices": [(ISO start, price), ...]}} (or None) - it
+        # is only called, when the prices of today (or tomorrow) are not in the cache
+        if not self._missing_days():
+            return False
+
+        async with self._lock:
+            if not self._missing_days():
+                return False
+            if self._last_attempt is not None and time.monotonic() - self._last_attempt < PRICES_RETRY_INTERVAL:
+                return False
+
+            self._last_attempt = time.monotonic()
+            self.fetches += 1
+            homes = await fetch()
+            if homes is None:
+                return False
+            if len(homes) == 0 and len(self._homes) == 0:
+                _LOGGER.debug(f"no homes with prices")
+                self._no_homes = dt_util.now().date().isoformat()
+                return False
+
+            changed = False
+            for home_id, a_home in homes.items():
+                cached = self._homes.setdefault(home_id, {"currency": None, "days": {}})
+                if a_home.get("currency") is not None:
+                    cached["currency"] = a_home["currency"]
+
+                days = {}
+                for starts_at, price in a_home.get("prices", []):
+                    start = dt_util.parse_datetime(starts_at) if starts_at is not None else None
+                    if start is not None and price is not None:
+                        if start.utcoffset() is not None:
+                            cached["offset"] = start.utcoffset().total_seconds()
+                        # the date of the home (the offset of 'startsAt' is the one of the home)
+                        days.setdefault(start.date().isoformat(), {})[start.timestamp()] = price
+
+                if len(days) == 0:
+                    # nothing to wait for today
+                    cached["empty"] = self._home_now(cached).date().isoformat()
+                    continue
+                cached.pop("empty", None)
+
+                for a_day, slots in days.items():
+                    known = cached["days"].get(a_day)
+                    if _is_complete(known):
+                        continue
+                    if known is not None:
+                        # a partial day - the missing slots are added
+                        slots = {**{a_start: a_price for a_start, a_price in known}, **slots}
+                    slots = [[a_start, slots[a_start]] for a_start in sorted(slots)]
+                    if slots != known:
+                        cached["days"][a_day] = slots
+                        changed = True
+
+            # the prices before yesterday are not required anymore
+            for a_home in self._homes.values():
+                oldest = (self._home_now(a_home).date() - timedelta(days=1)).isoformat()
+                for a_day in [a_day for a_day in a_home["days"] if a_day < oldest]:
+                    del a_home["days"][a_day]
+
+            if changed:
+                _LOGGER.debug(f"prices updated: {[(home_id, sorted(a_home['days'])) for home_id, a_home in self._homes.items()]}")
+                self._changed()
+                self._notify_listener()
+            return changed
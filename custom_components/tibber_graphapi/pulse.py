@@ -0,0 +1,203 @@
+import logging
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from custom_components.tibber_graphapi.coordinator import TibberGraphApiBaseCoordinator
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    MANUFACTURE,
+    PULSE_DEADBANDS,
+    PULSE_MAX_LAG,
+    PULSE_MAX_WINDOW_FACTOR,
+    DEFAULT_PULSE_WINDOW
+)
+from custom_components.tibber_graphapi.rolling import TibberGraphApiPulseAggregates
+
+_LOGGER = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TibberGraphApiPulseCoalescer:
+    # sits between the websocket and the entities: all frames that arrive within the window are merged into a
+    # single update, and a field is only published when its change exceeds the configured deadband - when the
+    # event loop is lagging behind, the window grows and the frames in between are dropped
+
+    def __init__(self, hass: HomeAssistant, publish, window: float = DEFAULT_PULSE_WINDOW, deadbands: dict = None):
+        self._hass = hass
+        self._publish = publish
+        self._window = max(0.0, float(window))
+        self._deadbands = deadbands if deadbands is not None else PULSE_DEADBANDS
+
+        self._pending = None
+        self._published = {}
+        self._cancel_flush = None
+        self._flush_due = None
+        self._factor = 1
+
+        self.frames_received = 0
+        self.frames_merged = 0
+        self.frames_dropped = 0
+
+    @property
+    def published(self) -> dict:
+        return self._published
+
+    @callback
+    def async_add_frame(self, frame: dict):
+        self.frames_received += 1
+
+        # out of order frame? [the timestamps are all ISO strings with the same offset]
+        last_ts = (self._pending if self._pending is not None else self._published).get("timestamp")
+        if last_ts is not None and frame.get("timestamp") is not None and frame["timestamp"] < last_ts:
+            self.frames_dropped += 1
+            return
+
+        if self._pending is None:
+            self._pending = dict(frame)
+        elif self._factor > 1:
+            # backpressure - we are behind, so the previous (stale) frame is replaced completely
+            self._pending = dict(frame)
+            self.frames_dropped += 1
+        else:
+            self._pending.update(frame)
+            self.frames_merged += 1
+
+        if self._cancel_flush is None:
+            delay = self._window * self._factor
+            if delay == 0:
+                self._async_flush()
+            else:
+                self._flush_due = time.monotonic() + delay
+                self._cancel_flush = async_call_later(self._hass, delay, self._async_flush)
+
+    @callback
+    def _async_flush(self, _now=None):
+        self._cancel_flush = None
+        if self._flush_due is not None:
+            lag = time.monotonic() - self._flush_due
+            if lag > PULSE_MAX_LAG:
+                self._factor = min(self._factor * 2, PULSE_MAX_WINDOW_FACTOR)
+                _LOGGER.debug(f"event loop is lagging {lag:.2f}s - coalescing window factor now: {self._factor}")
+            elif self._factor > 1:
+                self._factor = max(1, self._factor // 2)
+            self._flush_due = None
+
+        pending = self._pending
+        self._pending = None
+        if pending is None:
+            return
+
+        changed_keys = set()
+        for key, value in pending.items():
+            if self._exceeds_deadband(key, self._published.get(key, _MISSING), value):
+                self._published[key] = value
+                changed_keys.add(key)
+
+        self._published["framesMerged"] = self.frames_merged
+        self._published["framesDropped"] = self.frames_dropped
+        if len(changed_keys) > 0:
+            changed_keys.update(("framesMerged", "framesDropped"))
+            self._publish(dict(self._published), changed_keys)
+
+    def _exceeds_deadband(self, key: str, old_value, new_value) -> bool:
+        if old_value is _MISSING:
+            return True
+        if old_value == new_value:
+            return False
+        if not isinstance(old_value, (int, float)) or not isinstance(new_value, (int, float)):
+            # None <-> value or non-numeric values
+            return True
+
+        band = self._deadbands.get(key)
+        if band is None:
+            return True
+
+        abs_band, rel_band = band
+        threshold = max(abs_band or 0, abs(old_value) * (rel_band or 0))
+        return abs(new_value - old_value) > threshold
+
+    @callback
+    def async_shutdown(self):
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+        self._pending = None
+
+
+class TibberGraphApiPulseCoordinator(TibberGraphApiBaseCoordinator):
+    # push based coordinator - there is no polling at all, the data is provided by the (shared) websocket of
+    # the account, that is reading the live measurements of all Tibber Pulses
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, stream, pulse_id: str, pulse_name: str = None,
+                 window: float = DEFAULT_PULSE_WINDOW):
+        self.stream = stream
+        self.pulse_id = pulse_id
+        self._pulse_name = pulse_name if pulse_name is not None else pulse_id[:8]
+        self._config_entry = config_entry
+        self._started = False
+        self.coalescer = TibberGraphApiPulseCoalescer(hass, self._async_publish, window=window)
+        # every frame is added to the rolling aggregates (not only the coalesced ones)
+        self.aggregates = TibberGraphApiPulseAggregates()
+        # set by the vehicle coordinator, when the statistics import is enabled
+        self.statistics = None
+
+        self._device_info_dict = {
+            "identifiers": {(DOMAIN, pulse_id)},
+            "manufacturer": MANUFACTURE,
+            "model": "Pulse",
+            "name": f"Tibber Pulse {self._pulse_name}"
+        }
+        super().__init__(hass, _LOGGER, name=f"{DOMAIN}_pulse", update_interval=None)
+
+    @property
+    def name_prefix(self) -> str:
+        return f"pulse {self._pulse_name}"
+
+    @property
+    def unique_id_prefix(self) -> str:
+        return f"pulse_{self.pulse_id}"
+
+    @property
+    def connected(self) -> bool:
+        return self.stream.is_subscribed(self.pulse_id)
+
+    def start(self):
+        if not self._started:
+            self._started = True
+            self.stream.subscribe(self.pulse_id, self._async_on_measurement, self._async_on_availability)
+
+    async def async_stop(self):
+        if self._started:
+            self._started = False
+            await self.stream.async_unsubscribe(self.pulse_id, self._async_on_measurement, self._async_on_availability)
+        self.coalescer.async_shutdown()
+
+    async def _async_update_data(self):
+        # there is nothing to poll - we just keep the last pushed data
+        return self.data
+
+    @callback
+    def _async_on_measurement(self, data: dict):
+        self.aggregates.add_frame(data)
+        if self.statistics is not None:
+            self.statistics.add_pulse_frame(self.pulse_id, self._pulse_name, data)
+        self.coalescer.async_add_frame(data)
+
+    @callback
+    def _async_on_availability(self, available: bool):
+        # no measurements for a while (or they are back) - the sensors must not freeze silently
+        if available != self.last_update_success:
+            self.last_update_success = available
+            self.async_update_listeners()
+
+    @callback
+    def _async_publish(self, data: dict, changed_keys: set):
+        data.update(self.aggregates.as_dict())
+        self.data = data
+        self.last_update_success = True
+        if len(changed_keys) > 0:
+            self.async_update_listeners()
@@ -0,0 +1,120 @@
+import logging
+import random
+import time
+
+from custom_components.tibber_graphapi.const import (
+    RETRY_ATTEMPTS,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_COOLDOWN_MIN,
+    BREAKER_COOLDOWN_MAX
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# status codes that are worth a retry - everything else (incl. 401, which is handled by the auth) is final
+RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+class TibberGraphApiUnavailable(Exception):
+    # raised when the circuit breaker is open - no request has been made
+    pass
+
+
+class TibberGraphApiRetryPolicy:
+
+    def __init__(self, attempts: int = RETRY_ATTEMPTS, base: float = RETRY_BACKOFF_BASE, cap: float = RETRY_BACKOFF_MAX):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt: int) -> float:
+        # 'full jitter': a random delay between 0 and the (capped) exponential backoff
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+
+class TibberGraphApiCircuitBreaker:
+    # one instance per tibber account: after BREAKER_FAILURE_THRESHOLD failed requests in a row the breaker
+    # opens and no request is made, till the cooldown is over - then a single (half-open) probe request is
+    # allowed. When the probe fails, the breaker opens again (with a doubled cooldown)
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown_min: float = BREAKER_COOLDOWN_MIN,
+                 cooldown_max: float = BREAKER_COOLDOWN_MAX):
+        self._threshold = threshold
+        self._cooldown_min = cooldown_min
+        self._cooldown_max = cooldown_max
+        self._cooldown = cooldown_min
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.last_failure = None
+
+    @property
+    def retry_at(self) -> float | None:
+        # monotonic time, when the next probe will be allowed
+        return self._opened_at + self._cooldown if self.state == BREAKER_OPEN else None
+
+    def allow_request(self) -> bool:
+        if self.state == BREAKER_CLOSED:
+            return True
+
+        if self.state == BREAKER_OPEN and time.monotonic() >= self.retry_at:
+            self.state = BREAKER_HALF_OPEN
+            self._probe_in_flight = False
+            _LOGGER.debug(f"circuit breaker half-open - probing")
+
+        if self.state == BREAKER_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state != BREAKER_CLOSED:
+            _LOGGER.info(f"circuit breaker closed - tibber is reachable again")
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self._cooldown = self._cooldown_min
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        # the probe has been aborted without a result - the next request may probe again
+        self._probe_in_flight = False
+
+    def record_failure(self, reason: str = None):
+        self.failures += 1
+        self.last_failure = reason
+        if self.state == BREAKER_HALF_OPEN:
+            self._cooldown = min(self._cooldown * 2, self._cooldown_max)
+            self._open()
+        elif self.state == BREAKER_CLOSED and self.failures >= self._threshold:
+            self._open()
+
+    def _open(self):
+        self.state = BREAKER_OPEN
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        _LOGGER.warning(f"circuit breaker open after {self.failures} failures ({self.last_failure}) - next probe in {self._cooldown:.0f} sec")
+
+    def as_dict(self) -> dict:
+        retry_at = self.retry_at
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "cooldown": self._cooldown,
+            "next_probe_in": round(max(0.0, retry_at - time.monotonic()), 1) if retry_at is not None else None,
+            "last_failure": self.last_failure
+        }
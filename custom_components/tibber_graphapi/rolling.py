@@ -0,0 +1,159 @@
+import logging
+import time
+from array import array
+from collections import deque
+
+from custom_components.tibber_graphapi.const import (
+    PULSE_ROLLING_FIELDS,
+    PULSE_ROLLING_WINDOWS,
+    PULSE_ROLLING_RESOLUTION,
+    PULSE_ENERGY_MAX_GAP
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TibberGraphApiRollingAggregate:
+    # rolling mean/min/max of a single value - the samples are collected in buckets of 'resolution' seconds,
+    # which are stored in a ring buffer. Adding a sample and reading the values is O(1) (amortized): the running
+    # sums of all windows are adjusted when a bucket leaves a window, min/max are the heads of monotonic deques
+    # of (bucket, value) per window (at most one entry per bucket)
+
+    def __init__(self, windows: tuple = PULSE_ROLLING_WINDOWS, resolution: int = PULSE_ROLLING_RESOLUTION):
+        self._resolution = resolution
+        self._windows = tuple(windows)
+        self._window_buckets = tuple(max(1, int(a_window // resolution)) for a_window in self._windows)
+        self._size = max(self._window_buckets)
+
+        self._sum = array("d", bytes(8 * self._size))
+        self._count = array("L", [0] * self._size)
+        self._head = None
+
+        self._window_sum = [0.0] * len(self._windows)
+        self._window_count = [0] * len(self._windows)
+        # ascending values (min) & descending values (max)
+        self._window_min = tuple(deque() for _ in self._windows)
+        self._window_max = tuple(deque() for _ in self._windows)
+
+    def add(self, now: float, value: float):
+        bucket = int(now // self._resolution)
+        self._advance(bucket)
+        if bucket < self._head:
+            # older than the current bucket - can't be placed anymore
+            return
+
+        idx = bucket % self._size
+        self._sum[idx] += value
+        self._count[idx] += 1
+
+        for idx in range(len(self._windows)):
+            self._window_sum[idx] += value
+            self._window_count[idx] += 1
+
+            mins = self._window_min[idx]
+            while len(mins) > 0 and mins[-1][1] >= value:
+                mins.pop()
+            if len(mins) == 0 or mins[-1][0] != bucket:
+                mins.append((bucket, value))
+
+            maxs = self._window_max[idx]
+            while len(maxs) > 0 and maxs[-1][1] <= value:
+                maxs.pop()
+            if len(maxs) == 0 or maxs[-1][0] != bucket:
+                maxs.append((bucket, value))
+
+    def _clear(self, idx: int):
+        self._sum[idx] = 0.0
+        self._count[idx] = 0
+
+    def _advance(self, bucket: int):
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+
+        if bucket - self._head >= self._size:
+            # everything is outdated
+            for idx in range(self._size):
+                self._clear(idx)
+            self._window_sum = [0.0] * len(self._windows)
+            self._window_count = [0] * len(self._windows)
+            for a_deque in self._window_min + self._window_max:
+                a_deque.clear()
+        else:
+            for a_bucket in range(self._head + 1, bucket + 1):
+                # the buckets that are leaving the windows (the bucket of the largest window is the one that
+                # will be reused now)
+                for idx, a_size in enumerate(self._window_buckets):
+                    leaving = (a_bucket - a_size) % self._size
+                    self._window_sum[idx] -= self._sum[leaving]
+                    self._window_count[idx] -= self._count[leaving]
+                    if self._window_count[idx] == 0:
+                        self._window_sum[idx] = 0.0
+                self._clear(a_bucket % self._size)
+
+            for idx, a_size in enumerate(self._window_buckets):
+                oldest = bucket - a_size + 1
+                for a_deque in (self._window_min[idx], self._window_max[idx]):
+                    while len(a_deque) > 0 and a_deque[0][0] < oldest:
+                        a_deque.popleft()
+        self._head = bucket
+
+    def values(self, now: float) -> list[tuple[float | None, float | None, float | None]]:
+        # (mean, min, max) for every window
+        self._advance(int(now // self._resolution))
+        result = []
+        for idx in range(len(self._windows)):
+            count = self._window_count[idx]
+            if count == 0:
+                result.append((None, None, None))
+            else:
+                result.append((self._window_sum[idx] / count, self._window_min[idx][0][1], self._window_max[idx][0][1]))
+        return result
+
+
+class TibberGraphApiPulseAggregates:
+    # the rolling aggregates of all PULSE_ROLLING_FIELDS of a single pulse - plus the energy (in kWh) that is
+    # integrated from the power values (trapezoidal rule)
+
+    def __init__(self, fields: tuple = PULSE_ROLLING_FIELDS, windows: tuple = PULSE_ROLLING_WINDOWS,
+                 resolution: int = PULSE_ROLLING_RESOLUTION):
+        self._windows = tuple(windows)
+        self._aggregates = {a_field: TibberGraphApiRollingAggregate(windows, resolution) for a_field in fields}
+        self._last_power = {}
+        self.energy = {"power": 0.0, "powerProduction": 0.0}
+
+    def add_frame(self, frame: dict, now: float = None):
+        if now is None:
+            now = time.monotonic()
+        for a_field, an_aggregate in self._aggregates.items():
+            value = frame.get(a_field)
+            if isinstance(value, (int, float)):
+                an_aggregate.add(now, value)
+
+        for a_field in self.energy:
+            value = frame.get(a_field)
+            if not isinstance(value, (int, float)):
+                continue
+            last = self._last_power.get(a_field)
+            if last is not None:
+                delta = now - last[0]
+                if 0 < delta <= PULSE_ENERGY_MAX_GAP:
+                    # W * sec -> kWh
+                    self.energy[a_field] += (last[1] + value) / 2 * delta / 3_600_000
+            self._last_power[a_field] = (now, value)
+
+    def as_dict(self, now: float = None) -> dict:
+        if now is None:
+            now = time.monotonic()
+        result = {}
+        for a_field, an_aggregate in self._aggregates.items():
+            for a_window, (a_mean, a_min, a_max) in zip(self._windows, an_aggregate.values(now)):
+                suffix = f"{int(a_window // 60)}m"
+                result[f"{a_field}Mean{suffix}"] = round(a_mean, 1) if a_mean is not None else None
+                result[f"{a_field}Min{suffix}"] = a_min
+                result[f"{a_field}Max{suffix}"] = a_max
+        result["energyConsumption"] = round(self.energy["power"], 4)
+        result["energyProduction"] = round(self.energy["powerProduction"], 4)
+        return result
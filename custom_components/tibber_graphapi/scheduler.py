@@ -0,0 +1,63 @@
+import logging
+from datetime import timedelta
+
+from custom_components.tibber_graphapi.tags import TGATag
+
+_LOGGER = logging.getLogger(__name__)
+
+POLL_STATE_CHARGING = "charging"
+POLL_STATE_PLUGGED = "plugged"
+POLL_STATE_IDLE = "idle"
+
+
+class TibberGraphApiPollScheduler:
+    # calculates the update interval of a single vehicle coordinator from the last vehicle data:
+    # - charging: min interval
+    # - plugged in (but not charging): the configured scan interval
+    # - disconnected or not alive: starting with the scan interval, doubled with every poll (up to max interval)
+
+    def __init__(self, scan_interval: int, min_interval: int, max_interval: int):
+        self._min = max(1, int(min_interval))
+        self._max = max(self._min, int(max_interval))
+        self._scan = min(max(int(scan_interval), self._min), self._max)
+        self._current = self._scan
+        self.state = None
+
+    @property
+    def interval(self) -> timedelta:
+        return timedelta(seconds=self._current)
+
+    @staticmethod
+    def classify(data: dict | None) -> str | None:
+        if data is None:
+            return None
+
+        charging_status = data.get(TGATag.VEH_CHARGING_STATUS.jkey)
+        charging_status = charging_status.lower() if isinstance(charging_status, str) else ""
+        if data.get("isCharging") is True or charging_status == "charging" or charging_status == "chargingac":
+            return POLL_STATE_CHARGING
+
+        if data.get(TGATag.VEH_ALIVE.jkey) is False or charging_status == "disconnected":
+            return POLL_STATE_IDLE
+
+        return POLL_STATE_PLUGGED
+
+    def next_interval(self, data: dict | None) -> timedelta:
+        new_state = self.classify(data)
+        if new_state is None:
+            # no data (e.g. auth issues) - we keep the current interval
+            return self.interval
+
+        if new_state == POLL_STATE_CHARGING:
+            self._current = self._min
+        elif new_state == POLL_STATE_PLUGGED:
+            self._current = self._scan
+        elif self.state == POLL_STATE_IDLE:
+            self._current = min(self._current * 2, self._max)
+        else:
+            self._current = self._scan
+
+        if new_state != self.state:
+            _LOGGER.debug(f"vehicle state changed from '{self.state}' to '{new_state}' - polling every {self._current} seconds")
+        self.state = new_state
+        return self.interval
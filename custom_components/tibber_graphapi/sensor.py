@@ -1,17 +1,20 @@
 import logging
 
-from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription, RestoreSensor
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import StateType
 
 from custom_components.tibber_graphapi import TibberGraphApiDataUpdateCoordinator, TibberGraphApiEntity
 from custom_components.tibber_graphapi.const import (
     DOMAIN,
-    SENSOR_TYPES
+    SENSOR_TYPES,
+    PULSE_SENSOR_TYPES,
+    PLAN_SENSOR_TYPES,
+    HISTORY_SENSOR_TYPES,
+    METRIC_SENSOR_TYPES,
+    UNIT_CURRENCY_PLACEHOLDER
 )
-from custom_components.tibber_graphapi.tags import TGATag
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,96 +27,77 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, asyn
         entity = TibberGraphApiSensor(coordinator, description)
         entities.append(entity)
 
+    for a_pulse_coordinator in coordinator.pulse_coordinators:
+        for description in PULSE_SENSOR_TYPES:
+            entity = TibberGraphApiSensor(a_pulse_coordinator, description)
+            entities.append(entity)
+
+    if coordinator.charge_plan is not None:
+        for description in PLAN_SENSOR_TYPES:
+            entity = TibberGraphApiSensor(coordinator.charge_plan, description)
+            entities.append(entity)
+
+    if coordinator.charging_history is not None:
+        for description in HISTORY_SENSOR_TYPES:
+            entity = TibberGraphApiSensor(coordinator.charging_history, description)
+            entities.append(entity)
+
+    if coordinator.owns_metrics:
+        for description in METRIC_SENSOR_TYPES:
+            entity = TibberGraphApiMetricSensor(coordinator, description)
+            entities.append(entity)
+
     async_add_entities(entities)
 
 
-class TibberGraphApiSensor(TibberGraphApiEntity, SensorEntity, RestoreEntity):
+class TibberGraphApiSensor(TibberGraphApiEntity, RestoreSensor):
+    _restored_value = None
+    _restored_unit = None
+
     def __init__(self, a_coordinator: TibberGraphApiDataUpdateCoordinator, description: SensorEntityDescription):
         super().__init__(coordinator=a_coordinator, description=description)
 
-    def get_value_in_path(self, data, keys):
-        return self.get_value_in_path(data[keys[0]], keys[1:]) if keys else data
-
-    # from EVCC [https://github.com/evcc-io/evcc/blob/master/vehicle/ford/provider.go]...
-    # func (v *Provider) Status() (api.ChargeStatus, error) {
-    #     status := api.StatusNone
-    #
-    # res, err := v.statusG()
-    # if err == nil {
-    #     switch res.Metrics.XevPlugChargerStatus.Value {
-    #     case "DISCONNECTED":
-    #       status = api.StatusA // disconnected
-    #     case "CONNECTED":
-    #       status = api.StatusB // connected, not charging
-    #     case "CHARGING", "CHARGINGAC":
-    #       status = api.StatusC // charging
-    #     default:
-    #       err = fmt.Errorf("unknown charge status: %s", res.Metrics.XevPlugChargerStatus.Value)
-    #     }
-    # }
-
-    def is_not_null(self, value) -> bool:
-        return value is not None and value != "" and value != "null"
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if self.coordinator.data is None:
+            last_sensor_data = await self.async_get_last_sensor_data()
+            if last_sensor_data is not None and last_sensor_data.native_value is not None:
+                self._restored_value = last_sensor_data.native_value
+                self._restored_unit = last_sensor_data.native_unit_of_measurement
+                self._restored = True
 
     @property
-    def native_value(self) -> StateType:
-        try:
+    def native_unit_of_measurement(self) -> str | None:
+        unit = super().native_unit_of_measurement
+        if unit == UNIT_CURRENCY_PLACEHOLDER:
             if self.coordinator.data is not None:
-                if hasattr(self.entity_description, "tag"):
-                    # hardcoded charging status A-F
-                    if self.entity_description.tag.key == TGATag.VEH_CHARGING_STATUS.key:
-
-                        if TGATag.VEH_CHARGING_STATUS.jkey in self.coordinator.data:
-                            # from https://github.com/evcc-io/evcc/blob/master/api/chargemodestatus.go
-                            # StatusA    ChargeStatus = "A" // Fzg. angeschlossen: nein    Laden aktiv: nein    Ladestation betriebsbereit, Fahrzeug getrennt
-                            # StatusB    ChargeStatus = "B" // Fzg. angeschlossen:   ja    Laden aktiv: nein    Fahrzeug verbunden, Netzspannung liegt nicht an
-                            # StatusC    ChargeStatus = "C" // Fzg. angeschlossen:   ja    Laden aktiv:   ja    Fahrzeug lädt, Netzspannung liegt an
-                            # StatusD    ChargeStatus = "D" // Fzg. angeschlossen:   ja    Laden aktiv:   ja    Fahrzeug lädt mit externer Belüfungsanforderung (für Blei-Säure-Batterien)
-                            # StatusE    ChargeStatus = "E" // Fzg. angeschlossen:   ja    Laden aktiv: nein    Fehler Fahrzeug / Kabel (CP-Kurzschluss, 0V)
-                            # StatusF    ChargeStatus = "F" // Fzg. angeschlossen:   ja    Laden aktiv: nein    Fehler EVSE oder Abstecken simulieren (CP-Wake-up, -12V)
-
-                            charging_status = self.coordinator.data[TGATag.VEH_CHARGING_STATUS.jkey].lower()
-                            is_charging_status = charging_status == "charging" or charging_status == "chargingac"
-
-                            # tibber graph api is very optimistic with charging status
-                            if is_charging_status:
-                                isChargingFlag = self.coordinator.data["isCharging"]
-                                charging_obj = self.coordinator.data["charging"]
-                                has_charger_id = self.is_not_null(charging_obj["chargerId"])
-                                progress_obj = charging_obj["progress"]
-                                has_progress = self.is_not_null(progress_obj["cost"]) or self.is_not_null(progress_obj["energy"]) or self.is_not_null(progress_obj["speed"])
-
-                                if is_charging_status and (isChargingFlag or has_charger_id or has_progress):
-                                    return "C"
-                                else:
-                                    # A or B ????
-                                    return "B"
-                            else:
-                                if charging_status == "not_charging":
-                                    return "B"
-                                elif charging_status == "disconnected":
-                                    return "A"
-
-                            # if we can not read any value, we return "A" as default
-                            return "A"
-
-                    else:
-                        # jpath is set ?! ["key1", "child2"]]
-                        if self.entity_description.tag.jpath is not None and len(self.entity_description.tag.jpath) > 0:
-                            path = self.entity_description.tag.jpath
-                            return self.get_value_in_path(self.coordinator.data, path)
-
-                        elif self.entity_description.tag.jkey is not None:
-                            value = self.coordinator.data[self.entity_description.tag.jkey]
-
-                            # have we a key/value map ?!
-                            if isinstance(value, list) and "key" in value[0]:
-                                if self.entity_description.tag.jvaluekey is not None:
-                                    for item in value:
-                                        if item["key"] == self.entity_description.tag.jvaluekey:
-                                            return item["value"]
-
-        except (IndexError, ValueError, TypeError) as ex:
-            _LOGGER.warning(f"Error for sensor '{self.entity_description.key}': {ex}")
+                return self.coordinator.data.get("currency")
+            return self._restored_unit
+        return unit
 
+    @property
+    def native_value(self) -> StateType:
+        if self.coordinator.data is None:
+            # no live data yet
+            return self._restored_value
+        if hasattr(self.entity_description, "tag"):
+            # the extraction is compiled (see tags.compile_tag) & cached by the coordinator
+            return self.coordinator.get_value(self.entity_description.tag)
         return None
+
+
+class TibberGraphApiMetricSensor(TibberGraphApiEntity, SensorEntity):
+    # the metrics are not part of the coordinator data - they are read (on every coordinator update) from the
+    # metrics of the tibber account. They are created only once per account (see claim_metrics) - the unique id
+    # belongs to the account, so the sensors stay the same, when another entry takes them over
+    def __init__(self, a_coordinator: TibberGraphApiDataUpdateCoordinator, description: SensorEntityDescription):
+        super().__init__(coordinator=a_coordinator, description=description)
+        self._unique_id = f"{DOMAIN}.account_{a_coordinator.account_id}_{description.key}".lower()
+
+    @property
+    def available(self):
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        return self.coordinator.metrics.get(self.entity_description.metric)
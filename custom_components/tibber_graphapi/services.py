@@ -0,0 +1,98 @@
+import logging
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_graphapi.const import DOMAIN
+from custom_components.tibber_graphapi.planner import plan_as_dict
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_PLAN_CHARGING = "plan_charging"
+SERVICE_CHARGING_HISTORY = "charging_history"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_SOC = "soc"
+ATTR_SOC_MAX = "soc_max"
+ATTR_CHARGE_RATE = "charge_rate"
+ATTR_DEADLINE = "deadline"
+ATTR_HOME_ID = "home_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LIMIT = "limit"
+
+PLAN_CHARGING_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_SOC): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+    vol.Optional(ATTR_SOC_MAX): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+    vol.Optional(ATTR_CHARGE_RATE): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=100)),
+    vol.Optional(ATTR_DEADLINE): cv.datetime,
+    vol.Optional(ATTR_HOME_ID): cv.string,
+})
+
+CHARGING_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Optional(ATTR_START): cv.datetime,
+    vol.Optional(ATTR_END): cv.datetime,
+    vol.Optional(ATTR_LIMIT): vol.All(vol.Coerce(int), vol.Range(min=0)),
+})
+
+
+def _local(value):
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=dt_util.get_default_time_zone())
+    return value
+
+
+def _coordinator(hass: HomeAssistant, call: ServiceCall):
+    coordinator = hass.data.get(DOMAIN, {}).get(call.data[ATTR_CONFIG_ENTRY_ID])
+    if coordinator is None or not hasattr(coordinator, "charge_plan"):
+        raise ServiceValidationError(f"unknown (or not loaded) config entry: {call.data[ATTR_CONFIG_ENTRY_ID]}")
+    return coordinator
+
+
+@callback
+def async_setup_services(hass: HomeAssistant):
+
+    async def _async_plan_charging(call: ServiceCall) -> ServiceResponse:
+        coordinator = _coordinator(hass, call)
+        if coordinator.charge_plan is None:
+            raise ServiceValidationError(f"the charge planner is not enabled for '{coordinator.name_prefix}'")
+
+        deadline = _local(call.data.get(ATTR_DEADLINE))
+
+        # the prices are only fetched, when they are not already cached
+        await coordinator.charge_plan.async_refresh_prices()
+        plan = coordinator.charge_plan.build_plan(soc=call.data.get(ATTR_SOC), soc_max=call.data.get(ATTR_SOC_MAX),
+                                                  charge_rate=call.data.get(ATTR_CHARGE_RATE), deadline=deadline,
+                                                  home_id=call.data.get(ATTR_HOME_ID))
+        if plan is None:
+            raise ServiceValidationError(f"no plan possible - prices or the SOC of '{coordinator.name_prefix}' are not available")
+        return plan_as_dict(plan)
+
+    async def _async_charging_history(call: ServiceCall) -> ServiceResponse:
+        # served from the local cache - there is no request to tibber
+        coordinator = _coordinator(hass, call)
+        if coordinator.charging_history is None:
+            raise ServiceValidationError(f"the charging history is not enabled for '{coordinator.name_prefix}'")
+
+        history = coordinator.charging_history.history
+        sessions = history.sessions(start=_local(call.data.get(ATTR_START)), end=_local(call.data.get(ATTR_END)),
+                                    limit=call.data.get(ATTR_LIMIT))
+        return {
+            "currency": history.currency,
+            "count": len(sessions),
+            "energy": round(sum(a_session["energy"] or 0.0 for a_session in sessions), 3),
+            "cost": round(sum(a_session["cost"] or 0.0 for a_session in sessions), 2),
+            "sessions": sessions
+        }
+
+    if not hass.services.has_service(DOMAIN, SERVICE_PLAN_CHARGING):
+        hass.services.async_register(DOMAIN, SERVICE_PLAN_CHARGING, _async_plan_charging, schema=PLAN_CHARGING_SCHEMA,
+                                     supports_response=SupportsResponse.ONLY)
+    if not hass.services.has_service(DOMAIN, SERVICE_CHARGING_HISTORY):
+        hass.services.async_register(DOMAIN, SERVICE_CHARGING_HISTORY, _async_charging_history, schema=CHARGING_HISTORY_SCHEMA,
+                                     supports_response=SupportsResponse.ONLY)
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    SETTINGS_DEBOUNCE,
+    SETTINGS_MAX_DELAY
+)
+from custom_components.tibber_graphapi.tags import TGATag
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def with_settings(data: dict | None, jkey: str, values: dict) -> dict | None:
+    # a copy of the vehicle data, where the given {key: value} items of the 'jkey' list have been replaced (or
+    # added) - the original data (and the cached response of the bridge) stays untouched
+    if data is None or len(values) == 0:
+        return data
+    items = [item for item in data.get(jkey) or [] if not (isinstance(item, dict) and item.get("key") in values)]
+    items.extend({"key": a_key, "value": a_value} for a_key, a_value in values.items())
+    data = dict(data)
+    data[jkey] = items
+    return data
+
+
+class TibberGraphApiSettingsWriter:
+    # writes the (writeable) user settings of a vehicle - every change is applied optimistically to the data of
+    # the coordinator (without a new poll), and all changes within SETTINGS_DEBOUNCE seconds (at most
+    # SETTINGS_MAX_DELAY seconds after the first one) are sent with a single mutation. Till tibber has accepted
+    # them, the changes are also applied to the polled data - after that, the next poll reconciles the values
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, coordinator):
+        self._hass = hass
+        self._config_entry = config_entry
+        self._coordinator = coordinator
+        # jvaluekey -> value: not sent yet & sent, but not confirmed yet
+        self._pending: dict[str, dict] = {}
+        self._in_flight: dict[str, dict] = {}
+        self._lock = asyncio.Lock()
+        self._cancel_flush = None
+        self._first_change = None
+        self.mutations = 0
+        self.failures = 0
+
+    @property
+    def has_pending(self) -> bool:
+        return len(self._pending) > 0 or len(self._in_flight) > 0
+
+    def _overrides(self) -> dict[str, dict]:
+        overrides = {}
+        for source in (self._in_flight, self._pending):
+            for a_jkey, values in source.items():
+                overrides.setdefault(a_jkey, {}).update(values)
+        return overrides
+
+    def apply_pending(self, data: dict | None) -> dict | None:
+        # the polled data must not revert a change, that is not confirmed by tibber yet
+        if not self.has_pending:
+            return data
+        for a_jkey, values in self._overrides().items():
+            data = with_settings(data, a_jkey, values)
+        return data
+
+    @callback
+    def async_set(self, tag: TGATag, value):
+        if not tag.writeable or tag.jvaluekey is None:
+            raise ValueError(f"'{tag.key}' is not writeable")
+
+        self._pending.setdefault(tag.jkey, {})[tag.jvaluekey] = value
+        self._coordinator.async_set_local_data(with_settings(self._coordinator.data, tag.jkey, {tag.jvaluekey: value}))
+
+        # debounced - but a slider that is moved all the time must not delay the mutation forever
+        now = time.monotonic()
+        if self._first_change is None:
+            self._first_change = now
+        delay = max(0.0, min(SETTINGS_DEBOUNCE, self._first_change + SETTINGS_MAX_DELAY - now))
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+        self._cancel_flush = async_call_later(self._hass, delay, self._async_scheduled_flush)
+
+    @callback
+    def _async_scheduled_flush(self, _now=None):
+        self._cancel_flush = None
+        self._config_entry.async_create_background_task(self._hass, self.async_flush(),
+                                                        name=f"{DOMAIN}_settings_{self._config_entry.entry_id}")
+
+    async def async_stop(self):
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+        # changes that have been made right before the unload should not get lost
+        await self.async_flush()
+
+    async def async_flush(self):
+        async with self._lock:
+            self._first_change = None
+            if len(self._pending) == 0:
+                return
+            self._in_flight = self._pending
+            self._pending = {}
+
+            settings = [{"key": a_key, "value": a_value} for values in self._in_flight.values() for a_key, a_value in values.items()]
+            _LOGGER.debug(f"writing {len(settings)} setting(s) of '{self._coordinator.name_prefix}': {settings}")
+            self.mutations += 1
+            try:
+                success = await self._coordinator.bridge.set_vehicle_settings(settings)
+            except Exception as exc:
+                _LOGGER.warning(f"writing settings caused: {exc}")
+                success = False
+            self._in_flight = {}
+
+        if success:
+            # the cached (unchanged) response does not know about the changes
+            self._coordinator.bridge.reset_response_cache()
+        else:
+            # the optimistic values are wrong - the next poll will bring back the values of tibber
+            self.failures += 1
+            _LOGGER.warning(f"settings of '{self._coordinator.name_prefix}' could not be written: {settings}")
+            await self._coordinator.async_request_refresh()
@@ -0,0 +1,260 @@
+import logging
+import time
+from datetime import datetime, timezone, timedelta
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics, get_last_statistics
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, UnitOfEnergy, UnitOfLength, UnitOfPower
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    STORAGE_VERSION,
+    STORAGE_KEY_STATISTICS,
+    STATISTICS_BUCKET,
+    STATISTICS_FLUSH_INTERVAL,
+    STATISTICS_MAX_COUNTER_GAP
+)
+from custom_components.tibber_graphapi.tags import TGATag
+
+_LOGGER = logging.getLogger(__name__)
+
+# the recorder only accepts hourly external statistics - the 5 minute buckets are folded into hours
+_HOUR = 3600
+
+# (field of the pulse frame, statistic suffix, name suffix, unit)
+PULSE_MEAN_SERIES = (
+    ("power", "power", "Power", UnitOfPower.WATT),
+    ("powerProduction", "power_production", "Power production", UnitOfPower.WATT),
+)
+# the (daily) meter counters of the pulse - the deltas are summed up
+PULSE_SUM_SERIES = (
+    ("accumulatedConsumption", "consumption", "Consumption", UnitOfEnergy.KILO_WATT_HOUR),
+    ("accumulatedProduction", "production", "Production", UnitOfEnergy.KILO_WATT_HOUR),
+)
+VEHICLE_SERIES = (
+    (TGATag.VEH_SOC, "soc", "SOC", PERCENTAGE),
+    (TGATag.VEH_RANGE, "range", "Range", UnitOfLength.KILOMETERS),
+)
+# the finished charging sessions (see history.py) - summed up, the unit of the cost is the currency
+SESSION_SUM_SERIES = (
+    ("charged_energy", "Charged energy", UnitOfEnergy.KILO_WATT_HOUR),
+    ("charging_cost", "Charging cost", None),
+)
+
+
+class TibberGraphApiStatistics:
+    # collects pulse & vehicle values (and the finished charging sessions) in 5 minute buckets (in memory) and
+    # imports them as hourly external statistics ('tibber_graphapi:...') in batches - so the values don't have
+    # to be recorded as states. The
+    # buckets of the current hour (and the last meter counters) are persisted on unload, the energy between
+    # two counter readings is spread over the buckets of the gap (e.g. after a reconnect)
+
+    VEHICLE_SERIES = VEHICLE_SERIES
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry):
+        self._hass = hass
+        self._store = _statistics_store(hass, config_entry)
+        self._meta: dict[str, StatisticMetaData] = {}
+        self._buckets: dict[str, dict[int, list]] = {}
+        self._counters: dict[str, tuple[float, float]] = {}
+        self._last_sums: dict[str, tuple[float, float]] = {}
+        self._cancel_flush = None
+        self.imported = 0
+
+    @staticmethod
+    def statistic_id(*parts: str) -> str:
+        return f"{DOMAIN}:{slugify('_'.join(parts))}"
+
+    def _register(self, statistic_id: str, name: str, unit: str, has_sum: bool):
+        if statistic_id not in self._meta:
+            self._meta[statistic_id] = StatisticMetaData(has_mean=not has_sum, has_sum=has_sum, name=name,
+                                                         source=DOMAIN, statistic_id=statistic_id,
+                                                         unit_of_measurement=unit)
+
+    async def async_start(self):
+        try:
+            data = await self._store.async_load()
+        except Exception as exc:
+            _LOGGER.warning(f"could not load stored statistics: {exc}")
+            data = None
+
+        if data is not None:
+            for statistic_id, buckets in data.get("buckets", {}).items():
+                target = self._buckets.setdefault(statistic_id, {})
+                for start, a_sum, count, a_min, a_max in buckets:
+                    self._merge(target, int(start), a_sum, count, a_min, a_max)
+            for statistic_id, counter in data.get("counters", {}).items():
+                self._counters[statistic_id] = (counter[0], counter[1])
+            # the restored buckets must be imported, even if their series is not seen again
+            for statistic_id, (name, unit, has_sum) in data.get("meta", {}).items():
+                self._register(statistic_id, name, unit, has_sum)
+
+        self._cancel_flush = async_track_time_interval(self._hass, self._async_scheduled_flush,
+                                                       timedelta(seconds=STATISTICS_FLUSH_INTERVAL))
+
+    async def async_stop(self):
+        if self._cancel_flush is not None:
+            self._cancel_flush()
+            self._cancel_flush = None
+        await self.async_flush()
+        # what is left (the current hour) will be imported after the restart
+        buckets = {statistic_id: [[start] + values for start, values in buckets.items()]
+                   for statistic_id, buckets in self._buckets.items() if len(buckets) > 0 and statistic_id in self._meta}
+        await self._store.async_save({
+            "buckets": buckets,
+            "meta": {statistic_id: [self._meta[statistic_id]["name"], self._meta[statistic_id]["unit_of_measurement"],
+                                    self._meta[statistic_id]["has_sum"]] for statistic_id in buckets},
+            "counters": {statistic_id: list(counter) for statistic_id, counter in self._counters.items()}
+        })
+
+    @staticmethod
+    def _merge(target: dict, start: int, a_sum: float, count: int, a_min: float, a_max: float):
+        bucket = target.get(start)
+        if bucket is None:
+            target[start] = [a_sum, count, a_min, a_max]
+        else:
+            bucket[0] += a_sum
+            bucket[1] += count
+            bucket[2] = min(bucket[2], a_min)
+            bucket[3] = max(bucket[3], a_max)
+
+    def _add_sample(self, statistic_id: str, value: float, now: float):
+        start = int(now // STATISTICS_BUCKET) * STATISTICS_BUCKET
+        self._merge(self._buckets.setdefault(statistic_id, {}), start, value, 1, value, value)
+
+    def _add_counter(self, statistic_id: str, value: float, now: float):
+        last = self._counters.get(statistic_id)
+        self._counters[statistic_id] = (now, value)
+        if last is None:
+            return
+
+        last_time, last_value = last
+        if now - last_time >= STATISTICS_MAX_COUNTER_GAP:
+            # a (restored) counter of another day - e.g. the pulses have been owned by another entry meanwhile
+            return
+        # the counters of the pulse are reset at midnight
+        delta = value - last_value if value >= last_value else value
+        if delta <= 0 or now <= last_time:
+            return
+        self._spread(statistic_id, delta, last_time, now)
+
+    def _spread(self, statistic_id: str, delta: float, begin: float, end: float):
+        # the delta is spread over all buckets between begin & end
+        target = self._buckets.setdefault(statistic_id, {})
+        start = int(begin // STATISTICS_BUCKET) * STATISTICS_BUCKET
+        while start <= end:
+            overlap = min(end, start + STATISTICS_BUCKET) - max(begin, start)
+            if overlap > 0:
+                self._merge(target, start, delta * overlap / (end - begin), 0, 0, 0)
+            start += STATISTICS_BUCKET
+
+    @callback
+    def add_pulse_frame(self, pulse_id: str, pulse_name: str, frame: dict, now: float = None):
+        if now is None:
+            now = time.time()
+        for a_field, suffix, name, unit in PULSE_MEAN_SERIES:
+            value = frame.get(a_field)
+            if isinstance(value, (int, float)):
+                statistic_id = self.statistic_id("pulse", pulse_id[:8], suffix)
+                self._register(statistic_id, f"Pulse {pulse_name} {name}", unit, has_sum=False)
+                self._add_sample(statistic_id, value, now)
+
+        for a_field, suffix, name, unit in PULSE_SUM_SERIES:
+            value = frame.get(a_field)
+            if isinstance(value, (int, float)):
+                statistic_id = self.statistic_id("pulse", pulse_id[:8], suffix)
+                self._register(statistic_id, f"Pulse {pulse_name} {name}", unit, has_sum=True)
+                self._add_counter(statistic_id, value, now)
+
+    @callback
+    def add_vehicle_values(self, vehicle_id: str, vehicle_name: str, coordinator, now: float = None):
+        if now is None:
+            now = time.time()
+        for a_tag, suffix, name, unit in VEHICLE_SERIES:
+            value = coordinator.get_value(a_tag)
+            if isinstance(value, (int, float)):
+                statistic_id = self.statistic_id("vehicle", vehicle_id[:8], suffix)
+                self._register(statistic_id, f"{vehicle_name} {name}", unit, has_sum=False)
+                self._add_sample(statistic_id, value, now)
+
+    @callback
+    def add_charging_session(self, vehicle_id: str, vehicle_name: str, start: float, end: float, energy: float | None,
+                             cost: float | None, currency: str | None):
+        for value, (suffix, name, unit) in zip((energy, cost), SESSION_SUM_SERIES):
+            if isinstance(value, (int, float)) and value > 0:
+                statistic_id = self.statistic_id("vehicle", vehicle_id[:8], suffix)
+                self._register(statistic_id, f"{vehicle_name} {name}", unit if unit is not None else currency, has_sum=True)
+                self._spread(statistic_id, value, start, max(end, start + 1))
+
+    async def _async_scheduled_flush(self, _now=None):
+        await self.async_flush()
+
+    async def _async_last_sum(self, statistic_id: str) -> tuple[float, float]:
+        # (start of the last imported hour, sum) - from the recorder, when we don't know it yet
+        last = self._last_sums.get(statistic_id)
+        if last is None:
+            rows = await get_instance(self._hass).async_add_executor_job(
+                get_last_statistics, self._hass, 1, statistic_id, True, {"sum"})
+            if statistic_id in rows and len(rows[statistic_id]) > 0:
+                row = rows[statistic_id][0]
+                last = (row["start"], row.get("sum") or 0.0)
+            else:
+                last = (0.0, 0.0)
+            self._last_sums[statistic_id] = last
+        return last
+
+    async def async_flush(self):
+        # imports all complete hours
+        current_hour = int(time.time() // _HOUR) * _HOUR
+        for statistic_id, buckets in list(self._buckets.items()):
+            meta = self._meta.get(statistic_id)
+            if meta is None:
+                # restored buckets of a series that has not been seen again (yet)
+                continue
+
+            hours = {}
+            for start in [a_start for a_start in buckets if a_start < current_hour]:
+                hour = start - start % _HOUR
+                values = buckets.pop(start)
+                self._merge(hours, hour, *values)
+            if len(hours) == 0:
+                continue
+
+            statistics = []
+            if meta["has_sum"]:
+                last_start, last_sum = await self._async_last_sum(statistic_id)
+                for hour in sorted(hours):
+                    if hour <= last_start:
+                        # already imported
+                        continue
+                    last_sum += hours[hour][0]
+                    statistics.append(StatisticData(start=datetime.fromtimestamp(hour, tz=timezone.utc),
+                                                    state=last_sum, sum=last_sum))
+                    last_start = hour
+                self._last_sums[statistic_id] = (last_start, last_sum)
+            else:
+                for hour in sorted(hours):
+                    a_sum, count, a_min, a_max = hours[hour]
+                    if count > 0:
+                        statistics.append(StatisticData(start=datetime.fromtimestamp(hour, tz=timezone.utc),
+                                                        mean=a_sum / count, min=a_min, max=a_max))
+
+            if len(statistics) > 0:
+                _LOGGER.debug(f"importing {len(statistics)} hour(s) of '{statistic_id}'")
+                async_add_external_statistics(self._hass, meta, statistics)
+                self.imported += len(statistics)
+
+
+def _statistics_store(hass: HomeAssistant, config_entry: ConfigEntry) -> Store:
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_STATISTICS}.{config_entry.entry_id}")
+
+
+async def async_remove_statistics_data(hass: HomeAssistant, config_entry: ConfigEntry):
+    # the already imported statistics are kept (like the recorded states of removed entities)
+    await _statistics_store(hass, config_entry).async_remove()
@@ -0,0 +1,324 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+
+import aiohttp
+from aiohttp import ClientConnectionError
+from homeassistant.core import HomeAssistant, callback
+
+from custom_components.tibber_graphapi.auth import TibberGraphApiAuth
+from custom_components.tibber_graphapi.codec import TibberGraphApiFrameDecoder, json_dumps
+from custom_components.tibber_graphapi.const import (
+    DOMAIN,
+    PULSE_RECONNECT_MIN,
+    PULSE_RECONNECT_MAX,
+    STREAM_WATCHDOG_INTERVAL,
+    STREAM_PING_AFTER,
+    STREAM_STALE_AFTER,
+    STREAM_STALE_KA_FACTOR
+)
+from custom_components.tibber_graphapi.discovery import TibberGraphApiDiscovery, DISCOVERY_PULSES
+
+_LOGGER = logging.getLogger(__name__)
+
+# the values 'lastMeterProduction' & 'lastMeterConsumption' are not present in the
+# v4 PulseMeasurement / RealTimeMeasurement Objects ?!
+PULSE_SUBSCRIPTION_QUERY = "subscription pulseSubscription($deviceId: String!) { liveMeasurement(deviceId: $deviceId) { __typename ...RealTimeMeasurement } }  fragment RealTimeMeasurement on PulseMeasurement { timestamp power powerProduction minPower minPowerTimestamp averagePower maxPower maxPowerTimestamp minPowerProduction maxPowerProduction estimatedAccumulatedConsumptionCurrentHour accumulatedConsumption accumulatedCost accumulatedConsumptionCurrentHour accumulatedProduction accumulatedProductionCurrentHour accumulatedReward peakControlConsumptionState currency currentPhase1 currentPhase2 currentPhase3 voltagePhase1 voltagePhase2 voltagePhase3 powerFactor signalStrength}"
+
+
+class TibberGraphApiPulseStream:
+    # one websocket per tibber account (graphql-transport-ws) that carries the subscriptions of all pulses -
+    # the 'next' frames are routed by their subscription id to the (single) consumer of the pulse, the
+    # coordinator of the pulse device. Pulses can be added/removed while the socket is connected, the socket
+    # is only open while there is at least one consumer. A watchdog pings the server when the stream is silent,
+    # forces a reconnect when it stays silent and reports pulses without measurements as unavailable
+
+    WS_URL = "wss://app.tibber.com/v4/gql/ws"
+
+    def __init__(self, hass: HomeAssistant, a_web_session, auth: TibberGraphApiAuth, discovery: TibberGraphApiDiscovery):
+        self._hass = hass
+        self._web_session = a_web_session
+        self._auth = auth
+        self._discovery = discovery
+        # pulse id -> (on_measurement, on_availability)
+        self._consumers: dict[str, tuple] = {}
+        self._available: dict[str, bool] = {}
+        self._last_measurement: dict[str, float] = {}
+        # subscription id -> pulse id (and the other way round) of the current connection
+        self._subscriptions: dict[str, str] = {}
+        self._subscription_ids: dict[str, str] = {}
+        self._ws = None
+        self._acknowledged = False
+        self._task = None
+        self._send_tasks = set()
+        self._received = False
+        self._watchdog = None
+        self._last_frame = None
+        self._last_ka = None
+        self._ka_interval = None
+        self._ping_sent = False
+        self.frame_decoder = TibberGraphApiFrameDecoder()
+        self.connected = False
+        self.pings = 0
+        self.stale_reconnects = 0
+
+    @property
+    def pulse_ids(self) -> list[str]:
+        return list(self._consumers.keys())
+
+    def is_subscribed(self, pulse_id: str) -> bool:
+        return self.connected and pulse_id in self._subscription_ids
+
+    @property
+    def stale_after(self) -> float:
+        if self._ka_interval is not None:
+            return max(STREAM_STALE_AFTER, self._ka_interval * STREAM_STALE_KA_FACTOR)
+        return STREAM_STALE_AFTER
+
+    @callback
+    def subscribe(self, pulse_id: str, on_measurement, on_availability=None):
+        # 'on_availability(bool)' will be called, when the pulse has no measurements for 'stale_after' seconds
+        # (and when the measurements are back again)
+        new_pulse = pulse_id not in self._consumers
+        if not new_pulse:
+            _LOGGER.warning(f"pulse '{pulse_id}' has already a consumer - it will be replaced")
+        self._consumers[pulse_id] = (on_measurement, on_availability)
+        if pulse_id not in self._last_measurement:
+            # grace period for the first measurement
+            self._last_measurement[pulse_id] = time.monotonic()
+            self._available[pulse_id] = True
+        if new_pulse and self._acknowledged:
+            # a new pulse - the running connection can take it
+            self._send_subscribe(pulse_id)
+
+        if self._task is None:
+            self._task = self._hass.async_create_background_task(self._async_run(), name=f"{DOMAIN}_pulse_stream")
+
+    async def async_unsubscribe(self, pulse_id: str, on_measurement, on_availability=None):
+        consumer = self._consumers.get(pulse_id)
+        if consumer is not None and consumer[0] == on_measurement:
+            del self._consumers[pulse_id]
+            self._available.pop(pulse_id, None)
+            self._last_measurement.pop(pulse_id, None)
+            subscribe_id = self._subscription_ids.pop(pulse_id, None)
+            if subscribe_id is not None:
+                self._subscriptions.pop(subscribe_id, None)
+                if self._acknowledged:
+                    self._send({"type": "complete", "id": subscribe_id})
+
+        if len(self._consumers) == 0:
+            await self.async_stop()
+
+    async def async_stop(self):
+        for a_task in list(self._send_tasks):
+            a_task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @callback
+    def _send(self, message: dict):
+        if self._ws is None or self._ws.closed:
+            return
+        a_task = self._hass.async_create_background_task(self._ws.send_str(json_dumps(message)), name=f"{DOMAIN}_pulse_stream_send")
+        self._send_tasks.add(a_task)
+        a_task.add_done_callback(self._send_tasks.discard)
+
+    @callback
+    def _send_subscribe(self, pulse_id: str):
+        # a unique id for every subscription
+        subscribe_id = str(uuid.uuid4())
+        old_id = self._subscription_ids.get(pulse_id)
+        if old_id is not None:
+            self._subscriptions.pop(old_id, None)
+        self._subscription_ids[pulse_id] = subscribe_id
+        self._subscriptions[subscribe_id] = pulse_id
+        self._send({
+            "type": "subscribe",
+            "id": subscribe_id,
+            "payload": {
+                "operationName": "pulseSubscription",
+                "variables": {"deviceId": pulse_id},
+                "query": PULSE_SUBSCRIPTION_QUERY
+            }
+        })
+
+    async def _async_run(self):
+        delay = PULSE_RECONNECT_MIN
+        self._watchdog = self._hass.async_create_background_task(self._async_watchdog(), name=f"{DOMAIN}_pulse_stream_watchdog")
+        try:
+            while len(self._consumers) > 0:
+                if await self._async_connect():
+                    # the connection was working - so we start again with the short delay
+                    delay = PULSE_RECONNECT_MIN
+
+                _LOGGER.debug(f"pulse websocket closed - reconnect in {delay} seconds")
+                await asyncio.sleep(delay + random.uniform(0, 1))
+                delay = min(delay * 2, PULSE_RECONNECT_MAX)
+        finally:
+            self._watchdog.cancel()
+            self._watchdog = None
+            self._task = None
+
+    async def _async_watchdog(self):
+        while True:
+            await asyncio.sleep(STREAM_WATCHDOG_INTERVAL)
+            now = time.monotonic()
+            stale_after = self.stale_after
+
+            ws = self._ws
+            if ws is not None and not ws.closed and self._last_frame is not None:
+                idle = now - self._last_frame
+                if idle > stale_after:
+                    # half-dead connection - closing it will end the 'async for' of the connection
+                    _LOGGER.info(f"no frame for {idle:.0f} seconds - reconnecting the pulse websocket")
+                    self.stale_reconnects += 1
+                    await ws.close()
+                elif idle > STREAM_PING_AFTER and not self._ping_sent:
+                    self._ping_sent = True
+                    self.pings += 1
+                    self._send({"type": "ping"})
+
+            for a_pulse_id, a_last_measurement in list(self._last_measurement.items()):
+                if self._available.get(a_pulse_id, True) and now - a_last_measurement > stale_after:
+                    _LOGGER.debug(f"no measurement of pulse '{a_pulse_id}' for {now - a_last_measurement:.0f} seconds")
+                    self._set_available(a_pulse_id, False)
+
+    def _set_available(self, pulse_id: str, available: bool):
+        self._available[pulse_id] = available
+        consumer = self._consumers.get(pulse_id)
+        if consumer is not None and consumer[1] is not None:
+            consumer[1](available)
+
+    async def _async_connect(self) -> bool:
+        # a single connection - returns True, when at least one measurement has been received
+        self._received = False
+        try:
+            token = await self._auth.async_get_token()
+        except Exception as err:
+            # e.g. the circuit breaker of the account is open - try again with the next reconnect
+            _LOGGER.debug(f"no token for the pulse websocket: {err}")
+            return False
+        if token is None:
+            return False
+
+        started = time.monotonic()
+        try:
+            async with self._web_session.ws_connect(self.WS_URL, headers=self._auth.headers_ws) as ws:
+                self._auth.metrics.record_ws_connect(101, started)
+                self._ws = ws
+                self.connected = True
+                self._last_frame = time.monotonic()
+                self._last_ka = None
+                self._ping_sent = False
+                _LOGGER.info(f"connected to websocket: {self.WS_URL}")
+                await ws.send_str(json_dumps({"type": "connection_init"}))
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT or msg.type == aiohttp.WSMsgType.BINARY:
+                        try:
+                            self._on_frame(msg.data)
+                        except Exception as e:
+                            _LOGGER.debug("Could not read JSON from: %s - caused %s", msg, e)
+                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        _LOGGER.debug("received: %s", msg)
+                        break
+                    else:
+                        _LOGGER.error("xxx: %s", msg)
+
+        except aiohttp.WSServerHandshakeError as err:
+            _LOGGER.warning(f"websocket handshake failed: {err.status} - {err.message}")
+            self._auth.metrics.record_ws_connect(err.status, started)
+            if err.status == 401:
+                await self._auth.async_token_rejected(token)
+        except ClientConnectionError as err:
+            _LOGGER.error(f"Could not connect to websocket: {type(err)} - {err}")
+        except asyncio.CancelledError:
+            self._disconnected()
+            raise
+        except BaseException as x:
+            _LOGGER.error(f"!!!: {type(x)} - {x}")
+
+        self._disconnected()
+        return self._received
+
+    def _disconnected(self):
+        self._ws = None
+        self._acknowledged = False
+        self.connected = False
+        # the subscriptions are gone with the connection
+        self._subscriptions.clear()
+        self._subscription_ids.clear()
+
+    def _on_frame(self, raw: str | bytes):
+        frame_type, data = self.frame_decoder.decode(raw, self._subscriptions)
+        self._auth.metrics.record_ws_frame(frame_type, len(raw))
+
+        # every frame (even a keep-alive) is a sign of life
+        now = time.monotonic()
+        self._last_frame = now
+        self._ping_sent = False
+        if frame_type == "ka":
+            if self._last_ka is not None:
+                interval = now - self._last_ka
+                self._ka_interval = interval if self._ka_interval is None else self._ka_interval * 0.8 + interval * 0.2
+            self._last_ka = now
+
+        if data is None:
+            # keep alive or a frame of a subscription that has been removed
+            return
+
+        if frame_type == "next":
+            pulse_id = self._subscriptions.get(data.get("id"))
+            payload = data.get("payload")
+            keys_and_values = payload.get("data", {}).get("liveMeasurement") if isinstance(payload, dict) else None
+            if pulse_id is not None and isinstance(keys_and_values, dict) and keys_and_values.pop("__typename", None) == "PulseMeasurement":
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    _LOGGER.debug("THE DATA %s", keys_and_values)
+                self._received = True
+                self._dispatch(pulse_id, keys_and_values)
+                #{'accumulatedConsumption': 5.7841, 'accumulatedConsumptionCurrentHour': 0.0646, 'accumulatedCost': 1.952497, 'accumulatedProduction': 48.4389, 'accumulatedProductionCurrentHour': 0, 'accumulatedReward': None, 'averagePower': 261.3, 'currency': 'EUR', 'currentPhase1': None, 'currentPhase2': None, 'currentPhase3': None, 'estimatedAccumulatedConsumptionCurrentHour': None, 'maxPower': 5275, 'maxPowerProduction': 6343, 'maxPowerTimestamp': '2025-05-15T06:41:45.000+02:00', 'minPower': 0, 'minPowerProduction': 0, 'minPowerTimestamp': '2025-05-15T20:31:34.000+02:00', 'peakControlConsumptionState': None, 'power': 467, 'powerFactor': None, 'powerProduction': 0, 'signalStrength': None, 'timestamp': '2025-05-15T22:08:11.000+02:00', 'voltagePhase1': None, 'voltagePhase2': None, 'voltagePhase3': None}
+
+        elif frame_type == "connection_ack":
+            # we can/should subscribe all pulses...
+            self._acknowledged = True
+            for a_pulse_id in self._consumers:
+                self._send_subscribe(a_pulse_id)
+
+        elif frame_type == "complete":
+            pulse_id = self._subscriptions.pop(data.get("id"), None)
+            if pulse_id is not None and pulse_id in self._consumers:
+                # it looks like that the subscription ended (and we should re-subscribe)
+                _LOGGER.debug("subscription for pulse '%s' completed - re-subscribe", pulse_id)
+                self._send_subscribe(pulse_id)
+
+        elif frame_type == "ping":
+            self._send({"type": "pong"})
+
+        elif frame_type == "pong":
+            pass
+
+        elif frame_type == "error":
+            # e.g. unknown device id - the cached pulse gizmos might be outdated
+            self._discovery.invalidate(DISCOVERY_PULSES)
+            pulse_id = self._subscriptions.pop(data.get("id"), None)
+            if pulse_id is not None:
+                self._subscription_ids.pop(pulse_id, None)
+            _LOGGER.warning("error %s (pulse: %s)", data.get("payload", data), pulse_id)
+
+        else:
+            _LOGGER.debug("unknown DATA %s", data)
+
+    def _dispatch(self, pulse_id: str, keys_and_values: dict):
+        consumer = self._consumers.get(pulse_id)
+        if consumer is None:
+            return
+        self._last_measurement[pulse_id] = time.monotonic()
+        if not self._available.get(pulse_id, True):
+            self._set_available(pulse_id, True)
+        consumer[0](keys_and_values)
@@ -1,5 +1,6 @@
 import logging
 from enum import Enum
+from functools import lru_cache
 from typing import (
     NamedTuple, Final
 )
@@ -24,8 +25,234 @@ class TGATag(ApiKey, Enum):
 
     VEH_SOC             = ApiKey(key="soc",                 jpath=["battery", "level"])
     VEH_RANGE           = ApiKey(key="range",               jpath=["battery", "estimatedRange"])
-    VEH_SOCMIN          = ApiKey(key="soc_min",             jkey="userSettings", jvaluekey="online.vehicle.smartCharging.minChargeLimit")
-    VEH_SOCMAX          = ApiKey(key="soc_max",             jkey="userSettings", jvaluekey="online.vehicle.smartCharging.targetBatteryLevel")
+    VEH_SOCMIN          = ApiKey(key="soc_min",             jkey="userSettings", jvaluekey="online.vehicle.smartCharging.minChargeLimit", writeable=True)
+    VEH_SOCMAX          = ApiKey(key="soc_max",             jkey="userSettings", jvaluekey="online.vehicle.smartCharging.targetBatteryLevel", writeable=True)
     VEH_CHARGING_STATUS = ApiKey(key="evcc_charging_code",  jkey="chargingStatus")
     VEH_PIN_REQUIRED    = ApiKey(key="enter_pincode",       jkey="enterPincode")
-    VEH_ALIVE           = ApiKey(key="alive",               jkey="isAlive")
\ No newline at end of file
+    VEH_ALIVE           = ApiKey(key="alive",               jkey="isAlive")
+
+    # Tibber Pulse - live measurement (RealTimeMeasurement)
+    PULSE_POWER                         = ApiKey(key="power",                               jkey="power")
+    PULSE_POWER_PRODUCTION              = ApiKey(key="power_production",                    jkey="powerProduction")
+    PULSE_MIN_POWER                     = ApiKey(key="min_power",                           jkey="minPower")
+    PULSE_AVERAGE_POWER                 = ApiKey(key="average_power",                       jkey="averagePower")
+    PULSE_MAX_POWER                     = ApiKey(key="max_power",                           jkey="maxPower")
+    PULSE_MIN_POWER_PRODUCTION          = ApiKey(key="min_power_production",                jkey="minPowerProduction")
+    PULSE_MAX_POWER_PRODUCTION          = ApiKey(key="max_power_production",                jkey="maxPowerProduction")
+    PULSE_ACC_CONSUMPTION               = ApiKey(key="accumulated_consumption",             jkey="accumulatedConsumption")
+    PULSE_ACC_CONSUMPTION_HOUR          = ApiKey(key="accumulated_consumption_current_hour", jkey="accumulatedConsumptionCurrentHour")
+    PULSE_EST_ACC_CONSUMPTION_HOUR      = ApiKey(key="estimated_consumption_current_hour",  jkey="estimatedAccumulatedConsumptionCurrentHour")
+    PULSE_ACC_PRODUCTION                = ApiKey(key="accumulated_production",              jkey="accumulatedProduction")
+    PULSE_ACC_PRODUCTION_HOUR           = ApiKey(key="accumulated_production_current_hour", jkey="accumulatedProductionCurrentHour")
+    PULSE_ACC_COST                      = ApiKey(key="accumulated_cost",                    jkey="accumulatedCost")
+    PULSE_ACC_REWARD                    = ApiKey(key="accumulated_reward",                  jkey="accumulatedReward")
+    PULSE_CURRENT_PHASE1                = ApiKey(key="current_phase1",                      jkey="currentPhase1")
+    PULSE_CURRENT_PHASE2                = ApiKey(key="current_phase2",                      jkey="currentPhase2")
+    PULSE_CURRENT_PHASE3                = ApiKey(key="current_phase3",                      jkey="currentPhase3")
+    PULSE_VOLTAGE_PHASE1                = ApiKey(key="voltage_phase1",                      jkey="voltagePhase1")
+    PULSE_VOLTAGE_PHASE2                = ApiKey(key="voltage_phase2",                      jkey="voltagePhase2")
+    PULSE_VOLTAGE_PHASE3                = ApiKey(key="voltage_phase3",                      jkey="voltagePhase3")
+    PULSE_POWER_FACTOR                  = ApiKey(key="power_factor",                        jkey="powerFactor")
+    PULSE_SIGNAL_STRENGTH               = ApiKey(key="signal_strength",                     jkey="signalStrength")
+    PULSE_FRAMES_MERGED                 = ApiKey(key="frames_merged",                       jkey="framesMerged")
+    PULSE_FRAMES_DROPPED                = ApiKey(key="frames_dropped",                      jkey="framesDropped")
+
+    # Tibber Pulse - rolling aggregates & integrated energy (calculated locally, see rolling.py)
+    PULSE_POWER_MEAN_1M                 = ApiKey(key="power_mean_1m",                       jkey="powerMean1m")
+    PULSE_POWER_MIN_1M                  = ApiKey(key="power_min_1m",                        jkey="powerMin1m")
+    PULSE_POWER_MAX_1M                  = ApiKey(key="power_max_1m",                        jkey="powerMax1m")
+    PULSE_POWER_MEAN_5M                 = ApiKey(key="power_mean_5m",                       jkey="powerMean5m")
+    PULSE_POWER_MIN_5M                  = ApiKey(key="power_min_5m",                        jkey="powerMin5m")
+    PULSE_POWER_MAX_5M                  = ApiKey(key="power_max_5m",                        jkey="powerMax5m")
+    PULSE_POWER_MEAN_15M                = ApiKey(key="power_mean_15m",                      jkey="powerMean15m")
+    PULSE_POWER_MIN_15M                 = ApiKey(key="power_min_15m",                       jkey="powerMin15m")
+    PULSE_POWER_MAX_15M                 = ApiKey(key="power_max_15m",                       jkey="powerMax15m")
+    PULSE_POWER_PRODUCTION_MEAN_1M      = ApiKey(key="power_production_mean_1m",            jkey="powerProductionMean1m")
+    PULSE_POWER_PRODUCTION_MIN_1M       = ApiKey(key="power_production_min_1m",             jkey="powerProductionMin1m")
+    PULSE_POWER_PRODUCTION_MAX_1M       = ApiKey(key="power_production_max_1m",             jkey="powerProductionMax1m")
+    PULSE_POWER_PRODUCTION_MEAN_5M      = ApiKey(key="power_production_mean_5m",            jkey="powerProductionMean5m")
+    PULSE_POWER_PRODUCTION_MIN_5M       = ApiKey(key="power_production_min_5m",             jkey="powerProductionMin5m")
+    PULSE_POWER_PRODUCTION_MAX_5M       = ApiKey(key="power_production_max_5m",             jkey="powerProductionMax5m")
+    PULSE_POWER_PRODUCTION_MEAN_15M     = ApiKey(key="power_production_mean_15m",           jkey="powerProductionMean15m")
+    PULSE_POWER_PRODUCTION_MIN_15M      = ApiKey(key="power_production_min_15m",            jkey="powerProductionMin15m")
+    PULSE_POWER_PRODUCTION_MAX_15M      = ApiKey(key="power_production_max_15m",            jkey="powerProductionMax15m")
+    PULSE_CURRENT_PHASE1_MEAN_5M        = ApiKey(key="current_phase1_mean_5m",              jkey="currentPhase1Mean5m")
+    PULSE_CURRENT_PHASE2_MEAN_5M        = ApiKey(key="current_phase2_mean_5m",              jkey="currentPhase2Mean5m")
+    PULSE_CURRENT_PHASE3_MEAN_5M        = ApiKey(key="current_phase3_mean_5m",              jkey="currentPhase3Mean5m")
+    PULSE_VOLTAGE_PHASE1_MEAN_5M        = ApiKey(key="voltage_phase1_mean_5m",              jkey="voltagePhase1Mean5m")
+    PULSE_VOLTAGE_PHASE2_MEAN_5M        = ApiKey(key="voltage_phase2_mean_5m",              jkey="voltagePhase2Mean5m")
+    PULSE_VOLTAGE_PHASE3_MEAN_5M        = ApiKey(key="voltage_phase3_mean_5m",              jkey="voltagePhase3Mean5m")
+    PULSE_ENERGY_CONSUMPTION            = ApiKey(key="energy_consumption",                  jkey="energyConsumption")
+    PULSE_ENERGY_PRODUCTION             = ApiKey(key="energy_production",                   jkey="energyProduction")
+
+    # charging plan - calculated locally from the cached prices (see planner.py)
+    PLAN_PRICE_CURRENT                  = ApiKey(key="price_current",                       jkey="priceCurrent")
+    PLAN_START                          = ApiKey(key="charge_plan_start",                   jkey="chargePlanStart")
+    PLAN_END                            = ApiKey(key="charge_plan_end",                     jkey="chargePlanEnd")
+    PLAN_DURATION                       = ApiKey(key="charge_plan_duration",                jkey="chargePlanDuration")
+    PLAN_MEAN_PRICE                     = ApiKey(key="charge_plan_mean_price",              jkey="chargePlanMeanPrice")
+    PLAN_ACTIVE                         = ApiKey(key="charge_plan_active",                  jkey="chargePlanActive")
+    PLAN_WINDOW_START                   = ApiKey(key="cheapest_window_start",               jkey="cheapestWindowStart")
+    PLAN_WINDOW_END                     = ApiKey(key="cheapest_window_end",                 jkey="cheapestWindowEnd")
+    PLAN_WINDOW_MEAN_PRICE              = ApiKey(key="cheapest_window_mean_price",          jkey="cheapestWindowMeanPrice")
+
+    # charging history - from the local cache of the charging sessions (see history.py)
+    HIST_SESSIONS                       = ApiKey(key="charging_sessions",                   jkey="chargingSessions")
+    HIST_ENERGY_TOTAL                   = ApiKey(key="charged_energy_total",                jkey="chargedEnergyTotal")
+    HIST_COST_TOTAL                     = ApiKey(key="charging_cost_total",                 jkey="chargingCostTotal")
+    HIST_LAST_END                       = ApiKey(key="last_session_end",                    jkey="lastSessionEnd")
+    HIST_LAST_ENERGY                    = ApiKey(key="last_session_energy",                 jkey="lastSessionEnergy")
+    HIST_LAST_COST                      = ApiKey(key="last_session_cost",                   jkey="lastSessionCost")
+
+
+def _is_not_null(value) -> bool:
+    return value is not None and value != "" and value != "null"
+
+
+# from EVCC [https://github.com/evcc-io/evcc/blob/master/vehicle/ford/provider.go]...
+# func (v *Provider) Status() (api.ChargeStatus, error) {
+#     status := api.StatusNone
+#
+# res, err := v.statusG()
+# if err == nil {
+#     switch res.Metrics.XevPlugChargerStatus.Value {
+#     case "DISCONNECTED":
+#       status = api.StatusA // disconnected
+#     case "CONNECTED":
+#       status = api.StatusB // connected, not charging
+#     case "CHARGING", "CHARGINGAC":
+#       status = api.StatusC // charging
+#     default:
+#       err = fmt.Errorf("unknown charge status: %s", res.Metrics.XevPlugChargerStatus.Value)
+#     }
+# }
+def _evcc_charging_code(data: dict, settings: dict):
+    # hardcoded charging status A-F
+    if TGATag.VEH_CHARGING_STATUS.jkey in data:
+        # from https://github.com/evcc-io/evcc/blob/master/api/chargemodestatus.go
+        # StatusA    ChargeStatus = "A" // Fzg. angeschlossen: nein    Laden aktiv: nein    Ladestation betriebsbereit, Fahrzeug getrennt
+        # StatusB    ChargeStatus = "B" // Fzg. angeschlossen:   ja    Laden aktiv: nein    Fahrzeug verbunden, Netzspannung liegt nicht an
+        # StatusC    ChargeStatus = "C" // Fzg. angeschlossen:   ja    Laden aktiv:   ja    Fahrzeug lädt, Netzspannung liegt an
+        # StatusD    ChargeStatus = "D" // Fzg. angeschlossen:   ja    Laden aktiv:   ja    Fahrzeug lädt mit externer Belüfungsanforderung (für Blei-Säure-Batterien)
+        # StatusE    ChargeStatus = "E" // Fzg. angeschlossen:   ja    Laden aktiv: nein    Fehler Fahrzeug / Kabel (CP-Kurzschluss, 0V)
+        # StatusF    ChargeStatus = "F" // Fzg. angeschlossen:   ja    Laden aktiv: nein    Fehler EVSE oder Abstecken simulieren (CP-Wake-up, -12V)
+
+        charging_status = data[TGATag.VEH_CHARGING_STATUS.jkey].lower()
+        is_charging_status = charging_status == "charging" or charging_status == "chargingac"
+
+        # tibber graph api is very optimistic with charging status
+        if is_charging_status:
+            isChargingFlag = data["isCharging"]
+            charging_obj = data["charging"]
+            has_charger_id = _is_not_null(charging_obj["chargerId"])
+            progress_obj = charging_obj["progress"]
+            has_progress = _is_not_null(progress_obj["cost"]) or _is_not_null(progress_obj["energy"]) or _is_not_null(progress_obj["speed"])
+
+            if is_charging_status and (isChargingFlag or has_charger_id or has_progress):
+                return "C"
+            else:
+                # A or B ????
+                return "B"
+        else:
+            if charging_status == "not_charging":
+                return "B"
+            elif charging_status == "disconnected":
+                return "A"
+
+        # if we can not read any value, we return "A" as default
+        return "A"
+
+    return None
+
+
+# all jkeys that are holding a list of {key: x, value: y} items - these lists will be indexed once per update
+INDEXED_JKEYS: Final = frozenset(a_tag.jkey for a_tag in TGATag if a_tag.jkey is not None and a_tag.jvaluekey is not None)
+
+
+def build_settings_index(data: dict | None) -> dict:
+    index = {}
+    if data is not None:
+        for a_jkey in INDEXED_JKEYS:
+            items = data.get(a_jkey)
+            if isinstance(items, list):
+                index[a_jkey] = {item["key"]: item.get("value") for item in items if isinstance(item, dict) and "key" in item}
+    return index
+
+
+def compile_tag(tag: TGATag):
+    # returns an accessor function 'f(data, settings_index)' for the given tag
+    if tag == TGATag.VEH_CHARGING_STATUS:
+        return _evcc_charging_code
+
+    if tag.jpath is not None and len(tag.jpath) > 0:
+        path = tuple(tag.jpath)
+        if len(path) == 1:
+            k0 = path[0]
+            return lambda data, settings: data[k0]
+        if len(path) == 2:
+            k0, k1 = path
+            return lambda data, settings: data[k0][k1]
+
+        def _path_accessor(data, settings):
+            for a_key in path:
+                data = data[a_key]
+            return data
+        return _path_accessor
+
+    if tag.jkey is not None:
+        a_jkey = tag.jkey
+        if tag.jvaluekey is not None:
+            a_jvaluekey = tag.jvaluekey
+            return lambda data, settings: settings.get(a_jkey, {}).get(a_jvaluekey)
+        return lambda data, settings: data.get(a_jkey)
+
+    return lambda data, settings: None
+
+
+TAG_ACCESSORS: Final = {a_tag: compile_tag(a_tag) for a_tag in TGATag}
+
+
+# the vehicle fields that are always requested (they are required by the poll scheduler)
+VEHICLE_BASE_PATHS: Final = (("isAlive",), ("isCharging",), ("chargingStatus",))
+
+# additional fields that are required to calculate the value of a tag
+TAG_DEPENDENCIES: Final = {
+    TGATag.VEH_CHARGING_STATUS: (("isCharging",), ("charging", "chargerId"), ("charging", "progress", "cost"),
+                                 ("charging", "progress", "energy"), ("charging", "progress", "speed")),
+}
+
+
+def _tag_paths(tag: TGATag) -> list:
+    paths = list(TAG_DEPENDENCIES.get(tag, ()))
+    if tag.jpath is not None and len(tag.jpath) > 0:
+        paths.append(tuple(tag.jpath))
+    elif tag.jkey is not None:
+        if tag.jvaluekey is not None:
+            paths.extend(((tag.jkey, "key"), (tag.jkey, "value")))
+        else:
+            paths.append((tag.jkey,))
+    return paths
+
+
+def _render_selection(tree: dict) -> str:
+    parts = []
+    for a_field in sorted(tree.keys()):
+        if len(tree[a_field]) > 0:
+            parts.append(f"{a_field} {{ {_render_selection(tree[a_field])} }}")
+        else:
+            parts.append(a_field)
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=32)
+def build_vehicle_selection(tags: frozenset) -> str:
+    # the GraphQL selection set of the vehicle query - only the fields that are required by the given tags
+    tree = {}
+    paths = list(VEHICLE_BASE_PATHS)
+    for a_tag in tags:
+        paths.extend(_tag_paths(a_tag))
+    for a_path in paths:
+        node = tree
+        for a_field in a_path:
+            node = node.setdefault(a_field, {})
+    return _render_selection(tree)